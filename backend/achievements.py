@@ -0,0 +1,143 @@
+from typing import List, Dict, Any, Sequence, Mapping
+import operator
+from models import SimulationSession
+
+# Session metrics in their default order
+METRIC_NAMES = tuple(SimulationSession.model_fields["metrics"].default_factory())
+
+# Pseudo-metric read by rules: the number of commands the session has run
+COMMANDS = "commands"
+
+# Inputs are numbered like METRIC_NAMES, with the command count last
+INPUTS = METRIC_NAMES + (COMMANDS,)
+COMMANDS_INPUT = 1 << INPUTS.index(COMMANDS)
+ALL_INPUTS = (1 << len(INPUTS)) - 1
+
+OPERATORS = {">=": operator.ge, ">": operator.gt, "<=": operator.le, "<": operator.lt}
+
+# Every condition in `when` must hold; metrics a session lacks read as 0
+ACHIEVEMENTS: List[Dict[str, Any]] = [
+    {
+        "id": "speed_demon",
+        "title": "⚡ سرعة البرق",
+        "description": "استجابة فائقة السرعة!",
+        "points": 50,
+        "when": [(COMMANDS, ">=", 5), ("responseTime", ">", 90)],
+    },
+    {
+        "id": "sharpshooter",
+        "title": "🎯 دقة عالية",
+        "description": "دقة استجابة 95%+",
+        "points": 75,
+        "when": [("responseAccuracy", ">=", 95)],
+    },
+    {
+        "id": "evidence_master",
+        "title": "🔍 خبير الأدلة",
+        "description": "حفظ ممتاز للأدلة الجنائية",
+        "points": 60,
+        "when": [("forensicPreservation", ">=", 90)],
+    },
+    {
+        "id": "risk_ninja",
+        "title": "🛡️ ماستر الحماية",
+        "description": "إدارة مخاطر متقنة",
+        "points": 70,
+        "when": [("riskManagement", ">=", 90)],
+    },
+]
+
+
+def metrics_changed(before: Mapping[str, float], after: Mapping[str, float]) -> int:
+    """Bit i set if METRIC_NAMES[i] differs between two snapshots of a session's metrics"""
+    changed = 0
+    for i, name in enumerate(METRIC_NAMES):
+        if before.get(name) != after.get(name):
+            changed |= 1 << i
+    return changed
+
+
+class AchievementRule:
+    """One achievement compiled to input positions and comparison functions"""
+
+    __slots__ = ("id", "award", "conditions", "inputs")
+
+    def __init__(self, spec: Dict[str, Any]):
+        self.id = spec["id"]
+        self.award = {key: spec[key] for key in ("id", "title", "description", "points")}
+        self.conditions = []
+        self.inputs = 0
+        for name, op, threshold in spec["when"]:
+            position = INPUTS.index(name)
+            self.conditions.append((position, OPERATORS[op], threshold))
+            self.inputs |= 1 << position
+
+    def holds(self, values: Sequence[float]) -> bool:
+        return all(compare(values[position], threshold) for position, compare, threshold in self.conditions)
+
+
+class AchievementEngine:
+    """Unlocks achievements incrementally, each at most once per session.
+
+    Rules are indexed by the inputs they read. After a command only the rules
+    reading a metric that command changed, or the command count, are checked,
+    and only if the session has not unlocked them yet. Unlocked ids are kept
+    on the session (``achievements_unlocked``); a session that has never been
+    checked gets every rule checked once.
+    """
+
+    def __init__(self, specs: List[Dict[str, Any]] = ACHIEVEMENTS):
+        self.rules = [AchievementRule(spec) for spec in specs]
+        # Rules reading each input, in definition order
+        self.by_input = [[rule for rule in self.rules if rule.inputs >> i & 1] for i in range(len(INPUTS))]
+        # Rules reading any input in a changed-inputs mask
+        self._candidates: Dict[int, List[AchievementRule]] = {}
+
+    def candidates(self, changed: int) -> List[AchievementRule]:
+        rules = self._candidates.get(changed)
+        if rules is None:
+            picked = set()
+            for i, readers in enumerate(self.by_input):
+                if changed >> i & 1:
+                    picked.update(id(rule) for rule in readers)
+            rules = self._candidates[changed] = [rule for rule in self.rules if id(rule) in picked]
+        return rules
+
+    def unlock(self, session: SimulationSession, changed_metrics: int) -> List[Dict[str, Any]]:
+        """Achievements newly unlocked by the command just run.
+
+        `changed_metrics` has bit i set if METRIC_NAMES[i] changed (see
+        metrics_changed).
+        """
+        unlocked = session.achievements_unlocked
+        if unlocked is None:
+            unlocked = session.achievements_unlocked = []
+            changed = ALL_INPUTS
+        else:
+            changed = changed_metrics | COMMANDS_INPUT
+        values = None
+        awards = []
+        for rule in self.candidates(changed):
+            if rule.id in unlocked:
+                continue
+            if values is None:
+                values = self._values(session.metrics, len(session.commands_history))
+            if rule.holds(values):
+                unlocked.append(rule.id)
+                awards.append(dict(rule.award))
+        return awards
+
+    @staticmethod
+    def _values(metrics: Mapping[str, float], actions_count: int) -> List[float]:
+        return [*(metrics.get(name, 0) for name in METRIC_NAMES), actions_count]
+
+    def held(self, metrics: Mapping[str, float], actions_count: int) -> List[Dict[str, Any]]:
+        """Every achievement whose conditions hold for these metrics, checked from scratch"""
+        values = self._values(metrics, actions_count)
+        return [dict(rule.award) for rule in self.rules if rule.holds(values)]
+
+    def earned(self, session: SimulationSession) -> List[Dict[str, Any]]:
+        """Achievements a session has unlocked, plus any its current state holds"""
+        unlocked = set(session.achievements_unlocked or ())
+        held = {award["id"] for award in self.held(session.metrics, len(session.commands_history))}
+        return [dict(rule.award) for rule in self.rules if rule.id in unlocked or rule.id in held]
@@ -1,10 +1,10 @@
 class AIAssistant:
-    """AI Assistant that provides intelligent hints and guidance"""
+    """AI Assistant that provides intelligent hints and guidance.
+    
+    Holds no per-session state: hints already given are kept on the session
+    (``hints_given``).
+    """
     
-    def __init__(self):
-        self.hint_history = []
-        self.advice_given = []
-        
     def analyze_situation(self, session) -> dict:
         """Analyze current situation and provide intelligent advice"""
         advice = {
@@ -106,15 +106,15 @@ class AIAssistant:
             ]
         }
         
-        available_hints = hints.get(difficulty, hints["medium"])
-        
-        # Filter hints not already given
-        new_hints = [h for h in available_hints if h not in self.hint_history]
+        if difficulty not in hints:
+            difficulty = "medium"
         
-        if new_hints:
-            hint = new_hints[0]
-            self.hint_history.append(hint)
-            return {"hint": hint, "available": True}
+        # First hint this session hasn't been given yet
+        for i, hint in enumerate(hints[difficulty]):
+            key = f"{difficulty}:{i}"
+            if key not in session.hints_given:
+                session.hints_given.append(key)
+                return {"hint": hint, "available": True}
         
         return {"hint": "لقد استخدمت جميع التلميحات المتاحة!", "available": False}
     
@@ -0,0 +1,85 @@
+from typing import List, Dict, Optional
+import hashlib
+import re
+from models import Alert
+
+class AlertDeduplicator:
+    """Folds repeated alerts into a single alert with occurrence counters"""
+
+    # Counts and volumes ("15 failed attempts", "2.4 GB", "count: 12"); digits in
+    # addresses and names (10.0.0.5, app-07) are left alone so they keep alerts apart
+    _UNITS = (
+        r"x\b|%|[kmgt]i?b\b|b\b|bytes?\b|attempts?\b|events?\b|times\b|requests?\b|failures?\b"
+        r"|logins?\b|files?\b|objects?\b|connections?\b|calls?\b|hits?\b|messages?\b|records?\b|rows?\b"
+    )
+    _COUNT_RE = re.compile(r"(?<![\w.:/-])\d[\d,]*(?:\.\d+)?(?=\s*(?:[a-z]+\s+)?(?:" + _UNITS + "))")
+    _LABELLED_COUNT_RE = re.compile(r"\b(count|total|volume|size|bytes|attempts|events)(\s*[:=]\s*)\d[\d,]*(?:\.\d+)?\b")
+    _SPACE_RE = re.compile(r"\s+")
+
+    def __init__(self, window_minutes: float = 15.0):
+        # Sliding window in simulation minutes: a repeat seen within this
+        # window of the previous occurrence is folded into the same alert
+        self.window_minutes = window_minutes
+
+    @classmethod
+    def normalize_indicator(cls, indicator: str) -> str:
+        """Normalize an indicator so counts and spacing don't split fingerprints"""
+        value = cls._COUNT_RE.sub("#", indicator.strip().lower())
+        value = cls._LABELLED_COUNT_RE.sub(r"\1\2#", value)
+        return cls._SPACE_RE.sub(" ", value)
+
+    @classmethod
+    def fingerprint(cls, alert: Alert) -> str:
+        """Stable fingerprint over title, source and normalized indicators"""
+        indicators = sorted({cls.normalize_indicator(i) for i in alert.indicators})
+        raw = "\x1f".join([alert.title.strip().lower(), alert.source.strip().lower(), *indicators])
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+    def merge(
+        self,
+        existing: List[Alert],
+        incoming: List[Alert],
+        simulation_time: float
+    ) -> List[Alert]:
+        """Merge incoming alerts into the session alert list.
+
+        Repeats are folded into the matching stored alert. Returns the alerts
+        that were created or updated, in incoming order without duplicates.
+        """
+        index: Dict[str, Alert] = {}
+        for alert in existing:
+            if alert.fingerprint is None:
+                alert.fingerprint = self.fingerprint(alert)
+            # Later alerts win so a fingerprint maps to its newest occurrence
+            index[alert.fingerprint] = alert
+
+        touched: List[Alert] = []
+        touched_ids = set()
+        for alert in incoming:
+            fp = alert.fingerprint or self.fingerprint(alert)
+            current: Optional[Alert] = index.get(fp)
+
+            if current is not None and self.within_window(current, simulation_time):
+                current.count += alert.count
+                current.last_seen = simulation_time
+                current.timestamp = alert.timestamp
+                if alert.severity_rank() > current.severity_rank():
+                    current.severity = alert.severity
+            else:
+                alert.fingerprint = fp
+                alert.first_seen = simulation_time
+                alert.last_seen = simulation_time
+                existing.append(alert)
+                index[fp] = alert
+                current = alert
+
+            if current.id not in touched_ids:
+                touched_ids.add(current.id)
+                touched.append(current)
+
+        return touched
+
+    def within_window(self, alert: Alert, simulation_time: float) -> bool:
+        """Whether a repeat at `simulation_time` would still fold into `alert`"""
+        last_seen = alert.last_seen if alert.last_seen is not None else 0.0
+        return simulation_time - last_seen <= self.window_minutes
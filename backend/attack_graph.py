@@ -0,0 +1,224 @@
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+from collections import OrderedDict
+from models import AttackerPhase
+
+# Used by scenarios without an attack_graph of their own. One or two ATT&CK
+# techniques per phase, every technique linked to every technique of the next
+# phase; an edge is blocked by the defender path named on its target technique.
+DEFAULT_ATTACK_GRAPH: Dict[str, Any] = {
+    "entry": "T1595",
+    "techniques": [
+        {"id": "T1595", "name": "Active Scanning", "phase": "reconnaissance"},
+        {"id": "T1078", "name": "Valid Accounts", "phase": "initial_access", "path": "credential_reuse"},
+        {"id": "T1190", "name": "Exploit Public-Facing Application", "phase": "initial_access"},
+        {"id": "T1098", "name": "Account Manipulation", "phase": "privilege_escalation", "path": "iam_access"},
+        {"id": "T1068", "name": "Exploitation for Privilege Escalation", "phase": "privilege_escalation"},
+        {"id": "T1021", "name": "Remote Services", "phase": "lateral_movement", "path": "network_lateral"},
+        {"id": "T1550", "name": "Use Alternate Authentication Material", "phase": "lateral_movement",
+         "path": "iam_access"},
+        {"id": "T1530", "name": "Data from Cloud Storage", "phase": "data_exfiltration", "path": "s3_exfiltration",
+         "objective": True},
+        {"id": "T1048", "name": "Exfiltration Over Alternative Protocol", "phase": "data_exfiltration",
+         "path": "data_exfiltration", "objective": True},
+        {"id": "T1136", "name": "Create Account", "phase": "persistence", "path": "iam_access"},
+        {"id": "T1053", "name": "Scheduled Task/Job", "phase": "persistence"},
+        {"id": "T1070", "name": "Indicator Removal", "phase": "cover_tracks", "objective": True},
+    ],
+    "edges": [
+        {"from": "T1595", "to": ["T1078", "T1190"]},
+        {"from": "T1078", "to": ["T1098", "T1068"]},
+        {"from": "T1190", "to": ["T1098", "T1068"]},
+        {"from": "T1098", "to": ["T1021", "T1550"]},
+        {"from": "T1068", "to": ["T1021", "T1550"]},
+        {"from": "T1021", "to": ["T1530", "T1048"]},
+        {"from": "T1550", "to": ["T1530", "T1048"]},
+        {"from": "T1530", "to": ["T1136", "T1053"]},
+        {"from": "T1048", "to": ["T1136", "T1053"]},
+        {"from": "T1136", "to": ["T1070"]},
+        {"from": "T1053", "to": ["T1070"]},
+    ],
+}
+
+
+class AttackGraphError(ValueError):
+    """Raised when an attack graph definition is invalid"""
+
+
+class AttackGraph:
+    """Directed graph of attacker techniques, compiled to bitsets.
+
+    Techniques are numbered in definition order and edges in the order they
+    are expanded; a set of either is a Python int with one bit per member.
+    Each edge may name the defender path that blocks it (``path`` on the edge,
+    or on its target technique), so a session's blocked edges are the union
+    of the edge sets of its ``blocked_paths``.
+
+    What the attacker can still reach from a technique under a set of blocked
+    edges is memoized. Blocking edges the attacker can no longer reach carries
+    the previous result over without a traversal.
+    """
+
+    def __init__(self, spec: Dict[str, Any], cache_size: int = 4096):
+        techniques = spec.get("techniques") or []
+        if not techniques:
+            raise AttackGraphError("attack graph has no techniques")
+        self.ids: List[str] = []
+        self.names: List[str] = []
+        self.phases: List[AttackerPhase] = []
+        self.index: Dict[str, int] = {}
+        self.objectives = 0
+        default_paths: List[Optional[str]] = []
+        for node, technique in enumerate(techniques):
+            technique_id = technique["id"]
+            if technique_id in self.index:
+                raise AttackGraphError(f"duplicate technique '{technique_id}'")
+            try:
+                phase = AttackerPhase(technique["phase"])
+            except ValueError:
+                raise AttackGraphError(f"technique '{technique_id}' has unknown phase '{technique.get('phase')}'")
+            self.index[technique_id] = node
+            self.ids.append(technique_id)
+            self.names.append(technique.get("name", technique_id))
+            self.phases.append(phase)
+            default_paths.append(technique.get("path"))
+            if technique.get("objective"):
+                self.objectives |= 1 << node
+
+        self.edge_target: List[int] = []
+        self.out_edges: List[List[int]] = [[] for _ in techniques]
+        self.path_edges: Dict[str, int] = {}
+        for edge in spec.get("edges") or []:
+            source = self._node(edge["from"])
+            targets = edge["to"] if isinstance(edge["to"], list) else [edge["to"]]
+            for target_id in targets:
+                target = self._node(target_id)
+                bit = 1 << len(self.edge_target)
+                self.out_edges[source].append(len(self.edge_target))
+                self.edge_target.append(target)
+                path = edge.get("path", default_paths[target])
+                if path:
+                    self.path_edges[path] = self.path_edges.get(path, 0) | bit
+
+        self.entry = self._node(spec.get("entry", self.ids[0]))
+        self._first_in_phase: Dict[AttackerPhase, int] = {}
+        for node, phase in enumerate(self.phases):
+            self._first_in_phase.setdefault(phase, node)
+        self.cache_size = cache_size
+        self._reach: "OrderedDict[Tuple[int, int], Tuple[int, int]]" = OrderedDict()
+
+    def _node(self, technique_id: str) -> int:
+        try:
+            return self.index[technique_id]
+        except KeyError:
+            raise AttackGraphError(f"unknown technique '{technique_id}'")
+
+    def node_for(self, technique_id: Optional[str], phase: Optional[str] = None) -> int:
+        """Node of a session's technique; sessions from before the graph start at their phase"""
+        node = self.index.get(technique_id) if technique_id else None
+        if node is None and phase is not None:
+            node = self._first_in_phase.get(AttackerPhase(phase))
+        return self.entry if node is None else node
+
+    def blocked_mask(self, paths: Iterable[str]) -> int:
+        mask = 0
+        for path in paths:
+            mask |= self.path_edges.get(path, 0)
+        return mask
+
+    def objective_mask(self, technique_ids: Iterable[str]) -> int:
+        mask = 0
+        for technique_id in technique_ids:
+            node = self.index.get(technique_id)
+            if node is not None:
+                mask |= 1 << node
+        return mask & self.objectives
+
+    def _remember(self, key: Tuple[int, int], value: Tuple[int, int]):
+        self._reach[key] = value
+        if len(self._reach) > self.cache_size:
+            self._reach.popitem(last=False)
+
+    def reach(self, node: int, blocked: int) -> Tuple[int, int]:
+        """(techniques, edges) reachable from `node` without crossing a blocked edge"""
+        key = (node, blocked)
+        cached = self._reach.get(key)
+        if cached is not None:
+            self._reach.move_to_end(key)
+            return cached
+        nodes, edges = 1 << node, 0
+        stack = [node]
+        while stack:
+            for edge in self.out_edges[stack.pop()]:
+                bit = 1 << edge
+                if blocked & bit:
+                    continue
+                edges |= bit
+                target = self.edge_target[edge]
+                if not nodes >> target & 1:
+                    nodes |= 1 << target
+                    stack.append(target)
+        self._remember(key, (nodes, edges))
+        return nodes, edges
+
+    def block(self, node: int, blocked: int, path: str) -> int:
+        """Blocked-edge set after the defender blocks `path` with the attacker at `node`"""
+        added = self.path_edges.get(path, 0) & ~blocked
+        if not added:
+            return blocked
+        updated = blocked | added
+        if (node, updated) not in self._reach:
+            nodes, edges = self.reach(node, blocked)
+            if not added & edges:
+                # Only edges the attacker could not reach anyway: nothing changes
+                self._remember((node, updated), (nodes, edges))
+        return updated
+
+    def remaining_objectives(self, node: int, blocked: int, completed: Iterable[str]) -> int:
+        nodes, _ = self.reach(node, blocked)
+        return nodes & self.objectives & ~self.objective_mask(completed)
+
+    def reachable_objectives(self, node: int, blocked: int, completed: Iterable[str]) -> List[str]:
+        return self.technique_ids(self.remaining_objectives(node, blocked, completed))
+
+    def next_techniques(self, node: int, blocked: int, completed: Iterable[str]) -> List[int]:
+        """Open successors of `node` that still lead to an objective not yet completed"""
+        remaining = self.objectives & ~self.objective_mask(completed)
+        candidates = []
+        for edge in self.out_edges[node]:
+            if blocked >> edge & 1:
+                continue
+            target = self.edge_target[edge]
+            if self.reach(target, blocked)[0] & remaining and target not in candidates:
+                candidates.append(target)
+        return candidates
+
+    def is_objective(self, node: int) -> bool:
+        return bool(self.objectives >> node & 1)
+
+    def technique_ids(self, mask: int) -> List[str]:
+        ids = []
+        while mask:
+            low = mask & -mask
+            ids.append(self.ids[low.bit_length() - 1])
+            mask ^= low
+        return ids
+
+
+_default_graph: Optional[AttackGraph] = None
+
+
+def default_graph() -> AttackGraph:
+    global _default_graph
+    if _default_graph is None:
+        _default_graph = AttackGraph(DEFAULT_ATTACK_GRAPH)
+    return _default_graph
+
+
+def compile_graph(spec: Optional[Dict[str, Any]]) -> AttackGraph:
+    """Compiled graph for a scenario's attack_graph definition (the default when absent)"""
+    if not spec:
+        return default_graph()
+    try:
+        return AttackGraph(spec)
+    except (KeyError, TypeError) as e:
+        raise AttackGraphError(f"malformed attack graph: {e!r}")
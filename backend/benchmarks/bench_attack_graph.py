@@ -0,0 +1,94 @@
+"""Attacker decision cost on large technique graphs.
+
+Builds a layered graph (techniques spread over the seven phases, each linked
+to a few techniques of the next phase, edges blocked by one of a pool of
+defender paths) and replays sessions that alternate between blocking paths
+and advancing the attacker. Timed with the reachability memo and without it
+(every query a fresh traversal); both runs must make the same decisions.
+
+Usage: python backend/benchmarks/bench_attack_graph.py [--techniques 500] [--paths 40] [--sessions 200]
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from attack_graph import AttackGraph  # noqa: E402
+from models import AttackerPhase  # noqa: E402
+
+
+def make_spec(techniques: int, paths: int, fanout: int, seed: int):
+    rng = random.Random(seed)
+    phases = list(AttackerPhase)
+    layers = [[] for _ in phases]
+    nodes = []
+    for n in range(techniques):
+        layer = 0 if n == 0 else 1 + (n - 1) % (len(phases) - 1)
+        technique = {"id": f"T{n:04d}", "name": f"Technique {n}", "phase": phases[layer].value}
+        if layer >= len(phases) - 3 and rng.random() < 0.3:
+            technique["objective"] = True
+        nodes.append(technique)
+        layers[layer].append(technique["id"])
+    edges = []
+    for layer, ids in enumerate(layers[:-1]):
+        for technique_id in ids:
+            for target in rng.sample(layers[layer + 1], min(fanout, len(layers[layer + 1]))):
+                edge = {"from": technique_id, "to": target}
+                if rng.random() < 0.8:
+                    edge["path"] = f"path-{rng.randrange(paths)}"
+                edges.append(edge)
+    return {"entry": "T0000", "techniques": nodes, "edges": edges}
+
+
+def replay(graph: AttackGraph, sessions: int, steps: int, paths: int, seed: int):
+    rng = random.Random(seed)
+    decisions = []
+    for _ in range(sessions):
+        node, blocked_paths, completed = graph.entry, [], []
+        blocked = 0
+        for _ in range(steps):
+            if rng.random() < 0.4:
+                path = f"path-{rng.randrange(paths)}"
+                if path not in blocked_paths:
+                    blocked = graph.block(node, blocked, path)
+                    blocked_paths.append(path)
+                    graph.reachable_objectives(node, blocked, completed)
+            else:
+                candidates = graph.next_techniques(node, graph.blocked_mask(blocked_paths), completed)
+                if candidates:
+                    node = candidates[rng.randrange(len(candidates))]
+                    if graph.is_objective(node):
+                        completed.append(graph.ids[node])
+                decisions.append(node)
+    return decisions
+
+
+def run(techniques: int, paths: int, fanout: int, sessions: int, steps: int, seed: int):
+    spec = make_spec(techniques, paths, fanout, seed)
+    results = {}
+    for label, cache_size in (("cold", 0), ("memoized", 4096)):
+        graph = AttackGraph(spec, cache_size=cache_size)
+        started = time.perf_counter()
+        decisions = replay(graph, sessions, steps, paths, seed)
+        elapsed = time.perf_counter() - started
+        results[label] = decisions
+        print(f"  {label:9s} {elapsed * 1e6 / (sessions * steps):8.1f}us/step  ({elapsed:.2f}s)")
+    if results["cold"] != results["memoized"]:
+        raise AssertionError("memoized reachability changed attacker decisions")
+    print(f"{techniques} techniques, {len(graph.edge_target)} edges, {len(graph.path_edges)} paths; "
+          f"{sessions} sessions x {steps} steps, identical decisions")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--techniques", type=int, default=500)
+    parser.add_argument("--paths", type=int, default=40)
+    parser.add_argument("--fanout", type=int, default=4)
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--steps", type=int, default=60)
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args()
+    run(args.techniques, args.paths, args.fanout, args.sessions, args.steps, args.seed)
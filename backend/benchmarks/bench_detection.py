@@ -0,0 +1,43 @@
+"""Detection engine throughput by micro-batch size.
+
+Usage: python backend/benchmarks/bench_detection.py [--events 200000] [--batch-sizes 100,1000,10000,100000]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from models import AttackerState, AttackerPhase  # noqa: E402
+from telemetry import TelemetryStream  # noqa: E402
+from detection_rules import DetectionEngine  # noqa: E402
+
+
+def run(total_events: int, batch_sizes):
+    attacker = AttackerState(current_phase=AttackerPhase.INITIAL_ACCESS)
+    print(f"{'batch':>8} {'events/sec':>14} {'ns/event':>10} {'alerts':>8}")
+    for size in batch_sizes:
+        stream = TelemetryStream([], lambda: attacker, rate=None, batch_size=size, seed="bench")
+        # Pre-generate so only rule evaluation is timed
+        batches = [stream.next_batch(span_seconds=size / 1000) for _ in range(max(1, total_events // size))]
+        engine = DetectionEngine()
+        started = time.perf_counter()
+        alerts = 0
+        for batch in batches:
+            alerts += len(engine.evaluate(batch))
+        elapsed = time.perf_counter() - started
+        events = sum(len(b) for b in batches)
+        print(f"{size:>8} {events / elapsed:>14,.0f} {elapsed * 1e9 / events:>10.1f} {alerts:>8}")
+    return engine
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=200_000)
+    parser.add_argument("--batch-sizes", default="100,1000,10000,100000",
+                        help="comma separated; small batches are slow per event, keep --events low with them")
+    args = parser.parse_args()
+    engine = run(args.events, [int(size) for size in args.batch_sizes.split(",")])
+    for stats in engine.stats():
+        print(stats)
@@ -0,0 +1,88 @@
+"""Encode time and size of hot responses: response_model path vs the fast path.
+
+The baseline reproduces what FastAPI does for a `response_model` endpoint: dump
+the model, validate the dump again, serialize it in JSON mode and json.dumps it.
+The fast path (response_encoding.encode_response) dumps once and encodes with
+orjson, or with MessagePack.
+
+Usage: python backend/benchmarks/bench_encoding.py [--commands 500] [--repeat 200]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from response_encoding import dump_model, dumps_json, dumps_msgpack  # noqa: E402
+
+COMMANDS = [
+    ("block_ip", {"ip": "185.220.101.45"}),
+    ("isolate_host", {"hostname": "web-01"}),
+    ("query_logs", {"query": "source=cloudtrail | top 10 user"}),
+    ("disable_account", {"username": "admin-backup"}),
+    ("scan_for_malware", {"target": "web-01"}),
+    ("preserve_logs", {}),
+]
+
+
+def response_model_path(model) -> bytes:
+    validated = type(model).model_validate(model.model_dump())
+    content = validated.model_dump(mode="json")
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def time_encoder(encode, model, repeat: int):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        body = encode(model)
+    return (time.perf_counter() - started) * 1e6 / repeat, len(body)
+
+
+def build(commands: int):
+    from simulation_engine import SimulationEngine
+    from models import SimulationSession
+
+    engine = SimulationEngine()
+    engine.scenarios.reload()
+    template = next(iter(engine.scenarios.templates.values()))
+    scenario = template.scenario
+    engine.log_store.register_scenario(scenario.id, scenario.attacker_objectives, scenario.duration_minutes)
+    session = SimulationSession(**template.new_session("bench"))
+    response = None
+    for i in range(commands):
+        command, parameters = COMMANDS[i % len(COMMANDS)]
+        response = engine.execute_command(session, command, parameters)
+    return session, response
+
+
+def run(commands: int, repeat: int):
+    session, response = build(commands)
+    print(f"session: {len(session.commands_history)} commands, {len(session.alerts)} alerts")
+    encoders = [
+        ("response_model + json", response_model_path),
+        ("fast path orjson", lambda m: dumps_json(dump_model(m))),
+        ("fast path msgpack", lambda m: dumps_msgpack(dump_model(m, msgpack_encoding=True))),
+    ]
+    for label, model in (("SimulationSession", session), ("CommandExecutionResponse", response)):
+        print(label)
+        baseline = None
+        for name, encode in encoders:
+            micros, size = time_encoder(encode, model, repeat)
+            baseline = baseline or micros
+            print(f"  {name:<24} {micros:>9.1f}us {size:>9,}B  x{baseline / micros:.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--commands", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--log-rows", type=int, default=200_000)
+    args = parser.parse_args()
+    # Keep the benchmark's small corpus away from the server's
+    os.environ.setdefault("LOG_STORE_DIR", tempfile.mkdtemp(prefix="bench-logs-"))
+    os.environ.setdefault("LOG_STORE_ROWS", str(args.log_rows))
+    run(args.commands, args.repeat)
@@ -0,0 +1,86 @@
+"""Per-command engine cost.
+
+Replays 20-command sessions through SimulationEngine.execute_command with a
+fixed random seed, once with the full pipeline and once with detection
+stubbed out. The second run isolates the state transition and object
+building, which detection (telemetry synthesis plus rules) otherwise
+dominates.
+
+Usage: python backend/benchmarks/bench_engine.py [--commands 4000] [--repeat 5] [--log-rows 200000]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+COMMANDS = [
+    ("block_ip", {"ip": "185.220.101.4"}),
+    ("isolate_host", {"hostname": "app-07"}),
+    ("disable_account", {"username": "admin-backup"}),
+    ("enforce_mfa", {}),
+    ("secure_s3_bucket", {"bucket_name": "customer-records"}),
+    ("enable_dlp", {}),
+    ("preserve_logs", {}),
+    ("capture_memory_dump", {"hostname": "app-07"}),
+    ("scan_for_malware", {"target": "app-07"}),
+    ("update_firewall", {}),
+    ("isolate_network", {"segment": "staging"}),
+    ("terminate_process", {"pid": 4242}),
+]
+
+
+def replay(engine, template, commands: int, repeat: int = 1):
+    """Best time per command over `repeat` identical replays, in microseconds"""
+    from models import SimulationSession
+
+    best = float("inf")
+    for _ in range(repeat):
+        random.seed(1)
+        elapsed = 0.0
+        for n in range(commands // 20):
+            session = SimulationSession(**template.new_session(f"bench-{n}"))
+            started = time.perf_counter()
+            for i in range(20):
+                command, parameters = COMMANDS[(n + i) % len(COMMANDS)]
+                engine.execute_command(session, command, parameters)
+            elapsed += time.perf_counter() - started
+        best = min(best, elapsed)
+    return best / (commands // 20 * 20) * 1e6
+
+
+def run(commands: int, repeat: int):
+    from simulation_engine import SimulationEngine
+
+    engine = SimulationEngine()
+    engine.scenarios.reload()
+    template = next(iter(engine.scenarios.templates.values()))
+    scenario = template.scenario
+    engine.log_store.register_scenario(scenario.id, scenario.attacker_objectives, scenario.duration_minutes)
+    engine.log_store.corpus(scenario.id)
+    engine.events = None
+
+    replay(engine, template, 200)
+    full = replay(engine, template, commands, repeat)
+    engine._detect = lambda session, minutes: []
+    replay(engine, template, 200)
+    state_only = replay(engine, template, commands, repeat)
+
+    print(f"{commands} commands, best of {repeat}")
+    print(f"  full pipeline        {full:8.1f}us/command")
+    print(f"  without detection    {state_only:8.1f}us/command")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--commands", type=int, default=4000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--log-rows", type=int, default=200_000)
+    args = parser.parse_args()
+    os.environ.setdefault("LOG_STORE_DIR", tempfile.mkdtemp(prefix="bench-logs-"))
+    os.environ.setdefault("LOG_STORE_ROWS", str(args.log_rows))
+    run(args.commands, args.repeat)
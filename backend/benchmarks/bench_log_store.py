@@ -0,0 +1,74 @@
+"""SIEM log store query latency.
+
+Builds (or reopens) a corpus of --rows events for a scenario in a temporary
+directory and times a mix of queries against it: point lookups, the
+investigation commands' queries, ranges, negations and aggregations, with
+and without the "hide the future" timestamp cut-off the engine applies.
+Reports the first (cold) run and the median and p95 of the rest.
+
+Usage: python backend/benchmarks/bench_log_store.py [--rows 10000000] [--repeat 20] [--dir PATH]
+"""
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from log_store import LogStore, VOCAB  # noqa: E402
+
+OBJECTIVES = [
+    {"phase": "initial_access"}, {"phase": "privilege_escalation"},
+    {"phase": "lateral_movement"}, {"phase": "data_exfiltration"},
+]
+
+QUERIES = [
+    "* | count",
+    'source=cloudtrail user="admin-backup"',
+    "source=cloudtrail outcome=failure | top 10 user",
+    "source=vpc_flow | sum(bytes) by dst_ip",
+    f'src_ip="{VOCAB["src_ip"][3]}" | count by event',
+    f'host in ("{VOCAB["host"][6]}", "{VOCAB["host"][45]}") and outcome=failure',
+    "bytes>100000000 | top 5 dst_ip",
+    "port=3389 or port=445 | count by host",
+    "not source=cloudtrail and outcome=failure | count",
+    "source=edr | fields host, resource, user | head 50",
+]
+
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def run(rows: int, repeat: int, root: Path):
+    store = LogStore(root=root, rows=rows)
+    store.register_scenario("bench", OBJECTIVES, duration_minutes=45)
+    started = time.perf_counter()
+    corpus = store.corpus("bench")
+    print(f"{len(corpus.columns['ts']):,} rows ready in {time.perf_counter() - started:.1f}s ({root})")
+
+    horizon = 20 * 60
+    print(f"{'query':64} {'matched':>10} {'cold':>9} {'median':>9} {'p95':>9}")
+    for max_ts in (None, horizon):
+        print(f"-- max_ts={max_ts}")
+        for text in QUERIES:
+            timings = []
+            for _ in range(repeat + 1):
+                started = time.perf_counter()
+                result = store.query("bench", text, max_ts=max_ts)
+                timings.append((time.perf_counter() - started) * 1000)
+            cold, warm = timings[0], timings[1:]
+            print(f"{text[:64]:64} {result.payload['total_matched']:>10,} {cold:8.1f}ms "
+                  f"{statistics.median(warm):8.1f}ms {percentile(warm, 0.95):8.1f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--dir", type=Path, default=None, help="reuse a corpus directory between runs")
+    args = parser.parse_args()
+    run(args.rows, args.repeat, args.dir or Path(tempfile.mkdtemp(prefix="bench-log-store-")))
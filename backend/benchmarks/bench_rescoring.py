@@ -0,0 +1,93 @@
+"""Bulk re-scoring: per-session evaluate path vs NumPy columns.
+
+Generates completed-session documents with random metrics, stress, business
+continuity and attacker outcomes (some with shuffled metric order), scores
+them both ways, and checks that every final score and ending type is identical.
+
+Usage: python backend/benchmarks/bench_rescoring.py [--sessions 200000] [--chunk 20000] [--seed 7]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from models import AttackerPhase, SimulationSession  # noqa: E402
+from session_rescoring import ScoreColumns, score_columns  # noqa: E402
+
+
+def make_docs(template, sessions: int, seed: int):
+    rng = random.Random(seed)
+    phases = [phase.value for phase in AttackerPhase]
+    base = template.new_session("bench")
+    docs = []
+    for n in range(sessions):
+        metrics = {name: rng.uniform(0, 100) for name in base["metrics"]}
+        actions = [{"action": "probe"}] * rng.randint(0, 6)
+        if n % 10 == 0:
+            keys = list(metrics)
+            rng.shuffle(keys)
+            metrics = {key: metrics[key] for key in keys}
+        docs.append({
+            **base,
+            "id": f"bench-{n}",
+            "status": "completed",
+            "metrics": metrics,
+            "stress_level": rng.uniform(0, 110),
+            "system_state": {**base["system_state"], "business_continuity_score": rng.uniform(30, 100)},
+            "attacker_state": {
+                **base["attacker_state"],
+                "current_phase": rng.choice(phases),
+                "blocked_paths": [f"path-{i}" for i in range(rng.randint(0, 5))],
+            },
+            "attacker_actions": actions,
+            "attacker_action_count": len(actions),
+        })
+    return docs
+
+
+def run(sessions: int, chunk: int, seed: int):
+    from simulation_engine import SimulationEngine
+
+    engine = SimulationEngine()
+    engine.scenarios.reload()
+    template = next(iter(engine.scenarios.templates.values()))
+    docs = make_docs(template, sessions, seed)
+
+    started = time.perf_counter()
+    scalar = []
+    for doc in docs:
+        session = SimulationSession(**doc)
+        ending, _ = engine._determine_ending(session)
+        scalar.append((round(engine._final_score(session, ending), 2), ending))
+    scalar_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    vectorized = []
+    for i in range(0, len(docs), chunk):
+        scores, endings = score_columns(ScoreColumns(docs[i:i + chunk]))
+        vectorized.extend(zip(scores, endings))
+    vectorized_s = time.perf_counter() - started
+
+    mismatches = [(doc["id"], a, b) for doc, a, b in zip(docs, scalar, vectorized) if a != b]
+    if mismatches:
+        raise AssertionError(f"{len(mismatches)} mismatches, first: {mismatches[:3]}")
+
+    print(f"{sessions:,} sessions, chunks of {chunk:,}: identical scores and endings")
+    print(f"  scalar      {scalar_s:8.2f}s  {sessions / scalar_s:>12,.0f} sessions/s")
+    print(f"  vectorized  {vectorized_s:8.2f}s  {sessions / vectorized_s:>12,.0f} sessions/s "
+          f"({scalar_s / vectorized_s:.1f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=200_000)
+    parser.add_argument("--chunk", type=int, default=20_000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    os.environ.setdefault("LOG_STORE_DIR", tempfile.mkdtemp(prefix="bench-logs-"))
+    run(args.sessions, args.chunk, args.seed)
@@ -0,0 +1,101 @@
+"""Command response payload size: full state vs patches against the client's revision.
+
+Replays 50-command sessions through the engine in-process, as a client that
+sends its last revision would, and checks that applying every patch reproduces
+the full state.
+
+Usage: python backend/benchmarks/bench_state_delta.py [--sessions 20] [--commands 50]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from state_delta import StateHistory, STATE_FIELDS, apply_patch  # noqa: E402
+
+COMMANDS = [
+    ("query_logs", {"query": "source=cloudtrail outcome=failure | top 5 user"}),
+    ("check_iam_activity", {}),
+    ("block_ip", {"ip": "185.220.101.45"}),
+    ("isolate_host", {"hostname": "web-01"}),
+    ("disable_account", {"username": "admin-backup"}),
+    ("analyze_network_traffic", {}),
+    ("enforce_mfa", {}),
+    ("scan_for_malware", {"target": "web-01"}),
+    ("secure_s3_bucket", {"bucket_name": "customer-records"}),
+    ("preserve_logs", {}),
+    ("capture_memory_dump", {"hostname": "web-01"}),
+    ("terminate_process", {"pid": 4242}),
+    ("update_firewall", {}),
+    ("enable_dlp", {}),
+]
+
+
+def size(payload) -> int:
+    return len(json.dumps(payload).encode("utf-8"))
+
+
+def run(sessions: int, commands: int):
+    from simulation_engine import SimulationEngine
+    from models import SimulationSession
+
+    engine = SimulationEngine()
+    engine.scenarios.reload()
+    template = next(iter(engine.scenarios.templates.values()))
+    scenario = template.scenario
+    engine.log_store.register_scenario(scenario.id, scenario.attacker_objectives, scenario.duration_minutes)
+    engine.log_store.corpus(scenario.id)
+
+    history = StateHistory()
+    full_sizes, delta_sizes = [], []
+    state_full, state_delta = 0, 0
+    for n in range(sessions):
+        session = SimulationSession(**template.new_session(f"bench-{n}"))
+        client_revision, client_state = None, None
+        for i in range(commands):
+            command, parameters = COMMANDS[(i + n) % len(COMMANDS)]
+            response = engine.execute_command(session, command, parameters)
+            full = response.model_dump(mode="json")
+            sent = history.respond(session.id, response, client_revision).model_dump(mode="json")
+            full_sizes.append(size(full))
+            delta_sizes.append(size(sent))
+            state_full += size({field: full[field] for field in STATE_FIELDS})
+            state_delta += size(sent["patch"]) if sent["patch"] is not None else size(
+                {field: sent[field] for field in STATE_FIELDS}
+            )
+
+            # Client side: apply the patch (or take the full state) and compare
+            if sent["patch"] is not None:
+                client_state = apply_patch(client_state, sent["patch"])
+            else:
+                client_state = {field: sent[field] for field in STATE_FIELDS}
+            expected = {field: full[field] for field in STATE_FIELDS}
+            if sent["success"] and client_state != expected:
+                raise AssertionError(f"state mismatch at session {n} command {i}")
+            client_revision = sent["revision"]
+
+    total_full, total_delta = sum(full_sizes), sum(delta_sizes)
+    print(f"{sessions} sessions x {commands} commands")
+    print(f"  full   total={total_full:,}B median={statistics.median(full_sizes):,.0f}B/response")
+    print(f"  delta  total={total_delta:,}B median={statistics.median(delta_sizes):,.0f}B/response")
+    print(f"  reduction {100 * (1 - total_delta / total_full):.1f}% "
+          f"({history.delta_responses} patches, {history.full_responses} full)")
+    print(f"  state fields only: {state_full:,}B -> {state_delta:,}B "
+          f"({100 * (1 - state_delta / state_full):.1f}% smaller)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--commands", type=int, default=50)
+    parser.add_argument("--log-rows", type=int, default=200_000)
+    args = parser.parse_args()
+    # Keep the benchmark's small corpus away from the server's
+    os.environ.setdefault("LOG_STORE_DIR", tempfile.mkdtemp(prefix="bench-logs-"))
+    os.environ.setdefault("LOG_STORE_ROWS", str(args.log_rows))
+    run(args.sessions, args.commands)
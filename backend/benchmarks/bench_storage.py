@@ -0,0 +1,95 @@
+"""Session store latency per backend for the operations the API performs.
+
+Inserts sessions cloned from a scenario template, then times point reads,
+full-document saves (what every executed command costs without write-behind),
+batched saves (a write-behind group commit) and a cohort scan.
+
+Usage: python backend/benchmarks/bench_storage.py [--sessions 500] [--backends memory,sqlite]
+       [--mongo-url mongodb://localhost:27017]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from storage import Storage, MemoryBackend, SQLiteBackend, MotorBackend  # noqa: E402
+
+
+def open_backend(kind: str, mongo_url: str):
+    if kind == "memory":
+        return MemoryBackend()
+    if kind == "sqlite":
+        return SQLiteBackend(Path(tempfile.mkdtemp(prefix="bench-sqlite-")) / "bench.sqlite3")
+    return MotorBackend(mongo_url, f"bench_storage_{os.getpid()}")
+
+
+async def timed(samples, coro):
+    started = time.perf_counter()
+    await coro
+    samples.append((time.perf_counter() - started) * 1000)
+
+
+def report(name: str, samples):
+    samples = sorted(samples)
+    p95 = samples[int(len(samples) * 0.95) - 1] if len(samples) >= 20 else samples[-1]
+    print(f"  {name:<14} n={len(samples):<5} p50={statistics.median(samples):.3f}ms "
+          f"p95={p95:.3f}ms mean={statistics.fmean(samples):.3f}ms")
+
+
+async def run(kind: str, docs, batch: int, mongo_url: str):
+    storage = Storage(open_backend(kind, mongo_url))
+    await storage.setup()
+    sessions = storage.sessions
+    try:
+        inserts, gets, saves, batches, scans = [], [], [], [], []
+        for doc in docs:
+            await timed(inserts, sessions.insert(dict(doc)))
+        for doc in docs:
+            await timed(gets, sessions.get(doc["id"]))
+        for doc in docs:
+            doc["simulation_time"] += 1
+            await timed(saves, sessions.update(doc["id"], doc))
+        for i in range(0, len(docs), batch):
+            await timed(batches, sessions.update_many([(doc["id"], doc) for doc in docs[i:i + batch]]))
+        for cohort in range(10):
+            await timed(scans, sessions.find_all({"cohort_id": f"cohort-{cohort}"}, {"alerts": 0, "attacker_actions": 0}))
+
+        print(f"{kind}")
+        report("insert", inserts)
+        report("get", gets)
+        report("save", saves)
+        report(f"save x{batch}", batches)
+        report("cohort scan", scans)
+    finally:
+        if kind == "mongo":
+            await storage.backend.db.client.drop_database(storage.backend.db.name)
+        await storage.close()
+
+
+def main(sessions: int, backends, batch: int, mongo_url: str):
+    from scenario_packs import ScenarioRegistry
+
+    registry = ScenarioRegistry()
+    registry.reload()
+    template = next(iter(registry.templates.values()))
+    docs = [template.new_session(f"bench-{n}", cohort_id=f"cohort-{n % 10}") for n in range(sessions)]
+    print(f"{sessions} sessions from {template.scenario.id}")
+    for kind in backends:
+        asyncio.run(run(kind, [dict(doc) for doc in docs], batch, mongo_url))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=500)
+    parser.add_argument("--batch", type=int, default=50)
+    parser.add_argument("--backends", default="memory,sqlite")
+    parser.add_argument("--mongo-url", help="also benchmark MongoDB at this URL")
+    args = parser.parse_args()
+    backends = args.backends.split(",") + (["mongo"] if args.mongo_url else [])
+    main(args.sessions, backends, args.batch, args.mongo_url)
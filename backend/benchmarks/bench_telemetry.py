@@ -0,0 +1,45 @@
+"""Telemetry stream throughput benchmark.
+
+Usage: python backend/benchmarks/bench_telemetry.py [--seconds 5] [--batch-size 10000]
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from models import AttackerState, AttackerPhase  # noqa: E402
+from telemetry import TelemetryStream  # noqa: E402
+
+
+async def run(seconds: float, batch_size: int, rate: float):
+    attacker = AttackerState(current_phase=AttackerPhase.DATA_EXFILTRATION)
+    stream = TelemetryStream(
+        [{"phase": "initial_access"}, {"phase": "data_exfiltration"}],
+        lambda: attacker,
+        rate=rate or None,
+        batch_size=batch_size,
+        seed="bench"
+    )
+    consumed = 0
+    started = time.perf_counter()
+    async for batch in stream:
+        consumed += len(batch)
+        if time.perf_counter() - started >= seconds:
+            break
+    elapsed = time.perf_counter() - started
+    await stream.aclose()
+    print(f"batch_size={batch_size} rate={'unthrottled' if not rate else int(rate)}")
+    print(f"events={consumed} elapsed={elapsed:.2f}s throughput={consumed / elapsed:,.0f} events/sec")
+    print(f"stats={stream.stats()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--batch-size", type=int, default=10000)
+    parser.add_argument("--rate", type=float, default=0.0, help="events/sec, 0 = unthrottled")
+    args = parser.parse_args()
+    asyncio.run(run(args.seconds, args.batch_size, args.rate))
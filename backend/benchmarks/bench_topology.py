@@ -0,0 +1,110 @@
+"""Topology-backed host state at enterprise scale.
+
+Compiles a generated topology (segments of hosts in a ring with random
+cross-links, plus accounts and buckets) and runs sessions in which the
+attacker spreads every tick while the defender isolates hosts and segments.
+Reports per-operation cost, topology memory, and the size of the session's
+host state in the document against the same state kept as name lists.
+
+Usage: python backend/benchmarks/bench_topology.py [--hosts 10000] [--segments 40] [--ticks 300]
+"""
+import argparse
+import json
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from models import SystemState  # noqa: E402
+from topology import HostState, Topology  # noqa: E402
+
+
+def make_spec(hosts: int, segments: int, seed: int):
+    rng = random.Random(seed)
+    per_segment = hosts // segments
+    spec_segments = []
+    for s in range(segments):
+        links = {f"seg-{(s + 1) % segments:02d}"} | {f"seg-{rng.randrange(segments):02d}" for _ in range(2)}
+        links.discard(f"seg-{s:02d}")
+        spec_segments.append({
+            "name": f"seg-{s:02d}",
+            "hosts": [{"prefix": f"s{s:02d}-host-", "count": per_segment, "width": 1}],
+            "links": sorted(links),
+        })
+    return {
+        "segments": spec_segments,
+        "accounts": [{"prefix": "user", "count": hosts // 2}],
+        "buckets": [{"prefix": "bucket-", "count": 200}],
+        "initial_compromise": ["s00-host-1"],
+        "spread_per_tick": 3,
+    }
+
+
+def timed(samples, fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    samples.append((time.perf_counter() - started) * 1e6)
+    return result
+
+
+def run(hosts: int, segments: int, ticks: int, seed: int):
+    spec = make_spec(hosts, segments, seed)
+    tracemalloc.start()
+    started = time.perf_counter()
+    topology = Topology(spec)
+    compile_ms = (time.perf_counter() - started) * 1000
+    topology_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    rng = random.Random(seed)
+    state = SystemState(network_segment_isolated={name: False for name in topology.segment_names})
+    HostState.initial(topology).store(state)
+    spread_us, isolate_us, roundtrip_us = [], [], []
+    for tick in range(ticks):
+        hosts_state = timed(roundtrip_us, HostState.load, topology, state)
+        isolated_segments = [name for name, isolated in state.network_segment_isolated.items() if isolated]
+        timed(spread_us, hosts_state.spread, isolated_segments, None, rng)
+        if tick % 5 == 0:
+            timed(isolate_us, hosts_state.isolate_host, rng.choice(topology.host_names))
+            hosts_state.disable_account(rng.choice(topology.account_names))
+        if tick % 50 == 49:
+            segment = rng.choice(topology.segment_names)
+            state.network_segment_isolated[segment] = True
+            timed(isolate_us, hosts_state.isolate_segment, segment)
+        timed(roundtrip_us, hosts_state.store, state)
+
+    final = HostState.load(topology, state)
+    assets_bytes = len(json.dumps(state.assets.model_dump()))
+    lists_bytes = len(json.dumps({
+        "compromised_hosts": topology.host_names_in(final.compromised),
+        "isolated_hosts": topology.host_names_in(final.isolated),
+        "suspicious_accounts_disabled": [
+            name for i, name in enumerate(topology.account_names) if final.accounts_disabled >> i & 1
+        ],
+    }))
+
+    def median(samples):
+        return sorted(samples)[len(samples) // 2]
+
+    print(f"{len(topology.host_names):,} hosts in {segments} segments, {len(topology.account_names):,} accounts; "
+          f"compiled in {compile_ms:.1f}ms, {topology_bytes / 1024:,.0f} KiB shared per scenario")
+    print(f"  after {ticks} ticks: {state.assets.hosts_compromised:,} compromised, "
+          f"{state.assets.hosts_isolated:,} isolated, {state.assets.hosts_contained:,} contained")
+    print(f"  spread tick      median {median(spread_us):7.1f}us")
+    print(f"  isolate          median {median(isolate_us):7.1f}us")
+    print(f"  load/store       median {median(roundtrip_us):7.1f}us")
+    print(f"  document: bitmaps {assets_bytes:,}B vs name lists {lists_bytes:,}B "
+          f"({lists_bytes / assets_bytes:.1f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--hosts", type=int, default=10_000)
+    parser.add_argument("--segments", type=int, default=40)
+    parser.add_argument("--ticks", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=5)
+    args = parser.parse_args()
+    run(args.hosts, args.segments, args.ticks, args.seed)
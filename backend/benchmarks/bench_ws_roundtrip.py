@@ -0,0 +1,92 @@
+"""Command round-trip latency: WebSocket channel vs HTTP POST.
+
+Starts a session on a running backend, then replays the same command mix over
+POST /api/simulation/execute and over /ws/simulation/{id}, reporting per-command
+round-trip percentiles for each transport.
+
+Usage: python backend/benchmarks/bench_ws_roundtrip.py --url http://localhost:8001 --commands 500
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+import websockets
+
+COMMANDS = [
+    ("block_ip", {"ip": "185.220.101.45"}),
+    ("isolate_host", {"hostname": "web-01"}),
+    ("disable_account", {"username": "admin-backup"}),
+    ("preserve_logs", {}),
+    ("terminate_process", {"pid": 4242}),
+]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def report(label, latencies):
+    print(
+        f"{label:<6} n={len(latencies)} ms: p50={percentile(latencies, 50):.3f} "
+        f"p95={percentile(latencies, 95):.3f} p99={percentile(latencies, 99):.3f}"
+    )
+
+
+async def start_session(client: httpx.AsyncClient, scenario_id: str) -> str:
+    if not scenario_id:
+        scenario_id = (await client.get("/api/scenarios")).json()[0]["id"]
+    response = await client.post("/api/simulation/start", json={"scenario_id": scenario_id, "user_id": "bench-ws"})
+    response.raise_for_status()
+    return response.json()["id"]
+
+
+async def http_roundtrips(client: httpx.AsyncClient, session_id: str, n: int):
+    latencies = []
+    for i in range(n):
+        command, parameters = COMMANDS[i % len(COMMANDS)]
+        started = time.perf_counter()
+        response = await client.post(
+            "/api/simulation/execute",
+            json={"session_id": session_id, "command": command, "parameters": parameters}
+        )
+        response.raise_for_status()
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+
+async def ws_roundtrips(url: str, session_id: str, n: int):
+    latencies = []
+    async with websockets.connect(f"{url.replace('http', 'ws', 1)}/ws/simulation/{session_id}", max_size=None) as ws:
+        hello = json.loads(await ws.recv())
+        assert hello["t"] == "s", hello
+        for i in range(n):
+            command, parameters = COMMANDS[i % len(COMMANDS)]
+            started = time.perf_counter()
+            await ws.send(json.dumps({"c": command, "p": parameters, "i": i}))
+            while True:
+                message = json.loads(await ws.recv())
+                if message["t"] == "r" and message["i"] == i:
+                    break
+            latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+
+async def main(url: str, n: int, scenario_id: str):
+    async with httpx.AsyncClient(base_url=url, timeout=60) as client:
+        http_session = await start_session(client, scenario_id)
+        ws_session = await start_session(client, scenario_id)
+        report("http", await http_roundtrips(client, http_session, n))
+    report("ws", await ws_roundtrips(url, ws_session, n))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://localhost:8001")
+    parser.add_argument("--commands", type=int, default=500)
+    parser.add_argument("--scenario-id", default="")
+    args = parser.parse_args()
+    asyncio.run(main(args.url, args.commands, args.scenario_id))
@@ -0,0 +1,77 @@
+"""Concurrent command load against a running backend.
+
+N sessions each send a stream of POST /api/simulation/execute requests; reports
+throughput and latency, plus the server's persistence metrics (write-behind
+batch sizes and flush lag when WRITE_BEHIND is enabled).
+
+Usage: python backend/benchmarks/load_commands.py --url http://localhost:8001 --sessions 50 --commands 20
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+COMMANDS = [
+    ("block_ip", {"ip": "185.220.101.45"}),
+    ("isolate_host", {"hostname": "web-01"}),
+    ("disable_account", {"username": "admin-backup"}),
+    ("preserve_logs", {}),
+    ("enforce_mfa", {}),
+]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+async def main(url: str, sessions: int, commands: int, scenario_id: str):
+    limits = httpx.Limits(max_connections=sessions, max_keepalive_connections=sessions)
+    async with httpx.AsyncClient(base_url=url, timeout=120, limits=limits) as client:
+        if not scenario_id:
+            scenario_id = (await client.get("/api/scenarios")).json()[0]["id"]
+        started = await client.post(
+            "/api/simulation/start_bulk",
+            json={"scenario_id": scenario_id, "user_ids": [f"load-{i}" for i in range(sessions)]}
+        )
+        session_ids = list(started.json()["session_ids"].values())
+
+        latencies = []
+        errors = 0
+
+        async def play(session_id: str):
+            nonlocal errors
+            for i in range(commands):
+                command, parameters = COMMANDS[i % len(COMMANDS)]
+                begin = time.perf_counter()
+                response = await client.post(
+                    "/api/simulation/execute",
+                    json={"session_id": session_id, "command": command, "parameters": parameters}
+                )
+                latencies.append((time.perf_counter() - begin) * 1000)
+                if response.status_code != 200:
+                    errors += 1
+
+        begin = time.perf_counter()
+        await asyncio.gather(*(play(sid) for sid in session_ids))
+        wall = time.perf_counter() - begin
+
+        print(f"{sessions} sessions x {commands} commands: {len(latencies) / wall:.0f} commands/s, errors={errors}")
+        print(
+            f"  latency ms: p50={percentile(latencies, 50):.1f} p95={percentile(latencies, 95):.1f} "
+            f"p99={percentile(latencies, 99):.1f} mean={statistics.mean(latencies):.1f}"
+        )
+        print(f"  persistence: {(await client.get('/api/persistence/metrics')).json()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://localhost:8001")
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--commands", type=int, default=20)
+    parser.add_argument("--scenario-id", default="")
+    args = parser.parse_args()
+    asyncio.run(main(args.url, args.sessions, args.commands, args.scenario_id))
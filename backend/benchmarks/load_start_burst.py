@@ -0,0 +1,85 @@
+"""Classroom start-burst load test.
+
+Compares N trainees calling POST /api/simulation/start concurrently against a
+single POST /api/simulation/start_bulk for the same N users, against a running
+backend.
+
+Usage: python backend/benchmarks/load_start_burst.py --url http://localhost:8001 --users 500
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+
+import httpx
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+async def individual_burst(client: httpx.AsyncClient, scenario_id: str, users: int, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    async def start(user_id: str):
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.post("/api/simulation/start", json={"scenario_id": scenario_id, "user_id": user_id})
+            latencies.append((time.perf_counter() - started) * 1000)
+            if response.status_code != 200:
+                errors += 1
+
+    run_id = uuid.uuid4().hex[:8]
+    started = time.perf_counter()
+    await asyncio.gather(*(start(f"load-{run_id}-{i}") for i in range(users)))
+    wall = (time.perf_counter() - started) * 1000
+    return latencies, wall, errors
+
+
+async def bulk_start(client: httpx.AsyncClient, scenario_id: str, users: int):
+    run_id = uuid.uuid4().hex[:8]
+    user_ids = [f"load-{run_id}-{i}" for i in range(users)]
+    started = time.perf_counter()
+    response = await client.post("/api/simulation/start_bulk", json={"scenario_id": scenario_id, "user_ids": user_ids})
+    wall = (time.perf_counter() - started) * 1000
+    response.raise_for_status()
+    body = response.json()
+    return wall, len(body["session_ids"]), len(body["failed"])
+
+
+async def main(url: str, users: int, concurrency: int, scenario_id: str):
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, timeout=120, limits=limits) as client:
+        if not scenario_id:
+            scenarios = (await client.get("/api/scenarios")).json()
+            scenario_id = scenarios[0]["id"]
+        # Warm up the scenario template and log corpus
+        await client.post("/api/simulation/start", json={"scenario_id": scenario_id, "user_id": "warmup"})
+
+        latencies, wall, errors = await individual_burst(client, scenario_id, users, concurrency)
+        print(f"Individual /simulation/start x{users} (concurrency {concurrency})")
+        print(f"  wall={wall:.0f}ms errors={errors}")
+        print(
+            f"  latency ms: p50={percentile(latencies, 50):.1f} p95={percentile(latencies, 95):.1f} "
+            f"p99={percentile(latencies, 99):.1f} max={max(latencies):.1f} mean={statistics.mean(latencies):.1f}"
+        )
+
+        wall, started, failed = await bulk_start(client, scenario_id, users)
+        print(f"Bulk /simulation/start_bulk x{users}")
+        print(f"  wall={wall:.0f}ms started={started} failed={failed}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://localhost:8001")
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=500)
+    parser.add_argument("--scenario-id", default="")
+    args = parser.parse_args()
+    asyncio.run(main(args.url, args.users, args.concurrency, args.scenario_id))
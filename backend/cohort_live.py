@@ -0,0 +1,131 @@
+from typing import List, Dict, Any, Optional, Set
+from collections import Counter
+import heapq
+import time
+
+# Snapshot fields a session contributes to its cohort's aggregate
+SNAPSHOT_FIELDS = ("user_id", "phase", "stress", "blocked", "projected_score", "status", "commands", "last_activity")
+
+
+class CohortView:
+    """Running aggregate over the sessions of one cohort.
+
+    Every update subtracts the session's previous contribution and adds the
+    new one, so the aggregate costs O(1) per engine event and is never
+    recomputed by scanning sessions.
+    """
+
+    def __init__(self, cohort_id: str):
+        self.cohort_id = cohort_id
+        self.sessions: Dict[str, Dict[str, Any]] = {}
+        self.phase_counts: Counter = Counter()
+        self.status_counts: Counter = Counter()
+        self.sum_stress = 0.0
+        self.sum_blocked = 0
+        self.sum_projection = 0.0
+        self.sum_commands = 0
+        self.version = 0
+        self._cached: Optional[Dict[str, Any]] = None
+        self._cached_key = None
+
+    def _apply(self, snapshot: Dict[str, Any], sign: int):
+        self.phase_counts[snapshot["phase"]] += sign
+        self.status_counts[snapshot["status"]] += sign
+        self.sum_stress += sign * snapshot["stress"]
+        self.sum_blocked += sign * snapshot["blocked"]
+        self.sum_projection += sign * snapshot["projected_score"]
+        self.sum_commands += sign * snapshot["commands"]
+
+    def update(self, session_id: str, snapshot: Dict[str, Any]):
+        previous = self.sessions.get(session_id)
+        if previous is not None:
+            self._apply(previous, -1)
+        self.sessions[session_id] = snapshot
+        self._apply(snapshot, 1)
+        self.version += 1
+
+    def remove(self, session_id: str):
+        previous = self.sessions.pop(session_id, None)
+        if previous is not None:
+            self._apply(previous, -1)
+            self.version += 1
+
+    def snapshot(self, laggards: int = 5, idle_seconds: float = 300.0) -> Dict[str, Any]:
+        """Aggregate view; cached until the next update (or the idle clock moves a bucket)"""
+        now = time.time()
+        key = (self.version, laggards, int(now // 30))
+        if self._cached is not None and self._cached_key == key:
+            return self._cached
+
+        n = len(self.sessions)
+        active = [
+            (sid, s) for sid, s in self.sessions.items() if s["status"] == "active"
+        ]
+        slowest = heapq.nsmallest(laggards, active, key=lambda item: item[1]["projected_score"])
+        idle = [sid for sid, s in active if now - s["last_activity"] > idle_seconds]
+
+        self._cached = {
+            "cohort_id": self.cohort_id,
+            "version": self.version,
+            "sessions": n,
+            "status_distribution": {k: v for k, v in self.status_counts.items() if v},
+            "phase_distribution": {k: v for k, v in self.phase_counts.items() if v},
+            "average_stress": round(self.sum_stress / n, 2) if n else 0.0,
+            "average_blocked_paths": round(self.sum_blocked / n, 2) if n else 0.0,
+            "average_projected_score": round(self.sum_projection / n, 2) if n else 0.0,
+            "total_commands": self.sum_commands,
+            "laggards": [
+                {
+                    "session_id": sid,
+                    "user_id": s["user_id"],
+                    "projected_score": round(s["projected_score"], 2),
+                    "phase": s["phase"],
+                    "idle_seconds": round(now - s["last_activity"], 1),
+                }
+                for sid, s in slowest
+            ],
+            "idle_sessions": len(idle),
+        }
+        self._cached_key = key
+        return self._cached
+
+
+class CohortAggregator:
+    """Maintains live cohort views from engine events"""
+
+    def __init__(self):
+        self.cohorts: Dict[str, CohortView] = {}
+        self.session_cohorts: Dict[str, str] = {}
+        # Cohorts already seeded from storage; a view can exist before that,
+        # created by live events from its members
+        self.seeded: Set[str] = set()
+
+    def view(self, cohort_id: str) -> Optional[CohortView]:
+        return self.cohorts.get(cohort_id)
+
+    def track(self, session_id: str, cohort_id: Optional[str], snapshot: Dict[str, Any]):
+        """Add or update a session's contribution to its cohort"""
+        if not cohort_id:
+            return
+        previous = self.session_cohorts.get(session_id)
+        if previous and previous != cohort_id and previous in self.cohorts:
+            self.cohorts[previous].remove(session_id)
+        view = self.cohorts.get(cohort_id)
+        if view is None:
+            view = self.cohorts[cohort_id] = CohortView(cohort_id)
+        self.session_cohorts[session_id] = cohort_id
+        view.update(session_id, {k: snapshot[k] for k in SNAPSHOT_FIELDS})
+
+    def on_engine_event(self, event: Dict[str, Any]):
+        """EngineEventBus subscriber"""
+        if event.get("type") in ("command", "session_started", "session_completed", "session_expired"):
+            self.track(event["session_id"], event.get("cohort_id"), event)
+
+    def seed(self, cohort_id: str, documents: List[Dict[str, Any]], snapshot_fn):
+        """Populate a cohort once from stored sessions (e.g. after a restart)"""
+        view = self.cohorts.setdefault(cohort_id, CohortView(cohort_id))
+        for doc in documents:
+            if doc["id"] not in view.sessions:
+                self.track(doc["id"], cohort_id, snapshot_fn(doc))
+        self.seeded.add(cohort_id)
+        return view
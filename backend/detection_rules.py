@@ -0,0 +1,334 @@
+from typing import List, Dict, Any, Optional, Callable
+from collections import deque, OrderedDict
+from pathlib import Path
+import copy
+import json
+import os
+import re
+import time
+import numpy as np
+from models import Alert, AlertSeverity
+from log_store import VOCAB, CATEGORICAL_COLUMNS, NUMERIC_COLUMNS
+from telemetry import EventBatch
+
+try:
+    import yaml
+except ImportError:  # YAML rule files are optional
+    yaml = None
+
+# What reading a malformed rule file can raise (JSONDecodeError is a ValueError)
+READ_ERRORS = (ValueError, OSError) + ((yaml.YAMLError,) if yaml is not None else ())
+
+Mask = Callable[[Dict[str, np.ndarray]], np.ndarray]
+
+NUMERIC_MODIFIERS = {
+    "gt": np.greater,
+    "gte": np.greater_equal,
+    "lt": np.less,
+    "lte": np.less_equal,
+}
+STRING_MODIFIERS = {
+    "startswith": lambda value, pattern: value.startswith(pattern),
+    "endswith": lambda value, pattern: value.endswith(pattern),
+    "contains": lambda value, pattern: pattern in value,
+}
+
+
+class RuleError(ValueError):
+    """Raised when a detection rule file is invalid"""
+
+
+def _compile_field(spec: str, expected: Any) -> Mask:
+    """Compile one `field|modifier: value(s)` clause into a vectorized mask"""
+    field, _, modifier = spec.partition("|")
+    values = expected if isinstance(expected, list) else [expected]
+
+    if field in CATEGORICAL_COLUMNS:
+        vocab = VOCAB[field]
+        if modifier and modifier not in STRING_MODIFIERS:
+            raise RuleError(f"Modifier {modifier!r} is not valid for {field!r}")
+        test = STRING_MODIFIERS.get(modifier, lambda value, pattern: value == pattern)
+        # Resolve against the vocabulary once; evaluation is a table lookup per event
+        lut = np.array([any(test(v, str(p)) for p in values) for v in vocab], dtype=bool)
+        return lambda cols: lut[cols[field]]
+
+    if field in NUMERIC_COLUMNS:
+        if modifier and modifier not in NUMERIC_MODIFIERS:
+            raise RuleError(f"Modifier {modifier!r} is not valid for {field!r}")
+        numbers = [float(v) for v in values]
+        if modifier:
+            compare = NUMERIC_MODIFIERS[modifier]
+            bound = numbers[0]
+            return lambda cols: compare(cols[field], bound)
+        if len(numbers) == 1:
+            number = numbers[0]
+            return lambda cols: cols[field] == number
+        return lambda cols: np.isin(cols[field], numbers)
+
+    raise RuleError(f"Unknown field {field!r}")
+
+
+def _compile_selection(selection: Dict[str, Any]) -> Mask:
+    """All clauses of a selection must match"""
+    clauses = [_compile_field(spec, expected) for spec, expected in selection.items()]
+    if not clauses:
+        raise RuleError("Empty selection")
+
+    def mask(cols: Dict[str, np.ndarray]) -> np.ndarray:
+        result = clauses[0](cols)
+        for clause in clauses[1:]:
+            result = result & clause(cols)
+        return result
+    return mask
+
+
+def _compile_condition(condition: str, selections: Dict[str, Mask]) -> Mask:
+    """Compile `sel and not (filter or other)` over named selections"""
+    tokens = re.findall(r"\(|\)|[A-Za-z_][A-Za-z0-9_]*", condition)
+    pos = 0
+
+    def peek() -> Optional[str]:
+        return tokens[pos] if pos < len(tokens) else None
+
+    def take() -> str:
+        nonlocal pos
+        if pos >= len(tokens):
+            raise RuleError(f"Unexpected end of condition {condition!r}")
+        pos += 1
+        return tokens[pos - 1]
+
+    def parse_or() -> Mask:
+        left = parse_and()
+        while peek() == "or":
+            take()
+            right = parse_and()
+            left = (lambda a, b: lambda cols: a(cols) | b(cols))(left, right)
+        return left
+
+    def parse_and() -> Mask:
+        left = parse_not()
+        while peek() == "and":
+            take()
+            right = parse_not()
+            left = (lambda a, b: lambda cols: a(cols) & b(cols))(left, right)
+        return left
+
+    def parse_not() -> Mask:
+        if peek() == "not":
+            take()
+            inner = parse_not()
+            return lambda cols: ~inner(cols)
+        token = take()
+        if token == "(":
+            inner = parse_or()
+            if take() != ")":
+                raise RuleError(f"Unbalanced parentheses in {condition!r}")
+            return inner
+        if token not in selections:
+            raise RuleError(f"Unknown selection {token!r} in condition")
+        return selections[token]
+
+    compiled = parse_or()
+    if pos != len(tokens):
+        raise RuleError(f"Trailing tokens in condition {condition!r}")
+    return compiled
+
+
+class DetectionRule:
+    """A rule compiled into a micro-batch evaluator"""
+
+    def __init__(self, spec: Dict[str, Any]):
+        try:
+            self.id = spec["id"]
+            self.title = spec["title"]
+            detection = spec["detection"]
+        except KeyError as e:
+            raise RuleError(f"Rule is missing required key {e}")
+        self.description = spec.get("description", self.title)
+        self.severity = AlertSeverity(spec.get("severity", "medium"))
+        self.source = spec.get("source", "Detection Engine")
+        self.indicator_fields = spec.get("indicators", [])
+        for field in self.indicator_fields:
+            if field not in CATEGORICAL_COLUMNS:
+                raise RuleError(f"Indicator field {field!r} must be categorical")
+
+        selections = {
+            name: _compile_selection(body)
+            for name, body in detection.items() if name != "condition"
+        }
+        self.matcher = _compile_condition(detection.get("condition", " and ".join(selections)), selections)
+
+        threshold = spec.get("threshold")
+        self.threshold_count = int(threshold["count"]) if threshold else None
+        self.window_seconds = float(threshold.get("window_seconds", 300)) if threshold else None
+        self.group_by = threshold.get("group_by") if threshold else None
+        if self.group_by is not None and self.group_by not in CATEGORICAL_COLUMNS:
+            raise RuleError(f"group_by field {self.group_by!r} must be categorical")
+
+        # Statistics
+        self.hits = 0
+        self.alerts = 0
+        self.batches = 0
+        self.events = 0
+        self.eval_ns = 0
+
+    def new_state(self) -> Optional["WindowState"]:
+        if self.threshold_count is None:
+            return None
+        keys = len(VOCAB[self.group_by]) if self.group_by else 1
+        return WindowState(keys, self.window_seconds)
+
+    def evaluate(self, batch: EventBatch, state: Optional["WindowState"]) -> List[Alert]:
+        """Evaluate one batch, returning at most one alert per firing group"""
+        started = time.perf_counter_ns()
+        cols = batch.columns
+        mask = self.matcher(cols)
+        hits = int(np.count_nonzero(mask))
+        alerts: List[Alert] = []
+
+        if self.threshold_count is None:
+            if hits:
+                alerts.append(self._alert(cols, mask, hits))
+        else:
+            codes = cols[self.group_by][mask] if self.group_by else np.zeros(hits, dtype=np.int64)
+            fired = state.update(codes, batch.end_ts, self.threshold_count)
+            for key in fired.tolist():
+                group_mask = mask & (cols[self.group_by] == key) if self.group_by else mask
+                count = int(state.totals[key])
+                alerts.append(self._alert(cols, group_mask, count))
+
+        self.hits += hits
+        self.alerts += len(alerts)
+        self.batches += 1
+        self.events += len(batch)
+        self.eval_ns += time.perf_counter_ns() - started
+        return alerts
+
+    def _alert(self, cols: Dict[str, np.ndarray], mask: np.ndarray, count: int) -> Alert:
+        indicators = []
+        for field in self.indicator_fields:
+            values = cols[field][mask]
+            if len(values):
+                top = int(np.bincount(values).argmax())
+                indicators.append(f"{field}: {VOCAB[field][top]}")
+        return Alert(
+            title=self.title,
+            description=self.description,
+            severity=self.severity,
+            source=self.source,
+            indicators=indicators,
+            count=max(1, count)
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "title": self.title,
+            "hits": self.hits,
+            "alerts": self.alerts,
+            "batches": self.batches,
+            "events": self.events,
+            "eval_ms": round(self.eval_ns / 1e6, 3),
+            "ns_per_event": round(self.eval_ns / self.events, 2) if self.events else None,
+        }
+
+
+class WindowState:
+    """Sliding-window counts per group key, bucketed by batch"""
+
+    def __init__(self, keys: int, window_seconds: float):
+        self.window_seconds = window_seconds
+        self.buckets: deque = deque()
+        self.totals = np.zeros(keys, dtype=np.int64)
+        self.last_fired = np.full(keys, -np.inf)
+
+    def update(self, codes: np.ndarray, now: float, threshold: int) -> np.ndarray:
+        """Add a batch's matches and return the group keys that crossed the threshold"""
+        if len(codes):
+            counts = np.bincount(codes, minlength=len(self.totals))
+            self.buckets.append((now, counts))
+            self.totals += counts
+        while self.buckets and self.buckets[0][0] <= now - self.window_seconds:
+            _, counts = self.buckets.popleft()
+            self.totals -= counts
+        # Fire at most once per window for each key
+        fired = np.flatnonzero(
+            (self.totals >= threshold) & (now - self.last_fired >= self.window_seconds)
+        )
+        self.last_fired[fired] = now
+        return fired
+
+
+class DetectionEngine:
+    """Loads detection rules from files and evaluates them over telemetry batches"""
+
+    def __init__(self, rules_dir: Optional[Path] = None, max_streams: int = 10000):
+        self.rules_dir = Path(rules_dir or os.environ.get("DETECTION_RULES_DIR", Path(__file__).parent / "rules"))
+        self.rules: List[DetectionRule] = []
+        self.max_streams = max_streams
+        # Threshold windows are per stream (e.g. per session), least recently used first
+        self._states: "OrderedDict[str, List[Optional[WindowState]]]" = OrderedDict()
+        self.load()
+
+    def load(self):
+        """(Re)load every rule file in the rules directory"""
+        rules = []
+        if self.rules_dir.is_dir():
+            for path in sorted(self.rules_dir.iterdir()):
+                try:
+                    specs = self._read(path)
+                except READ_ERRORS as e:
+                    raise RuleError(f"{path.name}: {e}")
+                for spec in specs:
+                    try:
+                        rules.append(DetectionRule(spec))
+                    except (RuleError, ValueError, TypeError) as e:
+                        raise RuleError(f"{path.name}: {e}")
+        self.rules = rules
+        self._states.clear()
+
+    def _read(self, path: Path) -> List[Dict[str, Any]]:
+        if path.suffix == ".json":
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        elif path.suffix in (".yml", ".yaml") and yaml is not None:
+            with open(path, "r", encoding="utf-8") as f:
+                data = list(yaml.safe_load_all(f))
+        else:
+            return []
+        return data if isinstance(data, list) else [data]
+
+    def _state(self, stream_id: str) -> List[Optional[WindowState]]:
+        states = self._states.get(stream_id)
+        if states is None:
+            states = [rule.new_state() for rule in self.rules]
+            self._states[stream_id] = states
+            if len(self._states) > self.max_streams:
+                self._states.popitem(last=False)
+        else:
+            self._states.move_to_end(stream_id)
+        return states
+
+    def evaluate(self, batch: EventBatch, stream_id: str = "default") -> List[Alert]:
+        """Run every rule over a batch and collect the resulting alerts"""
+        if not len(batch) or not self.rules:
+            return []
+        states = self._state(stream_id)
+        alerts: List[Alert] = []
+        for rule, state in zip(self.rules, states):
+            alerts.extend(rule.evaluate(batch, state))
+        return alerts
+
+    def forget(self, stream_id: str):
+        self._states.pop(stream_id, None)
+
+    def fork(self, stream_id: str, new_stream_id: str):
+        """Start `new_stream_id` with a copy of `stream_id`'s threshold windows"""
+        states = self._states.get(stream_id)
+        if states is not None:
+            self._states[new_stream_id] = copy.deepcopy(states)
+            if len(self._states) > self.max_streams:
+                self._states.popitem(last=False)
+
+    def stats(self) -> List[Dict[str, Any]]:
+        return [rule.stats() for rule in self.rules]
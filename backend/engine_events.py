@@ -0,0 +1,31 @@
+from typing import List, Dict, Any, Callable
+import logging
+
+logger = logging.getLogger(__name__)
+
+EngineEvent = Dict[str, Any]
+
+
+class EngineEventBus:
+    """Synchronous publish/subscribe for events emitted by the simulation engine"""
+
+    def __init__(self):
+        self.subscribers: List[Callable[[EngineEvent], None]] = []
+
+    def subscribe(self, callback: Callable[[EngineEvent], None]):
+        self.subscribers.append(callback)
+
+    def unsubscribe(self, callback: Callable[[EngineEvent], None]):
+        if callback in self.subscribers:
+            self.subscribers.remove(callback)
+
+    def publish(self, event: EngineEvent):
+        for callback in list(self.subscribers):
+            try:
+                callback(event)
+            except Exception:
+                # A broken subscriber must never fail the command that published
+                logger.exception("Engine event subscriber failed")
+
+    def __bool__(self) -> bool:
+        return bool(self.subscribers)
@@ -0,0 +1,862 @@
+from typing import List, Dict, Any, Optional, Tuple
+from collections import OrderedDict, deque
+from pathlib import Path
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+import time
+import numpy as np
+
+# ===== SCHEMA =====
+
+SOURCES = ["cloudtrail", "vpc_flow", "edr"]
+
+SOURCE_EVENTS = {
+    "cloudtrail": [
+        "ConsoleLogin", "AssumeRole", "GetObject", "PutObject", "ListBuckets",
+        "DescribeInstances", "GetCallerIdentity", "PutBucketPolicy", "CreateAccessKey",
+        "AttachUserPolicy", "CreateUser", "StopLogging", "DeleteTrail"
+    ],
+    "vpc_flow": ["ACCEPT", "REJECT"],
+    "edr": [
+        "process_start", "network_connect", "file_write", "registry_set",
+        "scheduled_task", "credential_dump"
+    ],
+}
+
+# Relative frequency of benign events per source (same order as SOURCE_EVENTS)
+BENIGN_EVENT_WEIGHTS = {
+    "cloudtrail": [20, 15, 30, 12, 3, 8, 10, 0, 1, 0.5, 0.5, 0, 0],
+    "vpc_flow": [93, 7],
+    "edr": [45, 30, 20, 5, 0.5, 0],
+}
+
+ATTACKER_IPS = ["45.123.45.67", "185.220.101.4", "91.219.236.18"]
+ATTACKER_USERS = ["admin-backup", "svc-deploy"]
+BUCKETS = ["prod-data-backup", "app-logs", "static-assets", "billing-exports", "customer-records"]
+PROCESSES = [
+    "chrome.exe", "svchost.exe", "python3", "java", "nginx", "powershell.exe",
+    "cmd.exe", "mimikatz.exe", "rclone", "schtasks.exe"
+]
+PORTS = [443, 80, 22, 3389, 53, 5432, 8080, 445]
+
+
+def _build_vocab() -> Dict[str, List[str]]:
+    """Deterministic vocabularies for every categorical column"""
+    users = [f"user{i:03d}" for i in range(1, 241)] + ["svc-ci", "svc-backup", "root"] + ATTACKER_USERS
+    internal_ips = [f"10.0.{i // 250}.{i % 250 + 1}" for i in range(600)]
+    external_ips = [f"52.{i // 200 + 10}.{i % 200}.{(i * 7) % 250 + 1}" for i in range(300)] + ATTACKER_IPS
+    hosts = (
+        [f"web-{i:02d}" for i in range(1, 41)] + [f"app-{i:02d}" for i in range(1, 41)]
+        + [f"db-{i:02d}" for i in range(1, 11)] + [f"wks-{i:03d}" for i in range(1, 101)]
+    )
+    events = []
+    for source in SOURCES:
+        events.extend(e for e in SOURCE_EVENTS[source] if e not in events)
+    return {
+        "source": list(SOURCES),
+        "event": events,
+        "user": users,
+        "src_ip": internal_ips + external_ips,
+        "dst_ip": internal_ips + external_ips,
+        "host": hosts,
+        "resource": BUCKETS + PROCESSES,
+        "outcome": ["success", "failure"],
+        "phase": ["benign"] + [
+            "reconnaissance", "initial_access", "privilege_escalation", "lateral_movement",
+            "data_exfiltration", "persistence", "cover_tracks"
+        ],
+    }
+
+
+VOCAB = _build_vocab()
+VOCAB_INDEX = {c: {v: i for i, v in enumerate(values)} for c, values in VOCAB.items()}
+N_INTERNAL_IPS = sum(1 for ip in VOCAB["src_ip"] if ip.startswith("10."))
+
+CATEGORICAL_COLUMNS = ["source", "event", "user", "src_ip", "dst_ip", "host", "resource", "outcome"]
+NUMERIC_COLUMNS = ["ts", "bytes", "port"]
+# Ground-truth labels used by the engine; never queryable or returned to trainees
+INTERNAL_COLUMNS = ["phase"]
+INDEXED_COLUMNS = ["source", "event", "user", "src_ip", "dst_ip", "host", "resource"]
+QUERYABLE_COLUMNS = NUMERIC_COLUMNS + CATEGORICAL_COLUMNS
+
+COLUMN_DTYPES = {
+    "ts": np.int32,
+    "bytes": np.uint32,
+    "port": np.uint16,
+    "source": np.uint8,
+    "event": np.uint8,
+    "user": np.uint16,
+    "src_ip": np.uint16,
+    "dst_ip": np.uint16,
+    "host": np.uint16,
+    "resource": np.uint8,
+    "outcome": np.uint8,
+    "phase": np.uint8,
+}
+
+STORE_VERSION = 1
+
+# Malicious activity injected per attacker phase:
+# (source, event, user, src_ip, dst_ip, host, resource, outcome, bytes_range, port, rows)
+PHASE_TEMPLATES = {
+    "reconnaissance": [
+        ("cloudtrail", "ListBuckets", "admin-backup", "45.123.45.67", None, None, None, "success", (400, 2000), 443, 40),
+        ("cloudtrail", "DescribeInstances", "admin-backup", "45.123.45.67", None, None, None, "success", (400, 2000), 443, 60),
+        ("vpc_flow", "REJECT", None, "45.123.45.67", "internal", None, None, "failure", (40, 120), None, 400),
+    ],
+    "initial_access": [
+        ("cloudtrail", "ConsoleLogin", "admin-backup", "45.123.45.67", None, None, None, "failure", (300, 900), 443, 300),
+        ("cloudtrail", "ConsoleLogin", "admin-backup", "45.123.45.67", None, None, None, "success", (300, 900), 443, 3),
+        ("cloudtrail", "GetCallerIdentity", "admin-backup", "45.123.45.67", None, None, None, "success", (200, 600), 443, 10),
+    ],
+    "privilege_escalation": [
+        ("cloudtrail", "AttachUserPolicy", "admin-backup", "45.123.45.67", None, None, None, "success", (500, 1500), 443, 4),
+        ("cloudtrail", "CreateAccessKey", "admin-backup", "45.123.45.67", None, None, None, "success", (500, 1500), 443, 6),
+        ("edr", "credential_dump", "svc-deploy", "internal", None, "app-07", "mimikatz.exe", "success", (0, 0), None, 5),
+    ],
+    "lateral_movement": [
+        ("cloudtrail", "AssumeRole", "svc-deploy", "185.220.101.4", None, None, None, "success", (500, 1500), 443, 25),
+        ("edr", "network_connect", "svc-deploy", "internal", "internal", "app-07", "powershell.exe", "success", (2000, 20000), 445, 80),
+        ("vpc_flow", "ACCEPT", None, "internal", "internal", None, None, "success", (5000, 50000), 3389, 60),
+    ],
+    "data_exfiltration": [
+        ("cloudtrail", "GetObject", "svc-deploy", "185.220.101.4", None, None, "prod-data-backup", "success", (1000000, 50000000), 443, 500),
+        ("vpc_flow", "ACCEPT", None, "internal", "91.219.236.18", None, None, "success", (20000000, 400000000), 443, 120),
+        ("edr", "process_start", "svc-deploy", "internal", None, "db-02", "rclone", "success", (0, 0), None, 3),
+    ],
+    "persistence": [
+        ("cloudtrail", "CreateUser", "svc-deploy", "185.220.101.4", None, None, None, "success", (500, 1500), 443, 2),
+        ("edr", "scheduled_task", "svc-deploy", "internal", None, "app-07", "schtasks.exe", "success", (0, 0), None, 4),
+    ],
+    "cover_tracks": [
+        ("cloudtrail", "StopLogging", "svc-deploy", "185.220.101.4", None, None, None, "success", (500, 1500), 443, 2),
+        ("cloudtrail", "DeleteTrail", "svc-deploy", "185.220.101.4", None, None, None, "success", (500, 1500), 443, 1),
+    ],
+}
+
+DEFAULT_PHASES = list(PHASE_TEMPLATES.keys())[:5]
+
+
+class QueryError(ValueError):
+    """Raised when a log query cannot be parsed or references unknown fields"""
+
+
+# ===== SYNTHESIS =====
+
+def _codes(column: str, values: List[str]) -> np.ndarray:
+    lookup = VOCAB_INDEX[column]
+    return np.array([lookup[v] for v in values], dtype=COLUMN_DTYPES[column])
+
+
+def synthesize_benign(rng: np.random.Generator, n: int, ts_low: int, ts_high: int) -> Dict[str, np.ndarray]:
+    """Generate n benign records as column arrays (unsorted)"""
+    cols: Dict[str, np.ndarray] = {}
+    source = rng.choice(len(SOURCES), size=n, p=[0.45, 0.4, 0.15]).astype(np.uint8)
+    cols["source"] = source
+    cols["ts"] = rng.integers(ts_low, ts_high, size=n, dtype=np.int32)
+
+    event = np.empty(n, dtype=COLUMN_DTYPES["event"])
+    event_lookup = VOCAB_INDEX["event"]
+    for s_idx, s_name in enumerate(SOURCES):
+        mask = source == s_idx
+        weights = np.array(BENIGN_EVENT_WEIGHTS[s_name], dtype=np.float64)
+        choices = np.array([event_lookup[e] for e in SOURCE_EVENTS[s_name]], dtype=event.dtype)
+        event[mask] = choices[rng.choice(len(choices), size=int(mask.sum()), p=weights / weights.sum())]
+    cols["event"] = event
+
+    n_internal = N_INTERNAL_IPS
+    n_external = len(VOCAB["src_ip"]) - n_internal - len(ATTACKER_IPS)
+    n_benign_users = len(VOCAB["user"]) - len(ATTACKER_USERS)
+    cols["user"] = rng.integers(0, n_benign_users, size=n).astype(COLUMN_DTYPES["user"])
+
+    # Benign traffic is mostly internal; 5% comes from the benign external pool
+    src = rng.integers(0, n_internal, size=n)
+    external = rng.random(n) < 0.05
+    src[external] = n_internal + rng.integers(0, n_external, size=int(external.sum()))
+    cols["src_ip"] = src.astype(COLUMN_DTYPES["src_ip"])
+    dst = rng.integers(0, n_internal, size=n)
+    outbound = rng.random(n) < 0.2
+    dst[outbound] = n_internal + rng.integers(0, n_external, size=int(outbound.sum()))
+    cols["dst_ip"] = dst.astype(COLUMN_DTYPES["dst_ip"])
+
+    cols["host"] = rng.integers(0, len(VOCAB["host"]), size=n).astype(COLUMN_DTYPES["host"])
+    # Benign processes exclude the attacker tooling at the end of the list
+    resource = rng.integers(0, len(BUCKETS) + 6, size=n)
+    cols["resource"] = resource.astype(COLUMN_DTYPES["resource"])
+    cols["outcome"] = (rng.random(n) < 0.03).astype(COLUMN_DTYPES["outcome"])
+    cols["bytes"] = np.minimum(rng.lognormal(8.0, 1.5, size=n), 2 ** 32 - 1).astype(COLUMN_DTYPES["bytes"])
+    cols["port"] = np.array(PORTS, dtype=COLUMN_DTYPES["port"])[
+        rng.choice(len(PORTS), size=n, p=[0.55, 0.15, 0.08, 0.02, 0.12, 0.04, 0.03, 0.01])
+    ]
+    cols["phase"] = np.zeros(n, dtype=COLUMN_DTYPES["phase"])
+    return cols
+
+
+def synthesize_phase(
+    rng: np.random.Generator,
+    phase: str,
+    ts_low: int,
+    ts_high: int,
+    scale: float = 1.0
+) -> Dict[str, np.ndarray]:
+    """Generate the malicious records for one attacker phase"""
+    parts: List[Dict[str, np.ndarray]] = []
+    n_internal = N_INTERNAL_IPS
+    for (source, event, user, src_ip, dst_ip, host, resource, outcome,
+         bytes_range, port, rows) in PHASE_TEMPLATES.get(phase, []):
+        n = max(1, int(rows * scale))
+        part: Dict[str, np.ndarray] = {
+            "source": _codes("source", [source]).repeat(n),
+            "event": _codes("event", [event]).repeat(n),
+            "ts": rng.integers(ts_low, max(ts_low + 1, ts_high), size=n, dtype=np.int32),
+            "outcome": _codes("outcome", [outcome]).repeat(n),
+            "phase": _codes("phase", [phase]).repeat(n),
+        }
+        part["user"] = (
+            _codes("user", [user]).repeat(n) if user
+            else rng.integers(0, 240, size=n).astype(COLUMN_DTYPES["user"])
+        )
+        for column, value in (("src_ip", src_ip), ("dst_ip", dst_ip)):
+            if value == "internal" or value is None:
+                part[column] = rng.integers(0, n_internal, size=n).astype(COLUMN_DTYPES[column])
+            else:
+                part[column] = _codes(column, [value]).repeat(n)
+        part["host"] = (
+            _codes("host", [host]).repeat(n) if host
+            else rng.integers(0, len(VOCAB["host"]), size=n).astype(COLUMN_DTYPES["host"])
+        )
+        part["resource"] = (
+            _codes("resource", [resource]).repeat(n) if resource
+            else rng.integers(0, len(BUCKETS), size=n).astype(COLUMN_DTYPES["resource"])
+        )
+        low, high = bytes_range
+        part["bytes"] = rng.integers(low, high + 1, size=n).astype(COLUMN_DTYPES["bytes"])
+        part["port"] = (
+            np.full(n, port, dtype=COLUMN_DTYPES["port"]) if port
+            else np.zeros(n, dtype=COLUMN_DTYPES["port"])
+        )
+        parts.append(part)
+    return concat_columns(parts)
+
+
+def concat_columns(parts: List[Dict[str, np.ndarray]]) -> Dict[str, np.ndarray]:
+    """Concatenate column dicts that share the store schema"""
+    parts = [p for p in parts if p]
+    if not parts:
+        return {c: np.empty(0, dtype=COLUMN_DTYPES[c]) for c in COLUMN_DTYPES}
+    return {c: np.concatenate([p[c] for p in parts]) for c in COLUMN_DTYPES}
+
+
+def objective_phases(objectives: List[Dict[str, Any]]) -> List[str]:
+    """Attacker phases named by scenario objectives, in order"""
+    phases = [o.get("phase") for o in objectives or [] if o.get("phase") in PHASE_TEMPLATES]
+    return phases or list(DEFAULT_PHASES)
+
+
+def synthesize_corpus(
+    scenario_id: str,
+    objectives: List[Dict[str, Any]],
+    rows: int,
+    duration_minutes: int = 45
+) -> Dict[str, np.ndarray]:
+    """Build a deterministic, time-sorted corpus for a scenario"""
+    seed = int(hashlib.sha1(scenario_id.encode("utf-8")).hexdigest()[:8], 16)
+    rng = np.random.default_rng(seed)
+
+    # A day of background activity before the incident plus the exercise itself
+    horizon = duration_minutes * 60
+    parts = [synthesize_benign(rng, rows, -86400, horizon)]
+
+    phases = objective_phases(objectives)
+    span = horizon // len(phases)
+    # Keep the malicious share roughly constant as the corpus grows
+    scale = max(1.0, rows / 1_000_000)
+    for i, phase in enumerate(phases):
+        parts.append(synthesize_phase(rng, phase, i * span, (i + 1) * span, scale))
+
+    cols = concat_columns(parts)
+    order = np.argsort(cols["ts"], kind="stable")
+    return {c: v[order] for c, v in cols.items()}
+
+
+# ===== QUERY LANGUAGE =====
+#
+#   <filter> [| <stage>]...
+#
+#   filter:  field=value  field!=value  field>=n  field IN (a, b)  user=admin*
+#            combined with AND / OR / NOT and parentheses; adjacent terms are ANDed
+#   stages:  count [by field] | top N field | sum(field) [by field]
+#            | head N | fields f1, f2
+
+_TOKEN_RE = re.compile(
+    r"\s*(?:(?P<op>!=|>=|<=|=|>|<)|(?P<punct>[(),|])|\"(?P<dq>[^\"]*)\"|'(?P<sq>[^']*)'"
+    r"|(?P<word>[^\s()|,=!<>\"']+))"
+)
+
+
+def _tokenize(text: str) -> List[Tuple[str, str]]:
+    tokens = []
+    pos = 0
+    text = text.strip()
+    while pos < len(text):
+        match = _TOKEN_RE.match(text, pos)
+        if not match or match.end() == pos:
+            raise QueryError(f"Unexpected character at position {pos}: {text[pos]!r}")
+        pos = match.end()
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind in ("dq", "sq"):
+            kind = "str"
+        tokens.append((kind, value))
+    return tokens
+
+
+class _Parser:
+    def __init__(self, text: str):
+        self.tokens = _tokenize(text)
+        self.pos = 0
+
+    def peek(self) -> Optional[Tuple[str, str]]:
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def take(self) -> Tuple[str, str]:
+        token = self.peek()
+        if token is None:
+            raise QueryError("Unexpected end of query")
+        self.pos += 1
+        return token
+
+    def keyword(self, *words: str) -> bool:
+        token = self.peek()
+        if token and token[0] == "word" and token[1].lower() in words:
+            self.pos += 1
+            return True
+        return False
+
+    def punct(self, char: str) -> bool:
+        token = self.peek()
+        if token and token[0] == "punct" and token[1] == char:
+            self.pos += 1
+            return True
+        return False
+
+    def expect_punct(self, char: str):
+        if not self.punct(char):
+            raise QueryError(f"Expected '{char}'")
+
+    def value(self) -> str:
+        kind, value = self.take()
+        if kind not in ("word", "str"):
+            raise QueryError(f"Expected a value, got {value!r}")
+        return value
+
+    def field(self) -> str:
+        kind, value = self.take()
+        if kind != "word" or value not in QUERYABLE_COLUMNS:
+            raise QueryError(f"Unknown field {value!r}; available: {', '.join(QUERYABLE_COLUMNS)}")
+        return value
+
+    def group_field(self) -> str:
+        field = self.field()
+        if field not in CATEGORICAL_COLUMNS:
+            raise QueryError(f"Cannot group by numeric field {field!r}")
+        return field
+
+    def integer(self) -> int:
+        value = self.value()
+        try:
+            return int(value)
+        except ValueError:
+            raise QueryError(f"Expected a number, got {value!r}")
+
+    def parse(self) -> Tuple[Optional[tuple], List[tuple]]:
+        expr = None
+        token = self.peek()
+        if token and not (token[0] == "punct" and token[1] == "|"):
+            expr = self.parse_or()
+        stages = []
+        while self.punct("|"):
+            stages.append(self.parse_stage())
+        if self.peek() is not None:
+            raise QueryError(f"Unexpected token {self.peek()[1]!r}")
+        return expr, stages
+
+    def parse_or(self) -> tuple:
+        node = self.parse_and()
+        while self.keyword("or"):
+            node = ("or", node, self.parse_and())
+        return node
+
+    def parse_and(self) -> tuple:
+        node = self.parse_not()
+        while True:
+            token = self.peek()
+            if token is None or (token[0] == "punct" and token[1] in ("|", ")")):
+                return node
+            if token[0] == "word" and token[1].lower() == "or":
+                return node
+            self.keyword("and")
+            node = ("and", node, self.parse_not())
+
+    def parse_not(self) -> tuple:
+        if self.keyword("not"):
+            return ("not", self.parse_not())
+        return self.parse_primary()
+
+    def parse_primary(self) -> tuple:
+        if self.punct("("):
+            node = self.parse_or()
+            self.expect_punct(")")
+            return node
+        token = self.peek()
+        if token and token[1] == "*":
+            self.pos += 1
+            return ("all",)
+        field = self.field()
+        if self.keyword("in"):
+            self.expect_punct("(")
+            values = [self.value()]
+            while self.punct(","):
+                values.append(self.value())
+            self.expect_punct(")")
+            return ("term", field, "in", values)
+        kind, op = self.take()
+        if kind != "op":
+            raise QueryError(f"Expected an operator after {field!r}")
+        return ("term", field, op, [self.value()])
+
+    def parse_stage(self) -> tuple:
+        name = self.take()[1].lower()
+        if name == "count":
+            by = self.group_field() if self.keyword("by") else None
+            return ("count", by)
+        if name == "top":
+            return ("top", self.integer(), self.group_field())
+        if name == "sum":
+            self.expect_punct("(")
+            field = self.field()
+            if field not in NUMERIC_COLUMNS:
+                raise QueryError(f"Cannot sum categorical field {field!r}")
+            self.expect_punct(")")
+            by = self.group_field() if self.keyword("by") else None
+            return ("sum", field, by)
+        if name in ("head", "limit"):
+            return ("head", self.integer())
+        if name == "fields":
+            fields = [self.field()]
+            while self.punct(","):
+                fields.append(self.field())
+            return ("fields", fields)
+        raise QueryError(f"Unknown stage {name!r}")
+
+
+def parse_query(text: str) -> Tuple[Optional[tuple], List[tuple]]:
+    """Parse a query into a filter tree and a list of pipeline stages"""
+    return _Parser(text or "").parse()
+
+
+# ===== STORAGE =====
+
+class LogCorpus:
+    """Memory-mapped columnar log corpus with per-field posting indexes"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        with open(path / "meta.json", "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.rows = self.meta["rows"]
+        self.columns = {
+            c: np.load(path / f"{c}.npy", mmap_mode="r") for c in COLUMN_DTYPES
+        }
+        self._lookup = VOCAB_INDEX
+        self._indexes: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+
+    @classmethod
+    def write(cls, path: Path, cols: Dict[str, np.ndarray], meta: Dict[str, Any]) -> "LogCorpus":
+        """Persist column arrays and indexes, replacing any existing corpus atomically"""
+        tmp = path.with_name(path.name + f".tmp-{os.getpid()}-{threading.get_ident()}")
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir(parents=True)
+        for column, values in cols.items():
+            np.save(tmp / f"{column}.npy", np.ascontiguousarray(values, dtype=COLUMN_DTYPES[column]))
+        for column in INDEXED_COLUMNS:
+            codes = cols[column]
+            order = np.argsort(codes, kind="stable").astype(np.int64)
+            counts = np.bincount(codes, minlength=len(VOCAB[column]))
+            offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+            np.save(tmp / f"idx_{column}_order.npy", order)
+            np.save(tmp / f"idx_{column}_offsets.npy", offsets)
+        with open(tmp / "meta.json", "w", encoding="utf-8") as f:
+            json.dump({**meta, "rows": int(len(cols["ts"])), "version": STORE_VERSION}, f)
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp, path)
+        return cls(path)
+
+    def _index(self, column: str) -> Tuple[np.ndarray, np.ndarray]:
+        if column not in self._indexes:
+            self._indexes[column] = (
+                np.load(self.path / f"idx_{column}_order.npy", mmap_mode="r"),
+                np.load(self.path / f"idx_{column}_offsets.npy"),
+            )
+        return self._indexes[column]
+
+    # --- predicate resolution ---
+
+    def _resolve_codes(self, field: str, op: str, values: List[str]) -> np.ndarray:
+        """Resolve a categorical predicate to the vocabulary codes it matches"""
+        vocab = VOCAB[field]
+        matched = set()
+        for value in values:
+            if value.endswith("*"):
+                prefix = value[:-1]
+                matched.update(i for i, v in enumerate(vocab) if v.startswith(prefix))
+            elif value in self._lookup[field]:
+                matched.add(self._lookup[field][value])
+        if op == "!=":
+            matched = set(range(len(vocab))) - matched
+        elif op not in ("=", "in"):
+            raise QueryError(f"Operator {op!r} is not supported on {field!r}")
+        return np.array(sorted(matched), dtype=np.int64)
+
+    def _numeric(self, field: str, op: str, values: List[str]) -> Tuple[str, Any]:
+        try:
+            numbers = [float(v) for v in values]
+        except ValueError:
+            raise QueryError(f"Field {field!r} expects numeric values")
+        return op, numbers
+
+    def _term_mask(self, node: tuple, rows: Optional[np.ndarray], limit: int, cache: Dict) -> np.ndarray:
+        _, field, op, values = node
+        if field not in cache:
+            column = self.columns[field]
+            cache[field] = column[:limit] if rows is None else column[rows]
+        data = cache[field]
+        if field in CATEGORICAL_COLUMNS:
+            codes = self._resolve_codes(field, op, values)
+            if len(codes) == 1:
+                return data == codes[0]
+            return np.isin(data, codes)
+        op, numbers = self._numeric(field, op, values)
+        if op == "in":
+            return np.isin(data, numbers)
+        number = numbers[0]
+        return {
+            "=": lambda: data == number,
+            "!=": lambda: data != number,
+            ">": lambda: data > number,
+            ">=": lambda: data >= number,
+            "<": lambda: data < number,
+            "<=": lambda: data <= number,
+        }[op]()
+
+    def _mask(self, node: tuple, rows: Optional[np.ndarray], limit: int, cache: Dict) -> np.ndarray:
+        kind = node[0]
+        if kind == "term":
+            return self._term_mask(node, rows, limit, cache)
+        if kind == "and":
+            return self._mask(node[1], rows, limit, cache) & self._mask(node[2], rows, limit, cache)
+        if kind == "or":
+            return self._mask(node[1], rows, limit, cache) | self._mask(node[2], rows, limit, cache)
+        if kind == "not":
+            return ~self._mask(node[1], rows, limit, cache)
+        size = limit if rows is None else len(rows)
+        return np.ones(size, dtype=bool)
+
+    def _posting(self, node: tuple, limit: int) -> Optional[np.ndarray]:
+        """Row ids for an indexable term, or None if the term can't use an index"""
+        if node[0] != "term" or node[1] not in INDEXED_COLUMNS or node[2] not in ("=", "in"):
+            return None
+        codes = self._resolve_codes(node[1], node[2], node[3])
+        order, offsets = self._index(node[1])
+        lists = [order[offsets[c]:offsets[c + 1]] for c in codes]
+        rows = np.concatenate(lists) if lists else np.empty(0, dtype=np.int64)
+        if len(lists) > 1:
+            rows = np.sort(rows)
+        # Posting lists are in row order, so the time bound is a single cut
+        return rows[:np.searchsorted(rows, limit)]
+
+    def _conjuncts(self, node: tuple) -> List[tuple]:
+        if node[0] == "and":
+            return self._conjuncts(node[1]) + self._conjuncts(node[2])
+        return [node]
+
+    def match(self, expr: Optional[tuple], max_ts: Optional[int] = None) -> np.ndarray:
+        """Row ids matching a filter expression, optionally bounded by time"""
+        limit = self.rows if max_ts is None else int(np.searchsorted(self.columns["ts"], max_ts, side="right"))
+        if expr is None or expr == ("all",):
+            return np.arange(limit, dtype=np.int64)
+
+        # Plan: drive from the most selective indexed conjunct, verify the rest on its rows
+        best = None
+        for term in self._conjuncts(expr):
+            if term[0] != "term" or term[1] not in INDEXED_COLUMNS or term[2] not in ("=", "in"):
+                continue
+            codes = self._resolve_codes(term[1], term[2], term[3])
+            _, offsets = self._index(term[1])
+            size = int(sum(offsets[c + 1] - offsets[c] for c in codes))
+            if best is None or size < best[0]:
+                best = (size, term)
+
+        if best is not None:
+            rows = self._posting(best[1], limit)
+            if expr is best[1] or len(rows) == 0:
+                return rows
+            return rows[self._mask(expr, rows, limit, {})]
+
+        return np.flatnonzero(self._mask(expr, None, limit, {}))
+
+    def decode(self, rows: np.ndarray, fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Materialize rows as dictionaries for display"""
+        fields = fields or QUERYABLE_COLUMNS
+        decoded = {}
+        for field in fields:
+            values = np.asarray(self.columns[field][rows])
+            if field in CATEGORICAL_COLUMNS:
+                vocab = VOCAB[field]
+                decoded[field] = [vocab[v] for v in values.tolist()]
+            else:
+                decoded[field] = values.tolist()
+        return [dict(zip(fields, row)) for row in zip(*(decoded[f] for f in fields))]
+
+    def totals(self, rows: np.ndarray, by: str, weights: Optional[str] = None) -> np.ndarray:
+        """Count (or sum of a numeric field) per code of a categorical field"""
+        codes = np.asarray(self.columns[by][rows])
+        w = None if weights is None else np.asarray(self.columns[weights][rows], dtype=np.float64)
+        return np.bincount(codes, weights=w, minlength=len(VOCAB[by]))
+
+    def group(self, rows: np.ndarray, by: str, weights: Optional[str] = None, limit: int = 20) -> List[Dict[str, Any]]:
+        """Count (or sum a numeric field) per value of a categorical field"""
+        return top_groups(self.totals(rows, by, weights), by, weights, limit)
+
+
+def top_groups(totals: np.ndarray, by: str, weights: Optional[str] = None, limit: int = 20) -> List[Dict[str, Any]]:
+    """The `limit` largest non-zero totals, as {by: value, "count" | "sum_<field>": total}"""
+    top = np.argsort(totals, kind="stable")[::-1][:limit]
+    key = "count" if weights is None else f"sum_{weights}"
+    return [
+        {by: VOCAB[by][i], key: int(totals[i]) if weights is None else float(totals[i])}
+        for i in top.tolist() if totals[i] > 0
+    ]
+
+
+class LogTail(LogCorpus):
+    """A stream's recent live telemetry, held in memory and queried like a corpus.
+
+    Batches are appended in time order; the oldest are dropped once more than
+    ``max_rows`` rows are held. Columns and posting indexes are rebuilt on the
+    first query after an append.
+    """
+
+    def __init__(self, max_rows: int):
+        self.path = None
+        self.meta = {}
+        self.max_rows = max_rows
+        self.batches: deque = deque()
+        self.rows = 0
+        self.columns = concat_columns([])
+        self._lookup = VOCAB_INDEX
+        self._indexes = {}
+        self._stale = False
+
+    def append(self, columns: Dict[str, np.ndarray]):
+        self.batches.append(columns)
+        self.rows += len(columns["ts"])
+        while len(self.batches) > 1 and self.rows - len(self.batches[0]["ts"]) >= self.max_rows:
+            self.rows -= len(self.batches.popleft()["ts"])
+        self._stale = True
+
+    def copy(self) -> "LogTail":
+        """A tail sharing this one's (read-only) batches"""
+        tail = LogTail(self.max_rows)
+        tail.batches = deque(self.batches)
+        tail.rows = self.rows
+        tail._stale = True
+        return tail
+
+    def _index(self, column: str) -> Tuple[np.ndarray, np.ndarray]:
+        if column not in self._indexes:
+            codes = self.columns[column]
+            self._indexes[column] = (
+                np.argsort(codes, kind="stable").astype(np.int64),
+                np.concatenate([[0], np.cumsum(np.bincount(codes, minlength=len(VOCAB[column])))]).astype(np.int64),
+            )
+        return self._indexes[column]
+
+    def match(self, expr: Optional[tuple], max_ts: Optional[int] = None) -> np.ndarray:
+        if self._stale:
+            self.columns = concat_columns(list(self.batches))
+            self._indexes = {}
+            self._stale = False
+        return super().match(expr, max_ts)
+
+
+class QueryResult:
+    """Result of a log query: the public payload plus ground-truth hits for the engine"""
+
+    def __init__(self, payload: Dict[str, Any], malicious_rows: int, indicators: List[str], phases: List[str]):
+        self.payload = payload
+        self.malicious_rows = malicious_rows
+        self.indicators = indicators
+        self.phases = phases
+
+    def to_dict(self) -> Dict[str, Any]:
+        return self.payload
+
+
+class LogStore:
+    """Per-scenario synthetic SIEM corpora, built once and memory-mapped from disk"""
+
+    def __init__(
+        self,
+        root: Optional[Path] = None,
+        rows: Optional[int] = None,
+        tail_rows: Optional[int] = None,
+        max_tails: int = 1000
+    ):
+        self.root = Path(root or os.environ.get("LOG_STORE_DIR", Path(__file__).parent / "log_store"))
+        self.rows = rows or int(os.environ.get("LOG_STORE_ROWS", "1000000"))
+        self.scenarios: Dict[str, Dict[str, Any]] = {}
+        self._corpora: Dict[str, LogCorpus] = {}
+        self._lock = threading.Lock()
+        # Live telemetry ingested per stream (session), least recently used first
+        self.tail_rows = tail_rows or int(os.environ.get("LOG_STORE_TAIL_ROWS", "5000"))
+        self.max_tails = max_tails
+        self._tails: "OrderedDict[str, LogTail]" = OrderedDict()
+
+    def register_scenario(self, scenario_id: str, objectives: List[Dict[str, Any]], duration_minutes: int = 45):
+        """Remember a scenario's objectives so its corpus is seeded from them"""
+        self.scenarios[scenario_id] = {
+            "objectives": objectives or [],
+            "duration_minutes": duration_minutes,
+        }
+
+    def _signature(self, scenario_id: str) -> str:
+        info = self.scenarios.get(scenario_id, {"objectives": [], "duration_minutes": 45})
+        raw = json.dumps([objective_phases(info["objectives"]), info["duration_minutes"], self.rows])
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:12]
+
+    def corpus(self, scenario_id: str) -> LogCorpus:
+        """Open (building on first use) the corpus for a scenario"""
+        corpus = self._corpora.get(scenario_id)
+        if corpus is not None:
+            return corpus
+        with self._lock:
+            if scenario_id in self._corpora:
+                return self._corpora[scenario_id]
+            path = self.root / re.sub(r"[^A-Za-z0-9_.-]", "_", scenario_id)
+            signature = self._signature(scenario_id)
+            corpus = None
+            if (path / "meta.json").exists():
+                corpus = LogCorpus(path)
+                if corpus.meta.get("signature") != signature or corpus.meta.get("version") != STORE_VERSION:
+                    corpus = None
+            if corpus is None:
+                info = self.scenarios.get(scenario_id, {"objectives": [], "duration_minutes": 45})
+                cols = synthesize_corpus(scenario_id, info["objectives"], self.rows, info["duration_minutes"])
+                self.root.mkdir(parents=True, exist_ok=True)
+                corpus = LogCorpus.write(path, cols, {"signature": signature, "scenario_id": scenario_id})
+            self._corpora[scenario_id] = corpus
+            return corpus
+
+    def ingest(self, stream_id: str, columns: Dict[str, np.ndarray]):
+        """Append a live telemetry batch (telemetry.EventBatch.columns) to a stream's tail"""
+        tail = self._tails.get(stream_id)
+        if tail is None:
+            tail = self._tails[stream_id] = LogTail(self.tail_rows)
+            if len(self._tails) > self.max_tails:
+                self._tails.popitem(last=False)
+        else:
+            self._tails.move_to_end(stream_id)
+        tail.append(columns)
+
+    def fork(self, stream_id: str, new_stream_id: str):
+        """Start `new_stream_id` with the telemetry `stream_id` has ingested so far"""
+        tail = self._tails.get(stream_id)
+        if tail is not None:
+            self._tails[new_stream_id] = tail.copy()
+            if len(self._tails) > self.max_tails:
+                self._tails.popitem(last=False)
+
+    def forget(self, stream_id: str):
+        self._tails.pop(stream_id, None)
+
+    def query(
+        self,
+        scenario_id: str,
+        text: str,
+        max_ts: Optional[int] = None,
+        stream_id: Optional[str] = None
+    ) -> QueryResult:
+        """Run a query against a scenario corpus, hiding events after max_ts seconds.
+
+        With `stream_id`, the live telemetry ingested for that stream is
+        searched as well, after the corpus.
+        """
+        corpus = self.corpus(scenario_id)
+        started = time.perf_counter()
+        expr, stages = parse_query(text)
+        sources = [corpus]
+        tail = self._tails.get(stream_id) if stream_id is not None else None
+        if tail is not None:
+            sources.append(tail)
+        parts = [(source, source.match(expr, max_ts)) for source in sources]
+        matched = sum(len(rows) for _, rows in parts)
+
+        def totals(by, weights=None, selected=None):
+            return sum(source.totals(rows, by, weights) for source, rows in (selected or parts))
+
+        payload: Dict[str, Any] = {"query": text, "total_matched": int(matched)}
+        fields = None
+        head = 20
+        aggregated = False
+        for stage in stages:
+            kind = stage[0]
+            if kind == "fields":
+                fields = stage[1]
+            elif kind == "head":
+                head = max(0, min(stage[1], 500))
+            elif kind == "count":
+                aggregated = True
+                if stage[1] is None:
+                    payload["count"] = int(matched)
+                else:
+                    payload["groups"] = top_groups(totals(stage[1]), stage[1])
+            elif kind == "top":
+                aggregated = True
+                payload["groups"] = top_groups(totals(stage[2]), stage[2], limit=max(1, min(stage[1], 500)))
+            elif kind == "sum":
+                aggregated = True
+                if stage[2] is None:
+                    payload["sum"] = float(sum(
+                        np.asarray(source.columns[stage[1]][rows], dtype=np.float64).sum() for source, rows in parts
+                    ))
+                else:
+                    payload["groups"] = top_groups(totals(stage[2], stage[1]), stage[2], weights=stage[1])
+        if not aggregated:
+            decoded = []
+            for source, rows in parts:
+                decoded.extend(source.decode(rows[:head - len(decoded)], fields))
+            payload["rows"] = decoded
+
+        # Ground truth for the engine: which attacker activity did the query surface?
+        hits = []
+        labels = set()
+        for source, rows in parts:
+            phase = np.asarray(source.columns["phase"][rows])
+            hits.append((source, rows[phase > 0]))
+            labels.update(np.unique(phase[phase > 0]).tolist())
+        indicators: List[str] = []
+        phases: List[str] = []
+        if labels:
+            phases = [VOCAB["phase"][p] for p in sorted(labels)]
+            for field in ("src_ip", "user", "event"):
+                top = top_groups(totals(field, selected=hits), field, limit=1)
+                if top:
+                    indicators.append(f"{field}: {top[0][field]}")
+
+        payload["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 3)
+        return QueryResult(payload, int(sum(len(rows) for _, rows in hits)), indicators, phases)
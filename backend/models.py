@@ -11,6 +11,13 @@ class AlertSeverity(str, Enum):
     MEDIUM = "medium"
     LOW = "low"
 
+SEVERITY_RANK = {
+    AlertSeverity.LOW: 0,
+    AlertSeverity.MEDIUM: 1,
+    AlertSeverity.HIGH: 2,
+    AlertSeverity.CRITICAL: 3
+}
+
 class AttackerPhase(str, Enum):
     RECONNAISSANCE = "reconnaissance"
     INITIAL_ACCESS = "initial_access"
@@ -26,6 +33,21 @@ class SimulationStatus(str, Enum):
     COMPLETED = "completed"
     FAILED = "failed"
 
+class AssetState(BaseModel):
+    """Host, account and bucket state over the scenario topology.
+
+    Bitmaps are base64 little-endian, one bit per entity in topology order
+    (see topology.py); the counts are kept alongside for display.
+    """
+    compromised: str = ""
+    isolated: str = ""
+    accounts_disabled: str = ""
+    buckets_secured: str = ""
+    hosts_total: int = 0
+    hosts_compromised: int = 0
+    hosts_isolated: int = 0
+    hosts_contained: int = 0
+
 # System State Model
 class SystemState(BaseModel):
     """Represents the current state of the system under attack"""
@@ -39,8 +61,8 @@ class SystemState(BaseModel):
     
     # Endpoints
     malware_contained: bool = False
-    compromised_hosts: List[str] = Field(default_factory=list)
-    isolated_hosts: List[str] = Field(default_factory=list)
+    compromised_hosts: List[str] = Field(default_factory=list)  # first few, by topology order
+    isolated_hosts: List[str] = Field(default_factory=list)  # isolated by isolate_host
     
     # IAM
     suspicious_accounts_disabled: List[str] = Field(default_factory=list)
@@ -65,6 +87,9 @@ class SystemState(BaseModel):
         "payment": True
     })
     business_continuity_score: float = 100.0
+    
+    # Topology-backed state; the lists above keep the names the defender acted on
+    assets: Optional[AssetState] = None
 
 # Attacker State Model
 class AttackerState(BaseModel):
@@ -74,9 +99,13 @@ class AttackerState(BaseModel):
     progress: float = 0.0  # 0-100
     stealth_mode: bool = True
     objectives_completed: List[str] = Field(default_factory=list)
-    blocked_paths: List[str] = Field(default_factory=list)
+    blocked_paths: List[str] = Field(default_factory=list)  # distinct defender blocks
     fallback_attempts: int = 0
     
+    # Position in the scenario's attack graph and the objectives still reachable from it
+    technique: Optional[str] = None
+    reachable_objectives: List[str] = Field(default_factory=list)
+    
     # Time to objectives
     ttd: Optional[float] = None  # Time to Detection (minutes)
     ttc: Optional[float] = None  # Time to Containment (minutes)
@@ -92,6 +121,16 @@ class Alert(BaseModel):
     indicators: List[str] = Field(default_factory=list)
     is_false_positive: bool = False
     related_alerts: List[str] = Field(default_factory=list)
+    
+    # Deduplication (see alert_dedup.AlertDeduplicator)
+    fingerprint: Optional[str] = None
+    count: int = 1
+    first_seen: Optional[float] = None  # Simulation minutes
+    last_seen: Optional[float] = None  # Simulation minutes
+    
+    def severity_rank(self) -> int:
+        """Numeric severity, higher is more severe"""
+        return SEVERITY_RANK[AlertSeverity(self.severity)]
 
 # Command Model
 class Command(BaseModel):
@@ -120,6 +159,17 @@ class Scenario(BaseModel):
     # Initial state
     initial_alerts: List[Alert] = Field(default_factory=list)
     hidden_objective: Optional[str] = None
+    
+    # Scheduled team/pressure messages: {"trigger_time", "sender", "message", "urgency"}
+    event_schedule: List[Dict[str, Any]] = Field(default_factory=list)
+    
+    # Technique graph: {"entry", "techniques": [{"id", "name", "phase", "path"?, "objective"?}],
+    # "edges": [{"from", "to", "path"?}]}; attack_graph.DEFAULT_ATTACK_GRAPH when absent
+    attack_graph: Optional[Dict[str, Any]] = None
+    
+    # Network: {"segments": [{"name", "hosts", "links"}], "accounts", "buckets", "initial_compromise",
+    # "spread_per_tick"}; name lists accept {"prefix", "count"} ranges; topology.DEFAULT_TOPOLOGY when absent
+    topology: Optional[Dict[str, Any]] = None
 
 class ScenarioCreate(BaseModel):
     name: str
@@ -136,15 +186,20 @@ class SimulationSession(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     scenario_id: str
     user_id: str = "guest"
+    cohort_id: Optional[str] = None
     
     status: SimulationStatus = SimulationStatus.ACTIVE
     start_time: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     end_time: Optional[datetime] = None
+    last_activity: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     
     # Current state
     system_state: SystemState = Field(default_factory=SystemState)
     attacker_state: AttackerState = Field(default_factory=AttackerState)
     
+    # Incremented by every executed command
+    revision: int = 0
+    
     # Simulation time (in minutes from start)
     simulation_time: float = 0.0
     stress_level: float = 20.0  # 0-100
@@ -165,35 +220,67 @@ class SimulationSession(BaseModel):
         "forensicPreservation": 70.0
     })
     
+    # Ids of the achievements unlocked so far; None until first checked
+    achievements_unlocked: Optional[List[str]] = None
+    
+    # AI assistant hints already given, as "<difficulty>:<index>"
+    hints_given: List[str] = Field(default_factory=list)
+    
     # Score
     final_score: Optional[float] = None
     ending_type: Optional[str] = None
+    
+    # Counts left in place of the history when an idle session expires
+    summary: Optional[Dict[str, Any]] = None
+    
+    # What-if forks only: the stored session they descend from and how many
+    # commands its history held when they branched
+    forked_from: Optional[str] = None
+    forked_at: Optional[int] = None
 
 class SimulationSessionCreate(BaseModel):
     scenario_id: str
     user_id: str = "guest"
+    cohort_id: Optional[str] = None
+
+class BulkSessionCreate(BaseModel):
+    """Start one session per trainee of a class in a single request"""
+    scenario_id: str
+    user_ids: List[str] = Field(min_length=1, max_length=1000)
+    cohort_id: Optional[str] = None
+
+class BulkSessionStartResponse(BaseModel):
+    scenario_id: str
+    session_ids: Dict[str, str]  # user_id -> session_id
+    failed: List[str] = Field(default_factory=list)  # user_ids whose insert failed
 
 # Command Execution Request
 class CommandExecutionRequest(BaseModel):
     session_id: str
     command: str
     parameters: Dict[str, Any] = Field(default_factory=dict)
+    since_revision: Optional[int] = None  # Last revision the client holds; enables a patch response
 
 # Command Execution Response
 class CommandExecutionResponse(BaseModel):
     success: bool
     message: str
-    system_state: SystemState
-    attacker_state: AttackerState
+    revision: int = 0
+    # State fields are omitted when `patch` carries them as a JSON Patch against `base_revision`
+    system_state: Optional[SystemState] = None
+    attacker_state: Optional[AttackerState] = None
     new_alerts: List[Alert] = Field(default_factory=list)
-    stress_level: float
-    metrics: Dict[str, float]
-    simulation_time: float
-    timeline_events: List[Dict[str, Any]] = Field(default_factory=list)
+    stress_level: Optional[float] = None
+    metrics: Optional[Dict[str, float]] = None
+    simulation_time: Optional[float] = None
+    timeline_events: Optional[List[Dict[str, Any]]] = Field(default_factory=list)
+    patch: Optional[List[Dict[str, Any]]] = None
+    base_revision: Optional[int] = None
     team_messages: List[Dict[str, Any]] = Field(default_factory=list)
     achievements: List[Dict[str, Any]] = Field(default_factory=list)
     ai_advice: Optional[Dict[str, Any]] = None
     sound_effect: Optional[Dict[str, Any]] = None
+    query_result: Optional[Dict[str, Any]] = None
 
 # Evaluation Result
 class EvaluationResult(BaseModel):
@@ -204,7 +291,7 @@ class EvaluationResult(BaseModel):
     ending_description: str
     metrics: Dict[str, float]
     attacker_interaction_score: float
-    hidden_objective_score: float
+    hidden_objective_score: Optional[float] = None
     recommendations: List[str]
     time_to_detection: Optional[float] = None
     time_to_containment: Optional[float] = None
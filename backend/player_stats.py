@@ -0,0 +1,75 @@
+from typing import List, Dict, Any, Optional
+from datetime import datetime, timezone
+from models import SimulationSession
+
+
+class PlayerStats:
+    """Career totals per user and a top-N leaderboard per scenario.
+
+    Both are updated with one atomic upsert each when a session completes, so
+    reads never touch ``simulation_sessions``. A leaderboard is a single
+    document whose ``entries`` array MongoDB keeps sorted and truncated
+    (``$push`` with ``$sort`` and ``$slice``); each entry is one completed run.
+    """
+
+    def __init__(self, user_stats, leaderboards, leaderboard_size: int = 100):
+        self.user_stats = user_stats
+        self.leaderboards = leaderboards
+        self.leaderboard_size = leaderboard_size
+
+    async def setup(self):
+        await self.user_stats.create_index("user_id", unique=True)
+        await self.leaderboards.create_index("scenario_id", unique=True)
+
+    async def record(self, session: SimulationSession, achievements: List[Dict[str, Any]]):
+        """Fold a just-completed session and the achievements it earned into the totals"""
+        score = session.final_score or 0.0
+        completed_at = (session.end_time or datetime.now(timezone.utc)).isoformat()
+        points = sum(achievement.get("points", 0) for achievement in achievements)
+
+        await self.user_stats.update_one(
+            {"user_id": session.user_id},
+            {
+                "$inc": {"sessions_completed": 1, "score_sum": score, "total_points": points},
+                "$max": {"best_score": score, f"best_by_scenario.{session.scenario_id}": score},
+                "$addToSet": {"achievements": {"$each": [a["id"] for a in achievements]}},
+                "$set": {"last_completed_at": completed_at},
+            },
+            upsert=True
+        )
+        await self.leaderboards.update_one(
+            {"scenario_id": session.scenario_id},
+            {"$push": {"entries": {
+                "$each": [{
+                    "user_id": session.user_id,
+                    "session_id": session.id,
+                    "score": score,
+                    "completed_at": completed_at,
+                }],
+                # Ties go to whoever got there first
+                "$sort": {"score": -1, "completed_at": 1},
+                "$slice": self.leaderboard_size,
+            }}},
+            upsert=True
+        )
+
+    async def get_user(self, user_id: str) -> Optional[Dict[str, Any]]:
+        doc = await self.user_stats.find_one({"user_id": user_id})
+        if doc is None:
+            return None
+        completed = doc.get("sessions_completed", 0)
+        return {
+            "user_id": user_id,
+            "sessions_completed": completed,
+            "total_points": doc.get("total_points", 0),
+            "best_score": doc.get("best_score"),
+            "average_score": round(doc.get("score_sum", 0.0) / completed, 2) if completed else None,
+            "best_by_scenario": doc.get("best_by_scenario", {}),
+            "achievements": doc.get("achievements", []),
+            "last_completed_at": doc.get("last_completed_at"),
+        }
+
+    async def leaderboard(self, scenario_id: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        doc = await self.leaderboards.find_one({"scenario_id": scenario_id})
+        entries = (doc or {}).get("entries", [])[:limit]
+        return [{"position": i + 1, **entry} for i, entry in enumerate(entries)]
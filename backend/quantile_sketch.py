@@ -0,0 +1,179 @@
+from typing import List, Dict, Any, Optional, Tuple
+import asyncio
+import math
+
+
+class TDigest:
+    """Merging t-digest (Dunning & Ertl) for streaming quantile estimates.
+
+    Values are buffered and periodically merged into at most ~`compression`
+    weighted centroids, sized by the k1 scale function so they stay small near
+    the tails where rank accuracy matters most. Memory is bounded no matter how
+    many values are added.
+    """
+
+    def __init__(
+        self,
+        compression: float = 100,
+        means: Optional[List[float]] = None,
+        weights: Optional[List[float]] = None,
+        min: Optional[float] = None,
+        max: Optional[float] = None
+    ):
+        self.compression = compression
+        self.means = list(means or [])
+        self.weights = list(weights or [])
+        self.min = min
+        self.max = max
+        self._buffer: List[Tuple[float, float]] = []
+        self._buffer_size = int(compression) * 5
+
+    @property
+    def count(self) -> float:
+        return sum(self.weights) + sum(w for _, w in self._buffer)
+
+    def _k(self, q: float) -> float:
+        return self.compression / (2 * math.pi) * math.asin(2 * min(max(q, 0.0), 1.0) - 1)
+
+    def add(self, value: float, weight: float = 1.0):
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        self._buffer.append((value, weight))
+        if len(self._buffer) >= self._buffer_size:
+            self._compress()
+
+    def _compress(self):
+        if not self._buffer:
+            return
+        items = sorted(list(zip(self.means, self.weights)) + self._buffer)
+        self._buffer = []
+        total = sum(w for _, w in items)
+
+        means, weights = [], []
+        mean, weight = items[0]
+        merged = 0.0
+        k_limit = self._k(0.0) + 1
+        for value, w in items[1:]:
+            if self._k((merged + weight + w) / total) <= k_limit:
+                weight += w
+                mean += (value - mean) * w / weight
+            else:
+                means.append(mean)
+                weights.append(weight)
+                merged += weight
+                k_limit = self._k(merged / total) + 1
+                mean, weight = value, w
+        means.append(mean)
+        weights.append(weight)
+        self.means, self.weights = means, weights
+
+    def cdf(self, value: float) -> Optional[float]:
+        """Estimated fraction of added values at or below `value` (ties count half)"""
+        self._compress()
+        total = sum(self.weights)
+        if not total:
+            return None
+        if value < self.min:
+            return 0.0
+        if value > self.max:
+            return 1.0
+        # Piecewise-linear through each centroid's midpoint rank; at and beyond the outer
+        # centroids the rank stays at their midpoint, so min and max count half too
+        prev_x, prev_rank, cumulative = None, 0.0, 0.0
+        tied = None  # weight below the centroids whose mean equals `value`
+        for mean, weight in zip(self.means, self.weights):
+            if mean == value:
+                tied = cumulative if tied is None else tied
+                cumulative += weight
+                continue
+            if tied is not None:
+                break
+            rank = cumulative + weight / 2
+            if value < mean:
+                if prev_x is None:
+                    return rank / total
+                return (prev_rank + (rank - prev_rank) * (value - prev_x) / (mean - prev_x)) / total
+            prev_x, prev_rank = mean, rank
+            cumulative += weight
+        if tied is not None:
+            return (tied + cumulative) / 2 / total
+        return prev_rank / total
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimated value at quantile `q` (0-1)"""
+        self._compress()
+        total = sum(self.weights)
+        if not total:
+            return None
+        target = min(max(q, 0.0), 1.0) * total
+        prev_x, prev_rank, cumulative = self.min, 0.0, 0.0
+        for mean, weight in zip(self.means, self.weights):
+            rank = cumulative + weight / 2
+            if target < rank:
+                return prev_x + (mean - prev_x) * (target - prev_rank) / (rank - prev_rank)
+            prev_x, prev_rank = mean, rank
+            cumulative += weight
+        if total > prev_rank:
+            return prev_x + (self.max - prev_x) * (target - prev_rank) / (total - prev_rank)
+        return self.max
+
+    def to_dict(self) -> Dict[str, Any]:
+        self._compress()
+        return {
+            "compression": self.compression,
+            "means": self.means,
+            "weights": self.weights,
+            "min": self.min,
+            "max": self.max,
+        }
+
+    @classmethod
+    def from_dict(cls, doc: Dict[str, Any]) -> "TDigest":
+        return cls(doc.get("compression", 100), doc.get("means"), doc.get("weights"), doc.get("min"), doc.get("max"))
+
+
+class ScoreSketches:
+    """Per-scenario t-digests of final scores, cached in memory and persisted after each update"""
+
+    def __init__(self, collection, compression: float = 100):
+        self.collection = collection
+        self.compression = compression
+        self.digests: Dict[str, TDigest] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    async def setup(self):
+        await self.collection.create_index("scenario_id", unique=True)
+
+    async def _digest(self, scenario_id: str) -> TDigest:
+        digest = self.digests.get(scenario_id)
+        if digest is None:
+            doc = await self.collection.find_one({"scenario_id": scenario_id})
+            # Another coroutine may have loaded it while we waited
+            digest = self.digests.setdefault(
+                scenario_id, TDigest.from_dict(doc) if doc else TDigest(self.compression)
+            )
+        return digest
+
+    async def add(self, scenario_id: str, score: float):
+        lock = self._locks.setdefault(scenario_id, asyncio.Lock())
+        async with lock:
+            digest = await self._digest(scenario_id)
+            digest.add(score)
+            await self.collection.update_one(
+                {"scenario_id": scenario_id},
+                {"$set": {**digest.to_dict(), "count": int(digest.count)}},
+                upsert=True
+            )
+
+    async def percentile(self, scenario_id: str, score: float) -> Optional[Dict[str, Any]]:
+        """Where `score` falls among the scenario's completed sessions"""
+        digest = await self._digest(scenario_id)
+        fraction = digest.cdf(score)
+        if fraction is None:
+            return None
+        return {
+            "score": round(score, 2),
+            "percentile": round(fraction * 100, 1),
+            "top_percent": round(max(100 - fraction * 100, 0.1), 1),
+            "sample_size": int(digest.count),
+        }
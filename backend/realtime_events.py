@@ -1,12 +1,13 @@
 from typing import List, Dict, Any
 import random
 from datetime import datetime, timezone
-from models import Alert, AlertSeverity
+from achievements import AchievementEngine
 
 class RealtimeEventGenerator:
     """Generates realistic real-time events during simulation"""
     
     def __init__(self):
+        self._achievements = AchievementEngine()
         self.pressure_messages = [
             {
                 "sender": "CEO",
@@ -74,28 +75,8 @@ class RealtimeEventGenerator:
             }
         ]
         
+        # Alerts come from the detection rules in rules/; these are operational noise
         self.random_events = [
-            {
-                "type": "alert",
-                "title": "New Suspicious Process Detected",
-                "description": "Process 'svchost.exe' spawned from unusual location",
-                "severity": "high",
-                "probability": 0.3
-            },
-            {
-                "type": "alert",
-                "title": "Unusual Network Traffic",
-                "description": "Large data transfer detected to unknown IP",
-                "severity": "critical",
-                "probability": 0.2
-            },
-            {
-                "type": "alert",
-                "title": "Failed Login Attempts Surge",
-                "description": "300+ failed login attempts in last 5 minutes",
-                "severity": "high",
-                "probability": 0.25
-            },
             {
                 "type": "system",
                 "message": "Backup system automatically triggered",
@@ -110,11 +91,11 @@ class RealtimeEventGenerator:
             }
         ]
     
-    def get_pressure_message(self, simulation_time: float) -> Dict[str, Any]:
-        """Get pressure message based on simulation time"""
-        for msg in self.pressure_messages:
+    def get_pressure_message(self, simulation_time: float, schedule: List[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Get pressure message based on simulation time, from the scenario schedule if it has one"""
+        for msg in schedule or self.pressure_messages:
             if abs(simulation_time - msg["trigger_time"]) < 0.5:
-                return msg
+                return dict(msg)
         return None
     
     def get_random_team_message(self) -> Dict[str, Any]:
@@ -130,54 +111,6 @@ class RealtimeEventGenerator:
                 return event
         return None
     
-    def create_alert_from_event(self, event: Dict) -> Alert:
-        """Create Alert from event"""
-        return Alert(
-            title=event["title"],
-            description=event["description"],
-            severity=AlertSeverity(event["severity"]),
-            source="Real-time Detection",
-            indicators=["Dynamic event", "Real-time"]
-        )
-    
-    def get_achievement(self, metrics: Dict[str, float], actions_count: int) -> Dict[str, Any]:
-        """Check and return achievements"""
-        achievements = []
-        
-        # Speed achievements
-        if actions_count >= 5 and metrics.get("responseTime", 0) > 90:
-            achievements.append({
-                "id": "speed_demon",
-                "title": "⚡ سرعة البرق",
-                "description": "استجابة فائقة السرعة!",
-                "points": 50
-            })
-        
-        # Accuracy achievements
-        if metrics.get("responseAccuracy", 0) >= 95:
-            achievements.append({
-                "id": "sharpshooter",
-                "title": "🎯 دقة عالية",
-                "description": "دقة استجابة 95%+",
-                "points": 75
-            })
-        
-        # Forensics achievements
-        if metrics.get("forensicPreservation", 0) >= 90:
-            achievements.append({
-                "id": "evidence_master",
-                "title": "🔍 خبير الأدلة",
-                "description": "حفظ ممتاز للأدلة الجنائية",
-                "points": 60
-            })
-        
-        # Risk management achievements
-        if metrics.get("riskManagement", 0) >= 90:
-            achievements.append({
-                "id": "risk_ninja",
-                "title": "🛡️ ماستر الحماية",
-                "description": "إدارة مخاطر متقنة",
-                "points": 70
-            })
-        
-        return achievements
+    def get_achievement(self, metrics: Dict[str, float], actions_count: int) -> List[Dict[str, Any]]:
+        """Achievements whose conditions hold now (see achievements.ACHIEVEMENTS)"""
+        return self._achievements.held(metrics, actions_count)
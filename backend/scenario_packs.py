@@ -0,0 +1,199 @@
+from typing import List, Dict, Any, Optional
+from datetime import datetime, timezone
+from pathlib import Path
+from types import MappingProxyType
+import hashlib
+import json
+import logging
+import os
+import pickle
+import uuid
+from pydantic import ValidationError
+from models import Scenario, SimulationSession
+from attack_graph import AttackGraph, compile_graph
+from topology import HostState, Topology, compile_topology
+
+try:
+    import yaml
+except ImportError:  # YAML packs are optional
+    yaml = None
+
+logger = logging.getLogger(__name__)
+
+PACK_EXTENSIONS = (".json", ".yml", ".yaml")
+# Optional pack files and the Scenario field each one populates
+PACK_PARTS = {
+    "objectives": "attacker_objectives",
+    "alerts": "initial_alerts",
+    "events": "event_schedule",
+    "attack_graph": "attack_graph",
+    "topology": "topology",
+}
+
+
+class ScenarioPackError(ValueError):
+    """Raised when a scenario pack is missing files or fails validation"""
+
+
+class SessionTemplate:
+    """Immutable, pre-serialized starting point for sessions of one scenario"""
+
+    __slots__ = ("scenario", "content_hash", "_prototype", "event_schedule", "attack_graph", "topology")
+
+    def __init__(self, scenario: Scenario, content_hash: str):
+        self.scenario = scenario
+        self.content_hash = content_hash
+        self.attack_graph: AttackGraph = compile_graph(scenario.attack_graph)
+        self.topology: Topology = compile_topology(scenario.topology)
+        self.event_schedule = tuple(
+            MappingProxyType(dict(event))
+            for event in sorted(scenario.event_schedule, key=lambda e: e.get("trigger_time", 0))
+        )
+
+        prototype = SimulationSession(scenario_id=scenario.id)
+        prototype.alerts = list(scenario.initial_alerts)
+        graph = self.attack_graph
+        prototype.attacker_state.technique = graph.ids[graph.entry]
+        prototype.attacker_state.current_phase = graph.phases[graph.entry]
+        prototype.attacker_state.reachable_objectives = graph.reachable_objectives(graph.entry, 0, [])
+        prototype.system_state.network_segment_isolated = {name: False for name in self.topology.segment_names}
+        HostState.initial(self.topology).store(prototype.system_state)
+        doc = prototype.model_dump()
+        # Per-session fields are filled in by new_session()
+        for key in ("id", "user_id", "start_time"):
+            doc.pop(key)
+        self._prototype = pickle.dumps(doc, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def new_session(self, user_id: str = "guest", **fields) -> Dict[str, Any]:
+        """Clone the template into a new session document ready to insert"""
+        doc = pickle.loads(self._prototype)
+        now = datetime.now(timezone.utc)
+        for alert in doc["alerts"]:
+            alert["id"] = str(uuid.uuid4())
+            alert["timestamp"] = now
+        doc["id"] = str(uuid.uuid4())
+        doc["user_id"] = user_id
+        doc["start_time"] = doc["last_activity"] = now.isoformat()
+        doc.update(fields)
+        return doc
+
+
+class ScenarioRegistry:
+    """Scenario packs loaded from disk, validated once and compiled into templates.
+
+    A pack is a directory holding ``scenario.json`` (or ``.yml``) and optional
+    ``objectives``, ``alerts``, ``events``, ``attack_graph`` and ``topology`` files. ``reload()`` hashes each
+    pack's files and recompiles only the packs whose content changed.
+    """
+
+    def __init__(self, root: Optional[Path] = None):
+        self.root = Path(root or os.environ.get("SCENARIO_PACKS_DIR", Path(__file__).parent / "scenarios"))
+        self.templates: Dict[str, SessionTemplate] = {}
+        self._pack_hashes: Dict[str, str] = {}
+        self._pack_ids: Dict[str, str] = {}
+
+    def _read(self, path: Path) -> Any:
+        with open(path, "r", encoding="utf-8") as f:
+            if path.suffix == ".json":
+                return json.load(f)
+            if yaml is None:
+                raise ScenarioPackError(f"{path.name}: PyYAML is required for YAML packs")
+            try:
+                return yaml.safe_load(f)
+            except yaml.YAMLError as e:
+                raise ScenarioPackError(f"{path.name}: {e}")
+
+    def _pack_files(self, pack_dir: Path) -> Dict[str, Path]:
+        files = {}
+        for path in sorted(pack_dir.iterdir()):
+            if path.is_file() and path.suffix in PACK_EXTENSIONS:
+                if path.stem in files:
+                    raise ScenarioPackError(f"{pack_dir.name}: duplicate '{path.stem}' files")
+                files[path.stem] = path
+        return files
+
+    @staticmethod
+    def _hash(files: Dict[str, Path]) -> str:
+        digest = hashlib.sha256()
+        for stem, path in files.items():
+            digest.update(stem.encode("utf-8"))
+            digest.update(path.read_bytes())
+        return digest.hexdigest()
+
+    def compile_pack(self, pack_dir: Path, files: Dict[str, Path], content_hash: str) -> SessionTemplate:
+        """Validate a pack into a Scenario and compile its session template"""
+        if "scenario" not in files:
+            raise ScenarioPackError(f"{pack_dir.name}: missing scenario file")
+        data = self._read(files["scenario"])
+        if not isinstance(data, dict):
+            raise ScenarioPackError(f"{pack_dir.name}: scenario file must be a mapping")
+        data.setdefault("id", pack_dir.name)
+        for stem, field in PACK_PARTS.items():
+            if stem in files:
+                data[field] = self._read(files[stem])
+        try:
+            scenario = Scenario(**data)
+        except ValidationError as e:
+            raise ScenarioPackError(f"{pack_dir.name}: {e}")
+        return SessionTemplate(scenario, content_hash)
+
+    def compile_scenario(self, scenario: Dict[str, Any]) -> SessionTemplate:
+        """Compile a scenario stored outside the packs (e.g. created through the API).
+
+        The template is reused while the stored document is unchanged; packs take precedence.
+        """
+        content_hash = hashlib.sha256(json.dumps(scenario, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+        cached = self.templates.get(scenario.get("id"))
+        if cached is not None and (cached.content_hash == content_hash or self.is_pack(cached.scenario.id)):
+            return cached
+        template = SessionTemplate(Scenario(**scenario), content_hash)
+        self.templates[template.scenario.id] = template
+        return template
+
+    def reload(self) -> Dict[str, List[str]]:
+        """Recompile changed packs and drop removed ones"""
+        changes = {"added": [], "updated": [], "removed": [], "failed": []}
+        seen = set()
+        pack_dirs = sorted(p for p in self.root.iterdir() if p.is_dir()) if self.root.is_dir() else []
+
+        for pack_dir in pack_dirs:
+            key = pack_dir.name
+            seen.add(key)
+            try:
+                files = self._pack_files(pack_dir)
+                content_hash = self._hash(files)
+                if self._pack_hashes.get(key) == content_hash:
+                    continue
+                template = self.compile_pack(pack_dir, files, content_hash)
+            except (ScenarioPackError, ValueError, OSError) as e:
+                # Keep serving the last good version of a pack that fails to load
+                logger.error("Scenario pack %s failed to load: %s", key, e)
+                changes["failed"].append(key)
+                continue
+
+            previous_id = self._pack_ids.get(key)
+            if previous_id and previous_id != template.scenario.id:
+                self.templates.pop(previous_id, None)
+            changes["updated" if key in self._pack_hashes else "added"].append(template.scenario.id)
+            self.templates[template.scenario.id] = template
+            self._pack_hashes[key] = content_hash
+            self._pack_ids[key] = template.scenario.id
+
+        for key in list(self._pack_hashes):
+            if key not in seen:
+                self.templates.pop(self._pack_ids.pop(key), None)
+                del self._pack_hashes[key]
+                changes["removed"].append(key)
+
+        return changes
+
+    def packs(self) -> List[Scenario]:
+        """Scenarios defined by packs on disk"""
+        pack_ids = set(self._pack_ids.values())
+        return [t.scenario for sid, t in self.templates.items() if sid in pack_ids]
+
+    def is_pack(self, scenario_id: str) -> bool:
+        return scenario_id in self._pack_ids.values()
+
+    def get(self, scenario_id: str) -> Optional[SessionTemplate]:
+        return self.templates.get(scenario_id)
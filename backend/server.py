@@ -1,35 +1,107 @@
-from fastapi import FastAPI, APIRouter, HTTPException
+from fastapi import FastAPI, APIRouter, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
 import os
+import asyncio
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field, ConfigDict
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import uuid
+import json
+import time
+import zlib
 from datetime import datetime, timezone
 
 # Import simulation models and engine
 from models import (
     Scenario, ScenarioCreate, SimulationSession, SimulationSessionCreate,
+    BulkSessionCreate, BulkSessionStartResponse,
     CommandExecutionRequest, CommandExecutionResponse, EvaluationResult,
     Alert, AlertSeverity, AttackerPhase, SimulationStatus
 )
 from simulation_engine import SimulationEngine
+from telemetry import TelemetryStream
+from cohort_live import CohortAggregator
+from session_pins import SessionPins
+from state_delta import StateHistory
+from session_forks import SessionForks, compare_evaluations, diverged_at
+from write_behind import WriteBehindCache
+from session_reaper import SessionReaper, OPEN_STATUSES
+from session_analytics import SessionAnalytics
+from player_stats import PlayerStats
+from quantile_sketch import ScoreSketches
+from response_encoding import encode_response, dump_model, dumps_json, dumps_msgpack, loads_msgpack
+from storage import open_storage
 
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+# Session and scenario storage: MongoDB, SQLite or in-memory, chosen by STORAGE_BACKEND
+storage = open_storage()
 
 # Initialize simulation engine
 sim_engine = SimulationEngine()
 
+# Live cohort aggregates, maintained from engine events
+cohorts = CohortAggregator()
+sim_engine.events.subscribe(cohorts.on_engine_event)
+
+# Sessions held in memory by open WebSocket command channels
+session_pins = SessionPins()
+sim_engine.events.subscribe(session_pins.on_engine_event)
+WS_FLUSH_SECONDS = float(os.environ.get('WS_FLUSH_SECONDS', '2'))
+WS_OUTBOX_SIZE = 256
+
+# Session exports are sent in chunks of about this many bytes
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+# Recent state per session, so command responses can be patches against the client's revision
+state_history = StateHistory()
+
+# What-if forks of sessions, held in memory only and dropped FORK_TTL_MINUTES after their last use
+session_forks = SessionForks(
+    max_forks=int(os.environ.get('MAX_FORKS', '1000')),
+    ttl_seconds=float(os.environ.get('FORK_TTL_MINUTES', '60')) * 60,
+    on_dropped=lambda fork_id: _on_fork_dropped(fork_id)
+)
+
+# Optional write-behind persistence: commands mark cached sessions dirty and a
+# background task group-commits them every WRITE_BEHIND_SECONDS
+write_behind = WriteBehindCache(
+    lambda sessions: _write_sessions(sessions),
+    window_seconds=float(os.environ.get('WRITE_BEHIND_SECONDS', '0.5')),
+    max_batch=int(os.environ.get('WRITE_BEHIND_MAX_BATCH', '500'))
+) if os.environ.get('WRITE_BEHIND', '').lower() in ('1', 'true', 'yes') else None
+
+# Per-scenario and per-cohort aggregates, updated as sessions complete
+analytics = SessionAnalytics(storage.collection("scenario_analytics"))
+
+# Career totals per user and the best LEADERBOARD_SIZE runs per scenario
+player_stats = PlayerStats(
+    storage.collection("user_stats"),
+    storage.collection("leaderboards"),
+    leaderboard_size=int(os.environ.get('LEADERBOARD_SIZE', '100'))
+)
+
+# Streaming quantile sketch of final scores per scenario, for percentile ranks
+score_sketches = ScoreSketches(storage.collection("score_sketches"))
+
+# Sessions idle for SESSION_TTL_MINUTES are expired, compacted and archived;
+# SESSION_RETENTION_DAYS later a TTL index deletes them (0 keeps them forever)
+SESSION_TTL_MINUTES = float(os.environ.get('SESSION_TTL_MINUTES', '120'))
+session_reaper = SessionReaper(
+    storage,
+    ttl_minutes=SESSION_TTL_MINUTES,
+    retention_days=float(os.environ.get('SESSION_RETENTION_DAYS', '30')),
+    interval_seconds=float(os.environ.get('SESSION_REAP_SECONDS', '60')),
+    is_pinned=lambda session_id: session_pins.get(session_id) is not None,
+    live_document=lambda session_id: _live_document(session_id),
+    on_expired=lambda doc: _on_session_expired(doc)
+) if SESSION_TTL_MINUTES > 0 else None
+
 # Create the main app without a prefix
 app = FastAPI()
 
@@ -62,13 +134,12 @@ async def create_status_check(input: StatusCheckCreate):
     doc = status_obj.model_dump()
     doc['timestamp'] = doc['timestamp'].isoformat()
     
-    _ = await db.status_checks.insert_one(doc)
+    await storage.collection("status_checks").insert_one(doc)
     return status_obj
 
 @api_router.get("/status", response_model=List[StatusCheck])
 async def get_status_checks():
-    # Exclude MongoDB's _id field from the query results
-    status_checks = await db.status_checks.find({}, {"_id": 0}).to_list(1000)
+    status_checks = [doc async for doc in storage.collection("status_checks").find({}, limit=1000)]
     
     # Convert ISO string timestamps back to datetime objects
     for check in status_checks:
@@ -83,20 +154,20 @@ async def get_status_checks():
 @api_router.get("/scenarios", response_model=List[Scenario])
 async def get_scenarios():
     """Get all available simulation scenarios"""
-    scenarios = await db.scenarios.find({}, {"_id": 0}).to_list(1000)
+    scenarios = sim_engine.scenarios.packs()
+    pack_ids = {scenario.id for scenario in scenarios}
     
-    # If no scenarios exist, create default ones
-    if not scenarios:
-        default_scenarios = _create_default_scenarios()
-        for scenario in default_scenarios:
-            scenario_dict = scenario.model_dump()
-            # Convert nested objects to dicts
-            if 'initial_alerts' in scenario_dict:
-                scenario_dict['initial_alerts'] = [alert.model_dump() if hasattr(alert, 'model_dump') else alert for alert in scenario_dict['initial_alerts']]
-            await db.scenarios.insert_one(scenario_dict)
-        scenarios = default_scenarios
-    
-    return scenarios
+    # Scenarios created through the API live in the database
+    custom = await storage.scenarios.find_all({"id": {"$nin": list(pack_ids)}}, limit=1000)
+    return scenarios + custom
+
+
+@api_router.post("/scenarios/reload")
+async def reload_scenarios():
+    """Recompile scenario packs whose files changed on disk"""
+    changes = await asyncio.to_thread(sim_engine.scenarios.reload)
+    _register_scenario_corpora()
+    return changes
 
 
 @api_router.post("/scenarios", response_model=Scenario)
@@ -105,168 +176,139 @@ async def create_scenario(scenario_input: ScenarioCreate):
     scenario = Scenario(**scenario_input.model_dump())
     scenario_dict = scenario.model_dump()
     
-    await db.scenarios.insert_one(scenario_dict)
+    await storage.scenarios.insert(scenario_dict)
     return scenario
 
 
 @api_router.post("/simulation/start", response_model=SimulationSession)
-async def start_simulation(session_input: SimulationSessionCreate):
+async def start_simulation(session_input: SimulationSessionCreate, http_request: Request):
     """Start a new simulation session"""
-    # Check if scenario exists
-    scenario = await db.scenarios.find_one({"id": session_input.scenario_id}, {"_id": 0})
-    if not scenario:
+    template = await _get_session_template(session_input.scenario_id)
+    if not template:
         raise HTTPException(status_code=404, detail="Scenario not found")
     
-    # Create new session
-    session = SimulationSession(**session_input.model_dump())
+    await _ensure_log_corpus(session_input.scenario_id)
     
-    # Load initial alerts from scenario
-    if 'initial_alerts' in scenario and scenario['initial_alerts']:
-        session.alerts = [Alert(**alert) if isinstance(alert, dict) else alert 
-                         for alert in scenario['initial_alerts']]
+    # Clone the precompiled session instead of rebuilding it from the scenario
+    session_dict = template.new_session(session_input.user_id, cohort_id=session_input.cohort_id)
+    await storage.sessions.insert(session_dict)
     
-    # Save session to database
-    session_dict = session.model_dump()
-    # Convert nested models to dicts
-    session_dict['system_state'] = session.system_state.model_dump()
-    session_dict['attacker_state'] = session.attacker_state.model_dump()
-    session_dict['alerts'] = [alert.model_dump() if hasattr(alert, 'model_dump') else alert for alert in session.alerts]
-    session_dict['commands_history'] = [cmd.model_dump() if hasattr(cmd, 'model_dump') else cmd for cmd in session.commands_history]
-    session_dict['start_time'] = session.start_time.isoformat()
-    if session.end_time:
-        session_dict['end_time'] = session.end_time.isoformat()
+    _publish_started([session_dict])
+    
+    return encode_response(http_request, session_dict)
+
+
+@api_router.post("/simulation/start_bulk", response_model=BulkSessionStartResponse)
+async def start_simulation_bulk(bulk_input: BulkSessionCreate):
+    """Start sessions for a whole class from one scenario read and one batched insert"""
+    template = await _get_session_template(bulk_input.scenario_id)
+    if not template:
+        raise HTTPException(status_code=404, detail="Scenario not found")
+    
+    await _ensure_log_corpus(bulk_input.scenario_id)
+    
+    user_ids = list(dict.fromkeys(bulk_input.user_ids))
+    docs = [template.new_session(user_id, cohort_id=bulk_input.cohort_id) for user_id in user_ids]
+    
+    # Unordered so one bad document doesn't stop the rest of the class
+    failed_indexes = await storage.sessions.insert_many(docs)
+    failed = [user_ids[i] for i in failed_indexes]
     
-    await db.simulation_sessions.insert_one(session_dict)
+    _publish_started([doc for doc in docs if doc['user_id'] not in failed])
     
-    return session
+    return BulkSessionStartResponse(
+        scenario_id=bulk_input.scenario_id,
+        session_ids={doc['user_id']: doc['id'] for doc in docs if doc['user_id'] not in failed},
+        failed=failed
+    )
 
 
 @api_router.get("/simulation/{session_id}", response_model=SimulationSession)
-async def get_simulation(session_id: str):
+async def get_simulation(session_id: str, http_request: Request):
     """Get simulation session by ID"""
-    session_dict = await db.simulation_sessions.find_one({"id": session_id}, {"_id": 0})
+    session = await _load_session(session_id)
     
-    if not session_dict:
+    if not session:
         raise HTTPException(status_code=404, detail="Simulation session not found")
     
-    # Convert ISO strings back to datetime
-    if isinstance(session_dict.get('start_time'), str):
-        session_dict['start_time'] = datetime.fromisoformat(session_dict['start_time'])
-    if session_dict.get('end_time') and isinstance(session_dict['end_time'], str):
-        session_dict['end_time'] = datetime.fromisoformat(session_dict['end_time'])
-    
-    # Convert nested dicts back to models
-    from models import SystemState, AttackerState, Alert, Command
-    if 'system_state' in session_dict and isinstance(session_dict['system_state'], dict):
-        session_dict['system_state'] = SystemState(**session_dict['system_state'])
-    if 'attacker_state' in session_dict and isinstance(session_dict['attacker_state'], dict):
-        session_dict['attacker_state'] = AttackerState(**session_dict['attacker_state'])
-    if 'alerts' in session_dict:
-        session_dict['alerts'] = [Alert(**alert) if isinstance(alert, dict) else alert for alert in session_dict['alerts']]
-    if 'commands_history' in session_dict:
-        session_dict['commands_history'] = [Command(**cmd) if isinstance(cmd, dict) else cmd for cmd in session_dict['commands_history']]
-    
-    return SimulationSession(**session_dict)
+    return encode_response(http_request, session)
 
 
 @api_router.post("/simulation/execute", response_model=CommandExecutionResponse)
-async def execute_command(request: CommandExecutionRequest):
+async def execute_command(request: CommandExecutionRequest, http_request: Request):
     """Execute a command in the simulation"""
     # Get session
-    session_dict = await db.simulation_sessions.find_one({"id": request.session_id}, {"_id": 0})
+    session = await _load_session(request.session_id)
     
-    if not session_dict:
+    if not session:
         raise HTTPException(status_code=404, detail="Simulation session not found")
+    if session.ending_type == "expired":
+        raise HTTPException(status_code=410, detail="Simulation session expired")
     
-    # Convert to session object
-    if isinstance(session_dict.get('start_time'), str):
-        session_dict['start_time'] = datetime.fromisoformat(session_dict['start_time'])
-    if session_dict.get('end_time') and isinstance(session_dict['end_time'], str):
-        session_dict['end_time'] = datetime.fromisoformat(session_dict['end_time'])
-    
-    from models import SystemState, AttackerState, Alert, Command
-    if 'system_state' in session_dict and isinstance(session_dict['system_state'], dict):
-        session_dict['system_state'] = SystemState(**session_dict['system_state'])
-    if 'attacker_state' in session_dict and isinstance(session_dict['attacker_state'], dict):
-        session_dict['attacker_state'] = AttackerState(**session_dict['attacker_state'])
-    if 'alerts' in session_dict:
-        session_dict['alerts'] = [Alert(**alert) if isinstance(alert, dict) else alert for alert in session_dict['alerts']]
-    if 'commands_history' in session_dict:
-        session_dict['commands_history'] = [Command(**cmd) if isinstance(cmd, dict) else cmd for cmd in session_dict['commands_history']]
-    
-    session = SimulationSession(**session_dict)
+    if request.command in sim_engine.investigation_queries:
+        await _ensure_log_corpus(session.scenario_id)
     
     # Execute command
     response = sim_engine.execute_command(session, request.command, request.parameters)
     
     # Update session in database
-    session_dict = session.model_dump()
-    session_dict['system_state'] = session.system_state.model_dump()
-    session_dict['attacker_state'] = session.attacker_state.model_dump()
-    session_dict['alerts'] = [alert.model_dump() if hasattr(alert, 'model_dump') else alert for alert in session.alerts]
-    session_dict['commands_history'] = [cmd.model_dump() if hasattr(cmd, 'model_dump') else cmd for cmd in session.commands_history]
-    session_dict['start_time'] = session.start_time.isoformat()
-    if session.end_time:
-        session_dict['end_time'] = session.end_time.isoformat()
-    
-    await db.simulation_sessions.update_one(
-        {"id": request.session_id},
-        {"$set": session_dict}
-    )
+    try:
+        await _save_session(session)
+    except SessionExpired:
+        raise HTTPException(status_code=410, detail="Simulation session expired")
     
-    return response
+    response = state_history.respond(session.id, response, request.since_revision)
+    return encode_response(http_request, response)
 
 
 @api_router.post("/simulation/{session_id}/complete", response_model=EvaluationResult)
 async def complete_simulation(session_id: str):
     """Complete simulation and get evaluation"""
     # Get session
-    session_dict = await db.simulation_sessions.find_one({"id": session_id}, {"_id": 0})
+    session = await _load_session(session_id)
     
-    if not session_dict:
+    if not session:
         raise HTTPException(status_code=404, detail="Simulation session not found")
-    
-    # Convert to session object
-    if isinstance(session_dict.get('start_time'), str):
-        session_dict['start_time'] = datetime.fromisoformat(session_dict['start_time'])
-    if session_dict.get('end_time') and isinstance(session_dict['end_time'], str):
-        session_dict['end_time'] = datetime.fromisoformat(session_dict['end_time'])
-    
-    from models import SystemState, AttackerState, Alert, Command
-    if 'system_state' in session_dict and isinstance(session_dict['system_state'], dict):
-        session_dict['system_state'] = SystemState(**session_dict['system_state'])
-    if 'attacker_state' in session_dict and isinstance(session_dict['attacker_state'], dict):
-        session_dict['attacker_state'] = AttackerState(**session_dict['attacker_state'])
-    if 'alerts' in session_dict:
-        session_dict['alerts'] = [Alert(**alert) if isinstance(alert, dict) else alert for alert in session_dict['alerts']]
-    if 'commands_history' in session_dict:
-        session_dict['commands_history'] = [Command(**cmd) if isinstance(cmd, dict) else cmd for cmd in session_dict['commands_history']]
-    
-    session = SimulationSession(**session_dict)
+    if session.ending_type == "expired":
+        raise HTTPException(status_code=410, detail="Simulation session expired")
     
     # Evaluate session
     evaluation = sim_engine.evaluate_session(session)
+    first_completion = session.status != SimulationStatus.COMPLETED
+    completion = {
+        "status": SimulationStatus.COMPLETED,
+        "end_time": datetime.now(timezone.utc),
+        "final_score": evaluation['final_score'],
+        "ending_type": evaluation['ending_type']
+    }
     
-    # Update session status
-    session.status = SimulationStatus.COMPLETED
-    session.end_time = datetime.now(timezone.utc)
-    session.final_score = evaluation['final_score']
-    session.ending_type = evaluation['ending_type']
-    
-    # Save updated session
-    session_dict = session.model_dump()
-    session_dict['system_state'] = session.system_state.model_dump()
-    session_dict['attacker_state'] = session.attacker_state.model_dump()
-    session_dict['alerts'] = [alert.model_dump() if hasattr(alert, 'model_dump') else alert for alert in session.alerts]
-    session_dict['commands_history'] = [cmd.model_dump() if hasattr(cmd, 'model_dump') else cmd for cmd in session.commands_history]
-    session_dict['start_time'] = session.start_time.isoformat()
-    if session.end_time:
-        session_dict['end_time'] = session.end_time.isoformat()
-    
-    await db.simulation_sessions.update_one(
-        {"id": session_id},
-        {"$set": session_dict}
-    )
+    if first_completion and session.forked_from is None:
+        # The reaper may have expired the stored session since it was loaded:
+        # only complete it if it is still open
+        completed = await storage.sessions.update(
+            session.id,
+            _session_document(session.model_copy(update=completion)),
+            where={"status": {"$in": OPEN_STATUSES}}
+        )
+        if not completed:
+            raise HTTPException(status_code=410, detail="Simulation session expired")
+        for field, value in completion.items():
+            setattr(session, field, value)
+        await analytics.record(session)
+        await player_stats.record(session, sim_engine.session_achievements(session))
+        await score_sketches.add(session.scenario_id, session.final_score)
+    else:
+        for field, value in completion.items():
+            setattr(session, field, value)
+        try:
+            await _save_session(session, durable=True)
+        except SessionExpired:
+            raise HTTPException(status_code=410, detail="Simulation session expired")
+    
+    if sim_engine.events:
+        event = sim_engine.session_snapshot(session, "session_completed")
+        event["projected_score"] = evaluation['final_score']
+        sim_engine.events.publish(event)
     
     # Return evaluation result
     return EvaluationResult(
@@ -275,6 +317,112 @@ async def complete_simulation(session_id: str):
     )
 
 
+@api_router.post("/simulation/{session_id}/fork", response_model=SimulationSession)
+async def fork_simulation(session_id: str, http_request: Request):
+    """Branch a session for what-if exploration; commands on the fork leave the original untouched"""
+    session = await _load_session(session_id)
+    
+    if not session:
+        raise HTTPException(status_code=404, detail="Simulation session not found")
+    if session.ending_type == "expired":
+        raise HTTPException(status_code=410, detail="Simulation session expired")
+    
+    fork = session_forks.add(sim_engine.fork_session(session))
+    return encode_response(http_request, fork)
+
+
+@api_router.get("/simulation/{session_id}/compare")
+async def compare_simulation(session_id: str, branches: Optional[str] = None):
+    """Evaluate a session and its forks (all live ones unless `branches` lists ids) and diff the results"""
+    session = await _load_session(session_id)
+    
+    if not session:
+        raise HTTPException(status_code=404, detail="Simulation session not found")
+    
+    if branches:
+        forks = []
+        for fork_id in branches.split(","):
+            fork = session_forks.get(fork_id.strip())
+            if fork is None:
+                raise HTTPException(status_code=404, detail=f"Fork {fork_id.strip()} not found")
+            forks.append(fork)
+    else:
+        forks = session_forks.branches(session_id)
+    
+    evaluation = sim_engine.evaluate_session(session)
+    compared = []
+    for fork in forks:
+        branch = sim_engine.evaluate_session(fork)
+        common = diverged_at(session, fork)
+        compared.append({
+            "session_id": fork.id,
+            "forked_from": fork.forked_from,
+            "forked_at": fork.forked_at,
+            # What each side did after their histories part
+            "diverged_at": common,
+            "base_commands": [cmd.command for cmd in session.commands_history[common:]],
+            "branch_commands": [cmd.command for cmd in fork.commands_history[common:]],
+            "evaluation": branch,
+            "diff": compare_evaluations(evaluation, branch)
+        })
+    
+    return {"session_id": session_id, "evaluation": evaluation, "branches": compared}
+
+
+@api_router.get("/analytics/scenarios/{scenario_id}")
+async def get_scenario_analytics(scenario_id: str, cohort_id: Optional[str] = None):
+    """Aggregates over a scenario's completed sessions, optionally for one cohort"""
+    view = await analytics.get(scenario_id, cohort_id)
+    if view is None:
+        raise HTTPException(status_code=404, detail="No completed sessions for this scenario")
+    return view
+
+
+@api_router.get("/export/sessions")
+async def export_sessions(
+    user_id: Optional[str] = None,
+    scenario_id: Optional[str] = None,
+    cohort_id: Optional[str] = None,
+    since: Optional[datetime] = None,
+    gzip: bool = False
+):
+    """Stream stored sessions, evaluation included, as NDJSON (one session per line)"""
+    flt: Dict[str, Any] = {}
+    for field, value in (("user_id", user_id), ("scenario_id", scenario_id), ("cohort_id", cohort_id)):
+        if value is not None:
+            flt[field] = value
+    if since is not None:
+        # start_time is stored as an ISO string in UTC
+        flt["start_time"] = {"$gte": (since if since.tzinfo else since.replace(tzinfo=timezone.utc)).isoformat()}
+    
+    # Commands held back by write-behind belong in the export
+    if write_behind is not None:
+        await write_behind.flush()
+    
+    async def ndjson():
+        # Documents go to orjson as stored, without model validation; lines are
+        # batched into chunks so memory stays flat whatever the export size
+        compressor = zlib.compressobj(wbits=31) if gzip else None
+        chunk = bytearray()
+        async for doc in storage.sessions.find(flt):
+            chunk += dumps_json(doc)
+            chunk += b"\n"
+            if len(chunk) >= EXPORT_CHUNK_BYTES:
+                yield compressor.compress(bytes(chunk)) if compressor else bytes(chunk)
+                chunk.clear()
+        if compressor:
+            yield compressor.compress(bytes(chunk)) + compressor.flush()
+        elif chunk:
+            yield bytes(chunk)
+    
+    filename = "sessions.ndjson.gz" if gzip else "sessions.ndjson"
+    return StreamingResponse(
+        ndjson(),
+        media_type="application/gzip" if gzip else "application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
 @api_router.get("/simulation/commands/available")
 async def get_available_commands():
     """Get list of available commands"""
@@ -283,35 +431,50 @@ async def get_available_commands():
     }
 
 
+@api_router.get("/detection/rules")
+async def get_detection_rules():
+    """Per-rule hit counts and evaluation time"""
+    return {"rules": sim_engine.detection.stats()}
+
+
+@api_router.post("/detection/rules/reload")
+async def reload_detection_rules():
+    """Reload detection rules from disk"""
+    from detection_rules import RuleError
+    try:
+        sim_engine.detection.load()
+    except RuleError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"loaded": len(sim_engine.detection.rules)}
+
+
+@api_router.get("/persistence/metrics")
+async def get_persistence_metrics():
+    """Write-behind flush lag and batch sizes, and session expiry counts"""
+    return {
+        "write_behind": write_behind.stats() if write_behind is not None else None,
+        "pinned_sessions": len(session_pins.pinned),
+        "forks": session_forks.stats(),
+        "reaper": session_reaper.stats() if session_reaper is not None else None
+    }
+
+
 @api_router.post("/simulation/{session_id}/hint")
 async def get_hint(session_id: str, difficulty: str = "medium"):
     """Get AI hint for current situation"""
     # Get session
-    session_dict = await db.simulation_sessions.find_one({"id": session_id}, {"_id": 0})
+    session = await _load_session(session_id)
     
-    if not session_dict:
+    if not session:
         raise HTTPException(status_code=404, detail="Simulation session not found")
     
-    # Convert to session object
-    if isinstance(session_dict.get('start_time'), str):
-        session_dict['start_time'] = datetime.fromisoformat(session_dict['start_time'])
-    if session_dict.get('end_time') and isinstance(session_dict['end_time'], str):
-        session_dict['end_time'] = datetime.fromisoformat(session_dict['end_time'])
-    
-    from models import SystemState, AttackerState, Alert, Command
-    if 'system_state' in session_dict and isinstance(session_dict['system_state'], dict):
-        session_dict['system_state'] = SystemState(**session_dict['system_state'])
-    if 'attacker_state' in session_dict and isinstance(session_dict['attacker_state'], dict):
-        session_dict['attacker_state'] = AttackerState(**session_dict['attacker_state'])
-    if 'alerts' in session_dict:
-        session_dict['alerts'] = [Alert(**alert) if isinstance(alert, dict) else alert for alert in session_dict['alerts']]
-    if 'commands_history' in session_dict:
-        session_dict['commands_history'] = [Command(**cmd) if isinstance(cmd, dict) else cmd for cmd in session_dict['commands_history']]
-    
-    session = SimulationSession(**session_dict)
-    
-    # Get hint from AI assistant
+    # Get hint from AI assistant; the session remembers which hints it has had
     hint = sim_engine.ai_assistant.get_hint(session, difficulty)
+    if hint["available"]:
+        try:
+            await _save_session(session)
+        except SessionExpired:
+            raise HTTPException(status_code=410, detail="Simulation session expired")
     
     return hint
 
@@ -322,7 +485,9 @@ async def get_player_rank(session_id: str):
     from advanced_features import RankingSystem
     
     # Get session
-    session_dict = await db.simulation_sessions.find_one({"id": session_id}, {"_id": 0})
+    session_dict = await storage.sessions.get(
+        session_id, {"user_id": 1, "scenario_id": 1, "metrics": 1, "final_score": 1}
+    )
     
     if not session_dict:
         raise HTTPException(status_code=404, detail="Simulation session not found")
@@ -334,56 +499,430 @@ async def get_player_rank(session_id: str):
     # Get rank
     rank = RankingSystem.get_rank(avg_score)
     
-    # Get title (would need to track across sessions in real implementation)
-    title = RankingSystem.get_title(0, 1)
+    # Title from the player's career totals
+    career = await player_stats.get_user(session_dict.get('user_id', 'guest'))
+    title = RankingSystem.get_title(
+        career["total_points"] if career else 0,
+        career["sessions_completed"] if career else 0
+    )
+    
+    # Standing among everyone who completed the scenario; sessions still in
+    # progress are placed by their projected final score
+    final_score = session_dict.get('final_score')
+    if final_score is None:
+        session = await _load_session(session_id)
+        final_score = sim_engine.project_score(session)
+    standing = await score_sketches.percentile(session_dict['scenario_id'], final_score)
     
     return {
         "rank": rank,
         "title": title,
-        "current_score": round(avg_score, 2)
+        "current_score": round(avg_score, 2),
+        "career": career,
+        "standing": standing
     }
 
 
-def _create_default_scenarios() -> List[Scenario]:
-    """Create default simulation scenarios"""
-    scenarios = []
-    
-    # Scenario 1: AWS Cloud Breach
-    scenario1 = Scenario(
-        name="اختراق بيئة AWS متطور",
-        description="هجوم APT متعدد المراحل يستهدف بيئة AWS السحابية",
-        difficulty="متقدم",
-        category="تهديدات السحابة",
-        duration_minutes=45,
-        tags=["APT", "Cloud", "AWS", "IAM"],
-        attacker_objectives=[
-            {"phase": "reconnaissance", "description": "جمع معلومات عن البنية التحتية"},
-            {"phase": "initial_access", "description": "الوصول الأولي عبر حساب IAM مخترق"},
-            {"phase": "privilege_escalation", "description": "رفع الصلاحيات للوصول للموارد الحساسة"},
-            {"phase": "lateral_movement", "description": "الانتقال الجانبي بين الخدمات"},
-            {"phase": "data_exfiltration", "description": "سرقة البيانات من S3"},
-        ],
-        initial_alerts=[
-            Alert(
-                title="Unusual IAM Activity",
-                description="Multiple failed authentication attempts from unknown IP",
-                severity=AlertSeverity.HIGH,
-                source="CloudTrail",
-                indicators=["Unknown IP: 45.123.45.67", "15 failed attempts", "Off-hours activity"]
-            ),
-            Alert(
-                title="S3 Bucket Policy Modified",
-                description="Suspicious modification to S3 bucket policy",
-                severity=AlertSeverity.MEDIUM,
-                source="CloudTrail",
-                indicators=["Bucket: prod-data-backup", "Policy: Public access enabled"]
-            )
-        ],
-        hidden_objective="الحفاظ على الأدلة الجنائية الكاملة مع استمرارية الأعمال بنسبة 85%"
+@api_router.get("/users/{user_id}/stats")
+async def get_user_stats(user_id: str):
+    """Career totals across a user's completed sessions"""
+    stats = await player_stats.get_user(user_id)
+    if stats is None:
+        raise HTTPException(status_code=404, detail="No completed sessions for this user")
+    return stats
+
+
+@api_router.get("/leaderboard/{scenario_id}")
+async def get_leaderboard(scenario_id: str, limit: int = 10):
+    """Best completed runs of a scenario"""
+    return {
+        "scenario_id": scenario_id,
+        "entries": await player_stats.leaderboard(scenario_id, max(1, limit))
+    }
+
+
+@api_router.get("/cohorts/{cohort_id}/live")
+async def get_cohort_live(cohort_id: str, request: Request, stream: bool = True, interval: float = 2.0, laggards: int = 5):
+    """Live aggregate view of a cohort, streamed as Server-Sent Events"""
+    view = cohorts.view(cohort_id)
+    if cohort_id not in cohorts.seeded:
+        # First look at this cohort since startup: seed once from stored sessions,
+        # even if live events from some members already created its view
+        docs = await storage.sessions.find_all(
+            {"cohort_id": cohort_id},
+            {"alerts": 0, "attacker_actions": 0}
+        )
+        if not docs and view is None:
+            raise HTTPException(status_code=404, detail="Cohort not found")
+        view = cohorts.seed(cohort_id, docs, _snapshot_from_document)
+    
+    if not stream:
+        return view.snapshot(laggards)
+    
+    interval = max(0.5, interval)
+    
+    async def event_source():
+        last_version = None
+        while not await request.is_disconnected():
+            if view.version != last_version:
+                last_version = view.version
+                yield f"data: {json.dumps(view.snapshot(laggards))}\n\n"
+            await asyncio.sleep(interval)
+    
+    return StreamingResponse(event_source(), media_type="text/event-stream")
+
+
+@app.websocket("/ws/simulation/{session_id}")
+async def simulation_channel(websocket: WebSocket, session_id: str, encoding: str = "json"):
+    """Command channel that keeps the session pinned in memory while open.
+    
+    Client messages are compact JSON text frames, or MessagePack binary frames:
+    {"c": command, "p": parameters, "i": id, "v": since_revision}. Replies are MessagePack
+    binary frames when connected with ?encoding=msgpack, JSON text frames otherwise.
+    The server sends {"t": "s", "s": session} once on connect, {"t": "r", "i": id, "r": response}
+    for each command, {"t": "err", "i": id, "detail": ...} for malformed messages, and
+    {"t": "e", "e": event} for engine events on this session raised elsewhere.
+    """
+    await websocket.accept()
+    entry = await session_pins.acquire(session_id, _load_session)
+    if entry is None:
+        await websocket.close(code=4404, reason="Simulation session not found")
+        return
+    if entry.session.ending_type == "expired":
+        await session_pins.release(session_id, _write_session)
+        await websocket.close(code=4410, reason="Simulation session expired")
+        return
+    
+    outbox: asyncio.Queue = asyncio.Queue(maxsize=WS_OUTBOX_SIZE)
+    use_msgpack = encoding == "msgpack"
+    executing = False
+    
+    def on_event(event: Dict[str, Any]):
+        # This channel's own commands are answered directly
+        if executing:
+            return
+        try:
+            outbox.put_nowait({"t": "e", "e": event})
+        except asyncio.QueueFull:
+            pass  # a client that can't keep up misses events, never replies
+    
+    async def sender():
+        while True:
+            message = await outbox.get()
+            if use_msgpack:
+                await websocket.send_bytes(dumps_msgpack(message))
+            else:
+                await websocket.send_text(dumps_json(message).decode("utf-8"))
+    
+    async def flusher():
+        while True:
+            await asyncio.sleep(WS_FLUSH_SECONDS)
+            try:
+                await session_pins.flush(entry, _write_session)
+            except SessionExpired:
+                entry.dirty = False
+                await websocket.close(code=4410, reason="Simulation session expired")
+                return
+            except Exception:
+                logger.exception("Flushing pinned session %s failed", session_id)
+    
+    entry.listeners.add(on_event)
+    tasks = [asyncio.create_task(sender()), asyncio.create_task(flusher())]
+    try:
+        await _ensure_log_corpus(entry.session.scenario_id)
+        await outbox.put({"t": "s", "s": dump_model(entry.session, use_msgpack)})
+        while True:
+            frame = await websocket.receive()
+            if frame["type"] == "websocket.disconnect":
+                break
+            message = None
+            try:
+                if frame.get("bytes") is not None:
+                    message = loads_msgpack(frame["bytes"])
+                else:
+                    message = json.loads(frame["text"])
+                command = message["c"]
+                parameters = message.get("p") or {}
+                since_revision = message.get("v")
+                if not isinstance(command, str) or not isinstance(parameters, dict):
+                    raise TypeError
+            except (ValueError, KeyError, TypeError, AttributeError):
+                request_id = message.get("i") if isinstance(message, dict) else None
+                await outbox.put({"t": "err", "i": request_id, "detail": 'Expected {"c": command, "p": {...}}'})
+                continue
+            
+            executing = True
+            try:
+                response = sim_engine.execute_command(entry.session, command, parameters)
+            finally:
+                executing = False
+            entry.dirty = True
+            response = state_history.respond(session_id, response, since_revision if isinstance(since_revision, int) else None)
+            await outbox.put({"t": "r", "i": message.get("i"), "r": dump_model(response, use_msgpack)})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        entry.listeners.discard(on_event)
+        for task in tasks:
+            task.cancel()
+        try:
+            await session_pins.release(session_id, _write_session)
+        except SessionExpired:
+            pass
+
+
+def _session_from_document(session_dict: Dict[str, Any]) -> SimulationSession:
+    """Rebuild a session model from its stored document"""
+    # Convert ISO strings back to datetime
+    if isinstance(session_dict.get('start_time'), str):
+        session_dict['start_time'] = datetime.fromisoformat(session_dict['start_time'])
+    if session_dict.get('end_time') and isinstance(session_dict['end_time'], str):
+        session_dict['end_time'] = datetime.fromisoformat(session_dict['end_time'])
+    if isinstance(session_dict.get('last_activity'), str):
+        session_dict['last_activity'] = datetime.fromisoformat(session_dict['last_activity'])
+    
+    # Convert nested dicts back to models
+    from models import SystemState, AttackerState, Alert, Command
+    if 'system_state' in session_dict and isinstance(session_dict['system_state'], dict):
+        session_dict['system_state'] = SystemState(**session_dict['system_state'])
+    if 'attacker_state' in session_dict and isinstance(session_dict['attacker_state'], dict):
+        session_dict['attacker_state'] = AttackerState(**session_dict['attacker_state'])
+    if 'alerts' in session_dict:
+        session_dict['alerts'] = [Alert(**alert) if isinstance(alert, dict) else alert for alert in session_dict['alerts']]
+    if 'commands_history' in session_dict:
+        session_dict['commands_history'] = [Command(**cmd) if isinstance(cmd, dict) else cmd for cmd in session_dict['commands_history']]
+    
+    return SimulationSession(**session_dict)
+
+
+def _session_document(session: SimulationSession) -> Dict[str, Any]:
+    """Serialize a session for storage"""
+    session_dict = session.model_dump()
+    session_dict['start_time'] = session.start_time.isoformat()
+    session_dict['last_activity'] = session.last_activity.isoformat()
+    if session.end_time:
+        session_dict['end_time'] = session.end_time.isoformat()
+    # Lets bulk rescoring skip loading the action list itself
+    session_dict['attacker_action_count'] = len(session.attacker_actions)
+    return session_dict
+
+
+async def _read_session(session_id: str):
+    """Load a session from storage, bypassing pinned copies"""
+    session_dict = await storage.sessions.get(session_id)
+    return _session_from_document(session_dict) if session_dict else None
+
+
+class SessionExpired(Exception):
+    """The stored session was expired by the reaper after this copy of it was loaded"""
+
+
+def _writable_statuses(session: SimulationSession) -> List[str]:
+    """Stored statuses a live copy may overwrite: an open copy only an open session, never an expired one"""
+    if session.status in OPEN_STATUSES:
+        return OPEN_STATUSES
+    return OPEN_STATUSES + [SimulationStatus.COMPLETED.value]
+
+
+async def _write_session(session: SimulationSession):
+    written = await storage.sessions.update(
+        session.id, _session_document(session),
+        where={"status": {"$in": _writable_statuses(session)}}
+    )
+    if not written:
+        _forget_session(session.id)
+        raise SessionExpired(session.id)
+
+
+async def _write_sessions(sessions: List[SimulationSession]):
+    """Group commit for the write-behind cache; sessions expired meanwhile are dropped, not written"""
+    groups: Dict[tuple, List[SimulationSession]] = {}
+    for session in sessions:
+        groups.setdefault(tuple(_writable_statuses(session)), []).append(session)
+    for statuses, group in groups.items():
+        expired = await storage.sessions.update_many(
+            [(session.id, _session_document(session)) for session in group],
+            where={"status": {"$in": list(statuses)}}
+        )
+        for session_id in expired:
+            logger.warning("Dropped write-behind copy of expired session %s", session_id)
+            _forget_session(session_id)
+
+
+async def _load_session(session_id: str):
+    """The live copy of a session: a fork, pinned by a WebSocket channel, write-behind cached, or from storage"""
+    fork = session_forks.get(session_id)
+    if fork is not None:
+        return fork
+    entry = session_pins.get(session_id)
+    if entry is not None:
+        return entry.session
+    if write_behind is not None:
+        session = write_behind.get(session_id)
+        if session is None:
+            session = await _read_session(session_id)
+            if session is not None:
+                session = write_behind.put(session)
+        return session
+    return await _read_session(session_id)
+
+
+def _live_document(session_id: str):
+    """Storage document for the write-behind cached copy of a session, if any"""
+    session = write_behind.get(session_id) if write_behind is not None else None
+    return _session_document(session) if session is not None else None
+
+
+def _forget_session(session_id: str):
+    """Drop every in-memory trace of an expired session"""
+    if write_behind is not None:
+        write_behind.evict(session_id)
+    state_history.forget(session_id)
+    sim_engine.detection.forget(session_id)
+    sim_engine.log_store.forget(session_id)
+    session_forks.forget(session_id)
+
+
+def _on_session_expired(doc: Dict[str, Any]):
+    """Drop every in-memory trace of a session the reaper compacted"""
+    _forget_session(doc['id'])
+    if sim_engine.events and doc.get('cohort_id'):
+        snapshot = _snapshot_from_document(doc)
+        snapshot.update(type="session_expired", commands=doc['summary']['commands'])
+        sim_engine.events.publish(snapshot)
+
+
+def _on_fork_dropped(fork_id: str):
+    state_history.forget(fork_id)
+    sim_engine.detection.forget(fork_id)
+    sim_engine.log_store.forget(fork_id)
+
+
+async def _save_session(session: SimulationSession, durable: bool = False):
+    """Persist a session; pinned and write-behind sessions are only marked dirty unless `durable`"""
+    if session.forked_from is not None:
+        # Forks live in memory only
+        return
+    entry = session_pins.get(session.id)
+    if entry is not None and entry.session is session:
+        entry.dirty = True
+        if durable:
+            await session_pins.flush(entry, _write_session)
+        return
+    if write_behind is not None:
+        write_behind.mark_dirty(session)
+        if durable:
+            await write_behind.flush([session.id])
+        return
+    await _write_session(session)
+
+
+def _snapshot_from_document(doc: Dict[str, Any]) -> Dict[str, Any]:
+    doc = dict(doc)
+    if isinstance(doc.get('start_time'), str):
+        doc['start_time'] = datetime.fromisoformat(doc['start_time'])
+    session = SimulationSession(**doc)
+    snapshot = sim_engine.session_snapshot(session)
+    if session.final_score is not None:
+        snapshot["projected_score"] = session.final_score
+    return snapshot
+
+
+def _publish_started(docs: List[Dict[str, Any]]):
+    """Tell engine subscribers about new sessions without validating every document"""
+    if not sim_engine.events or not docs or not docs[0].get('cohort_id'):
+        return
+    base = sim_engine.session_snapshot(SimulationSession(**docs[0]), "session_started")
+    for doc in docs:
+        sim_engine.events.publish({**base, "session_id": doc['id'], "user_id": doc['user_id']})
+
+
+async def _get_session_template(scenario_id: str):
+    """Compiled template for a scenario pack, or for a scenario stored in the database"""
+    if sim_engine.scenarios.is_pack(scenario_id):
+        return sim_engine.scenarios.get(scenario_id)
+    # Stored scenarios can be edited, so the template is checked against the current document
+    scenario = await storage.scenarios.get(scenario_id)
+    return sim_engine.scenarios.compile_scenario(scenario) if scenario else None
+
+
+def _register_scenario_corpora():
+    """Seed log store corpora from the loaded scenario packs"""
+    for template in sim_engine.scenarios.templates.values():
+        scenario = template.scenario
+        sim_engine.log_store.register_scenario(scenario.id, scenario.attacker_objectives, scenario.duration_minutes)
+
+
+async def _ensure_log_corpus(scenario_id: str):
+    """Register a scenario with the log store and build its corpus off the event loop"""
+    log_store = sim_engine.log_store
+    if scenario_id not in log_store.scenarios:
+        template = await _get_session_template(scenario_id)
+        if template:
+            scenario = template.scenario
+            log_store.register_scenario(scenario_id, scenario.attacker_objectives, scenario.duration_minutes)
+    await asyncio.to_thread(log_store.corpus, scenario_id)
+
+
+@api_router.get("/simulation/{session_id}/telemetry")
+async def stream_telemetry(session_id: str, request: Request, rate: float = 20.0):
+    """Stream live synthetic telemetry for a session as Server-Sent Events"""
+    session_dict = await storage.sessions.get(
+        session_id, {"scenario_id": 1, "attacker_state": 1, "simulation_time": 1}
     )
-    scenarios.append(scenario1)
+    if not session_dict:
+        raise HTTPException(status_code=404, detail="Simulation session not found")
+    
+    template = await _get_session_template(session_dict['scenario_id'])
+    objectives = template.scenario.attacker_objectives if template else []
     
-    return scenarios
+    from models import AttackerState
+    live = {"attacker_state": AttackerState(**session_dict.get('attacker_state', {})), "refreshed": time.monotonic()}
+    
+    stream = TelemetryStream(
+        objectives,
+        lambda: live["attacker_state"],
+        rate=max(1.0, min(rate, 1000.0)),
+        batch_size=max(1, int(min(rate, 1000.0) // 4)),
+        max_pending=2,
+        start_ts=session_dict.get('simulation_time', 0.0) * 60,
+        seed=session_id
+    )
+    
+    async def event_source():
+        try:
+            async for batch in stream:
+                if await request.is_disconnected():
+                    break
+                # Pick up attacker phase changes made by executed commands
+                entry = session_pins.get(session_id)
+                if entry is not None:
+                    live["attacker_state"] = entry.session.attacker_state
+                elif time.monotonic() - live["refreshed"] > 5:
+                    doc = await storage.sessions.get(session_id, {"attacker_state": 1})
+                    if doc:
+                        live["attacker_state"] = AttackerState(**doc.get('attacker_state', {}))
+                    live["refreshed"] = time.monotonic()
+                for event in batch.events():
+                    yield f"data: {json.dumps(event)}\n\n"
+        finally:
+            await stream.aclose()
+    
+    return StreamingResponse(event_source(), media_type="text/event-stream")
+
+
+async def _watch_scenario_packs(interval: float):
+    """Hot-reload scenario packs when their content hash changes"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            changes = await asyncio.to_thread(sim_engine.scenarios.reload)
+            if any(changes.values()):
+                logger.info("Scenario packs reloaded: %s", changes)
+                _register_scenario_corpora()
+        except Exception:
+            logger.exception("Scenario pack reload failed")
+
 
 # Include the router in the main app
 app.include_router(api_router)
@@ -403,6 +942,38 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@app.on_event("startup")
+async def load_scenario_packs():
+    await storage.setup()
+    await analytics.setup()
+    await player_stats.setup()
+    await score_sketches.setup()
+    changes = sim_engine.scenarios.reload()
+    logger.info("Loaded scenario packs: %s", changes)
+    _register_scenario_corpora()
+    interval = float(os.environ.get('SCENARIO_RELOAD_SECONDS', '10'))
+    if interval > 0:
+        app.state.scenario_watcher = asyncio.create_task(_watch_scenario_packs(interval))
+    if write_behind is not None:
+        app.state.write_behind_flusher = asyncio.create_task(write_behind.run())
+    if session_reaper is not None:
+        await session_reaper.setup()
+        app.state.session_reaper = asyncio.create_task(session_reaper.run())
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
-    client.close()
\ No newline at end of file
+    if session_reaper is not None:
+        app.state.session_reaper.cancel()
+    # Persist sessions still pinned by open WebSocket channels
+    for entry in list(session_pins.pinned.values()):
+        try:
+            await session_pins.flush(entry, _write_session)
+        except SessionExpired:
+            pass
+        except Exception:
+            logger.exception("Flushing pinned session %s failed", entry.session.id)
+    # Everything still waiting in the write-behind cache
+    if write_behind is not None:
+        app.state.write_behind_flusher.cancel()
+        await write_behind.flush()
+    await storage.close()
\ No newline at end of file
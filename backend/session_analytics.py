@@ -0,0 +1,120 @@
+from typing import Dict, Any, Optional
+from datetime import datetime, timezone
+from models import SimulationSession
+
+# Fixed score histogram: ten 10-point buckets keyed by their lower bound
+SCORE_BUCKET_WIDTH = 10
+SCORE_BUCKETS = [str(lower) for lower in range(0, 100, SCORE_BUCKET_WIDTH)]
+
+
+def _field(name: str) -> str:
+    """Command and ending names as update paths (no dots, no leading $)"""
+    return name.replace(".", "_").lstrip("$") or "_"
+
+
+def score_bucket(score: float) -> str:
+    return SCORE_BUCKETS[min(max(int(score // SCORE_BUCKET_WIDTH), 0), len(SCORE_BUCKETS) - 1)]
+
+
+def completion_update(session: SimulationSession) -> Dict[str, Any]:
+    """Counter increments contributed by one completed session"""
+    score = session.final_score or 0.0
+    inc: Dict[str, Any] = {
+        "sessions": 1,
+        "score_sum": score,
+        "score_sq_sum": score * score,
+        f"score_hist.{score_bucket(score)}": 1,
+        f"endings.{_field(session.ending_type or 'unknown')}": 1,
+        "commands_total": len(session.commands_history),
+    }
+    for command in session.commands_history:
+        key = f"commands.{_field(command.command)}"
+        inc[key] = inc.get(key, 0) + 1
+    ttd, ttc = session.attacker_state.ttd, session.attacker_state.ttc
+    if ttd is not None:
+        inc.update(ttd_count=1, ttd_sum=ttd)
+    if ttc is not None:
+        inc.update(ttc_count=1, ttc_sum=ttc)
+    return {
+        "$inc": inc,
+        "$min": {"score_min": score},
+        "$max": {"score_max": score},
+        "$set": {"updated_at": datetime.now(timezone.utc).isoformat()},
+    }
+
+
+class SessionAnalytics:
+    """Per-scenario and per-cohort aggregates, maintained incrementally.
+
+    Every completed session adds to one document for its scenario and, when it
+    belongs to a cohort, one for the (scenario, cohort) pair: counters, sums for
+    averages, and fixed-bucket histograms. Reads are a single document lookup.
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    @staticmethod
+    def key(scenario_id: str, cohort_id: Optional[str] = None) -> str:
+        return f"scenario/{scenario_id}" if cohort_id is None else f"cohort/{scenario_id}/{cohort_id}"
+
+    async def setup(self):
+        await self.collection.create_index("key", unique=True)
+
+    async def record(self, session: SimulationSession):
+        """Fold a just-completed session into its aggregates"""
+        update = completion_update(session)
+        operations = [({"key": self.key(session.scenario_id), "scenario_id": session.scenario_id}, update)]
+        if session.cohort_id:
+            operations.append((
+                {"key": self.key(session.scenario_id, session.cohort_id),
+                 "scenario_id": session.scenario_id, "cohort_id": session.cohort_id},
+                update
+            ))
+        await self.collection.bulk_update(operations, upsert=True)
+
+    async def get(self, scenario_id: str, cohort_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        doc = await self.collection.find_one({"key": self.key(scenario_id, cohort_id)})
+        return self.view(doc) if doc else None
+
+    @staticmethod
+    def view(doc: Dict[str, Any]) -> Dict[str, Any]:
+        """Averages and distributions from a stored aggregate"""
+        sessions = doc.get("sessions", 0)
+        mean = doc.get("score_sum", 0.0) / sessions if sessions else None
+        variance = max(doc.get("score_sq_sum", 0.0) / sessions - mean * mean, 0.0) if sessions else None
+        endings = doc.get("endings", {})
+        commands = doc.get("commands", {})
+        histogram = doc.get("score_hist", {})
+
+        def average(prefix: str) -> Optional[float]:
+            count = doc.get(f"{prefix}_count", 0)
+            return round(doc.get(f"{prefix}_sum", 0.0) / count, 2) if count else None
+
+        return {
+            "scenario_id": doc.get("scenario_id"),
+            "cohort_id": doc.get("cohort_id"),
+            "sessions": sessions,
+            "score": {
+                "mean": round(mean, 2) if mean is not None else None,
+                "stddev": round(variance ** 0.5, 2) if variance is not None else None,
+                "min": doc.get("score_min"),
+                "max": doc.get("score_max"),
+                "histogram": [
+                    {"from": int(lower), "to": int(lower) + SCORE_BUCKET_WIDTH, "sessions": histogram.get(lower, 0)}
+                    for lower in SCORE_BUCKETS
+                ],
+            },
+            "avg_ttd_seconds": average("ttd"),
+            "avg_ttc_seconds": average("ttc"),
+            "endings": {
+                ending: {"sessions": count, "share": round(count / sessions, 4) if sessions else 0}
+                for ending, count in sorted(endings.items(), key=lambda item: -item[1])
+            },
+            "commands": {
+                "total": doc.get("commands_total", 0),
+                "per_session": round(doc.get("commands_total", 0) / sessions, 2) if sessions else 0,
+                "frequency": dict(sorted(commands.items(), key=lambda item: -item[1])),
+            },
+            "updated_at": doc.get("updated_at"),
+        }
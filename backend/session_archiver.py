@@ -0,0 +1,206 @@
+"""Columnar archive of completed sessions.
+
+Streams completed sessions out of the session store into Parquet datasets
+partitioned by scenario and completion month:
+
+    <root>/sessions/scenario_id=<id>/month=<YYYY-MM>/part-*.parquet
+    <root>/commands/scenario_id=<id>/month=<YYYY-MM>/part-*.parquet
+
+`sessions` has one row per session (scores, ending, attacker outcome, one
+column per metric); `commands` has one row per executed command. Archived
+sessions are marked with ``archived_at`` on their document, so each run picks
+up exactly the completed sessions no earlier run has exported, whatever their
+completion times.
+
+Usage: python backend/session_archiver.py [--out backend/archive] [--batch 2000]
+"""
+from typing import List, Dict, Any, Optional
+from datetime import datetime, timezone
+from pathlib import Path
+import argparse
+import asyncio
+import json
+import os
+import uuid
+import pyarrow as pa
+import pyarrow.parquet as pq
+from models import SimulationSession
+from storage import Storage, open_storage
+
+METRIC_FIELDS = tuple(SimulationSession.model_fields["metrics"].default_factory())
+PARTITION_COLS = ["scenario_id", "month"]
+TIMESTAMP = pa.timestamp("us", tz="UTC")
+
+SESSION_SCHEMA = pa.schema([
+    ("session_id", pa.string()),
+    ("scenario_id", pa.string()),
+    ("month", pa.string()),
+    ("user_id", pa.string()),
+    ("cohort_id", pa.string()),
+    ("start_time", TIMESTAMP),
+    ("end_time", TIMESTAMP),
+    ("final_score", pa.float64()),
+    ("ending_type", pa.string()),
+    ("simulation_time", pa.float64()),
+    ("stress_level", pa.float64()),
+    ("revision", pa.int64()),
+    ("commands", pa.int32()),
+    ("alerts", pa.int32()),
+    ("attacker_phase", pa.string()),
+    ("attacker_progress", pa.float64()),
+    ("objectives_completed", pa.int32()),
+    ("blocked_paths", pa.int32()),
+    ("ttd", pa.float64()),
+    ("ttc", pa.float64()),
+    *[(f"metric_{name}", pa.float64()) for name in METRIC_FIELDS],
+])
+
+COMMAND_SCHEMA = pa.schema([
+    ("session_id", pa.string()),
+    ("scenario_id", pa.string()),
+    ("month", pa.string()),
+    ("seq", pa.int32()),
+    ("command", pa.string()),
+    ("parameters", pa.string()),  # JSON
+    ("timestamp", TIMESTAMP),
+    ("cost", pa.float64()),
+    ("time_required", pa.float64()),
+])
+
+
+def _timestamp(value: Any) -> Optional[datetime]:
+    """Stored timestamps are ISO strings or (naive UTC, from MongoDB) datetimes"""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if isinstance(value, datetime) and value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def flatten(doc: Dict[str, Any]):
+    """Session row and command rows for one stored session document"""
+    end_time = _timestamp(doc.get("end_time"))
+    month = end_time.strftime("%Y-%m")
+    attacker = doc.get("attacker_state") or {}
+    metrics = doc.get("metrics") or {}
+    commands = doc.get("commands_history") or []
+
+    session_row = {
+        "session_id": doc["id"],
+        "scenario_id": doc["scenario_id"],
+        "month": month,
+        "user_id": doc.get("user_id"),
+        "cohort_id": doc.get("cohort_id"),
+        "start_time": _timestamp(doc.get("start_time")),
+        "end_time": end_time,
+        "final_score": doc.get("final_score"),
+        "ending_type": doc.get("ending_type"),
+        "simulation_time": doc.get("simulation_time"),
+        "stress_level": doc.get("stress_level"),
+        "revision": doc.get("revision", 0),
+        "commands": len(commands),
+        "alerts": len(doc.get("alerts") or []),
+        "attacker_phase": attacker.get("current_phase"),
+        "attacker_progress": attacker.get("progress"),
+        "objectives_completed": len(attacker.get("objectives_completed") or []),
+        "blocked_paths": len(attacker.get("blocked_paths") or []),
+        "ttd": attacker.get("ttd"),
+        "ttc": attacker.get("ttc"),
+        **{f"metric_{name}": metrics.get(name) for name in METRIC_FIELDS},
+    }
+    command_rows = [
+        {
+            "session_id": doc["id"],
+            "scenario_id": doc["scenario_id"],
+            "month": month,
+            "seq": seq,
+            "command": command.get("command"),
+            "parameters": json.dumps(command.get("parameters") or {}, sort_keys=True, default=str),
+            "timestamp": _timestamp(command.get("timestamp")),
+            "cost": command.get("cost"),
+            "time_required": command.get("time_required"),
+        }
+        for seq, command in enumerate(commands)
+    ]
+    return session_row, command_rows
+
+
+class SessionArchiver:
+    """Exports completed sessions to partitioned, zstd-compressed Parquet"""
+
+    def __init__(self, storage: Storage, root: Path, batch_sessions: int = 2000, compression: str = "zstd"):
+        self.storage = storage
+        self.root = Path(root)
+        self.batch_sessions = batch_sessions
+        self.compression = compression
+
+    async def _mark_archived(self, session_ids: List[str]):
+        archived_at = datetime.now(timezone.utc).isoformat()
+        await self.storage.sessions.update_many([(sid, {"archived_at": archived_at}) for sid in session_ids])
+
+    def _write(self, table_name: str, rows: List[Dict[str, Any]], schema: pa.Schema, run_id: str):
+        if not rows:
+            return
+        pq.write_to_dataset(
+            pa.Table.from_pylist(rows, schema=schema),
+            self.root / table_name,
+            partition_cols=PARTITION_COLS,
+            basename_template=f"part-{run_id}-{{i}}.parquet",
+            compression=self.compression,
+            existing_data_behavior="overwrite_or_ignore",
+        )
+
+    def _write_batch(self, sessions: List[Dict[str, Any]], commands: List[Dict[str, Any]]):
+        # One id per batch keeps file names unique across batches and runs
+        run_id = uuid.uuid4().hex[:12]
+        self._write("sessions", sessions, SESSION_SCHEMA, run_id)
+        self._write("commands", commands, COMMAND_SCHEMA, run_id)
+
+    async def run(self) -> Dict[str, int]:
+        """Archive every completed session not archived yet"""
+        self.root.mkdir(parents=True, exist_ok=True)
+        flt = {"status": "completed", "end_time": {"$exists": True}, "archived_at": {"$exists": False}}
+
+        totals = {"sessions": 0, "commands": 0, "batches": 0}
+        while True:
+            # Marking a batch archived takes it out of `flt`, so each page is the next one
+            docs = await self.storage.sessions.find_all(
+                flt, {"attacker_actions": 0}, sort=[("end_time", 1), ("id", 1)], limit=self.batch_sessions
+            )
+            if not docs:
+                break
+            sessions: List[Dict[str, Any]] = []
+            commands: List[Dict[str, Any]] = []
+            for doc in docs:
+                session_row, command_rows = flatten(doc)
+                sessions.append(session_row)
+                commands.extend(command_rows)
+            # Parquet encoding is CPU-bound; keep it off the event loop
+            await asyncio.to_thread(self._write_batch, sessions, commands)
+            await self._mark_archived([doc["id"] for doc in docs])
+            totals["sessions"] += len(sessions)
+            totals["commands"] += len(commands)
+            totals["batches"] += 1
+            if len(docs) < self.batch_sessions:
+                break
+        return totals
+
+
+async def main(root: Path, batch_sessions: int):
+    storage = open_storage()
+    try:
+        totals = await SessionArchiver(storage, root, batch_sessions).run()
+    finally:
+        await storage.close()
+    print(f"Archived {totals['sessions']} sessions and {totals['commands']} commands "
+          f"in {totals['batches']} batches to {root}")
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    load_dotenv(Path(__file__).parent / '.env')
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--out", type=Path, default=Path(os.environ.get("ARCHIVE_DIR", Path(__file__).parent / "archive")))
+    parser.add_argument("--batch", type=int, default=2000)
+    args = parser.parse_args()
+    asyncio.run(main(args.out, args.batch))
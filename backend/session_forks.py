@@ -0,0 +1,122 @@
+from typing import List, Dict, Any, Callable, Optional
+from collections import OrderedDict
+import time
+from models import SimulationSession
+
+
+class SessionFork:
+    """A fork and when it was last used"""
+
+    __slots__ = ("session", "last_used")
+
+    def __init__(self, session: SimulationSession):
+        self.session = session
+        self.last_used = time.monotonic()
+
+
+class SessionForks:
+    """What-if branches of sessions, held in memory only.
+
+    Forks come from ``SimulationEngine.fork_session`` and share their history
+    entries with the session they branched from. They are never written to
+    storage: a fork is dropped ``ttl_seconds`` after its last use or when
+    more than ``max_forks`` are held, least recently used first, and
+    ``on_dropped`` is called with its id to release per-session engine state.
+    """
+
+    def __init__(
+        self,
+        max_forks: int = 1000,
+        ttl_seconds: float = 3600,
+        on_dropped: Callable[[str], None] = lambda fork_id: None
+    ):
+        self.max_forks = max_forks
+        self.ttl_seconds = ttl_seconds
+        self.on_dropped = on_dropped
+        self.entries: "OrderedDict[str, SessionFork]" = OrderedDict()
+
+        # Metrics
+        self.created = 0
+        self.dropped = 0
+
+    def add(self, session: SimulationSession) -> SimulationSession:
+        self.entries[session.id] = SessionFork(session)
+        self.created += 1
+        self._expire()
+        while len(self.entries) > self.max_forks:
+            self._drop(next(iter(self.entries)))
+        return session
+
+    def get(self, fork_id: str) -> Optional[SimulationSession]:
+        self._expire()
+        entry = self.entries.get(fork_id)
+        if entry is None:
+            return None
+        entry.last_used = time.monotonic()
+        self.entries.move_to_end(fork_id)
+        return entry.session
+
+    def branches(self, session_id: str) -> List[SimulationSession]:
+        """Live forks descending from a stored session, oldest first"""
+        self._expire()
+        return sorted(
+            (entry.session for entry in self.entries.values() if entry.session.forked_from == session_id),
+            key=lambda session: session.forked_at
+        )
+
+    def drop(self, fork_id: str) -> bool:
+        if fork_id not in self.entries:
+            return False
+        self._drop(fork_id)
+        return True
+
+    def forget(self, session_id: str):
+        """Drop every fork of a session, e.g. once it has expired"""
+        for fork_id in [fid for fid, e in self.entries.items() if e.session.forked_from == session_id]:
+            self._drop(fork_id)
+
+    def _drop(self, fork_id: str):
+        del self.entries[fork_id]
+        self.dropped += 1
+        self.on_dropped(fork_id)
+
+    def _expire(self):
+        cutoff = time.monotonic() - self.ttl_seconds
+        while self.entries:
+            fork_id, entry = next(iter(self.entries.items()))
+            if entry.last_used > cutoff:
+                break
+            self._drop(fork_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"forks": len(self.entries), "created": self.created, "dropped": self.dropped}
+
+
+def diverged_at(base: SimulationSession, branch: SimulationSession) -> int:
+    """Length of the command history two sessions have in common"""
+    common = 0
+    for ours, theirs in zip(base.commands_history, branch.commands_history):
+        if ours.command != theirs.command or ours.parameters != theirs.parameters:
+            break
+        common += 1
+    return common
+
+
+def compare_evaluations(base: Dict[str, Any], branch: Dict[str, Any]) -> Dict[str, Any]:
+    """Differences of a branch's evaluation from the base's: score and metric deltas, changed ending"""
+    diff = {
+        "final_score": round(branch["final_score"] - base["final_score"], 2),
+        "metrics": {
+            name: round(value - base["metrics"].get(name, 0.0), 2)
+            for name, value in branch["metrics"].items()
+            if value != base["metrics"].get(name)
+        },
+    }
+    for field in ("stress_management_score", "business_continuity_score", "attacker_interaction_score"):
+        if branch.get(field) != base.get(field):
+            diff[field] = round(branch[field] - base[field], 2)
+    if branch["ending_type"] != base["ending_type"]:
+        diff["ending_type"] = {"base": base["ending_type"], "branch": branch["ending_type"]}
+    if branch["grade"] != base["grade"]:
+        diff["grade"] = {"base": base["grade"], "branch": branch["grade"]}
+    return diff
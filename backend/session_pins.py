@@ -0,0 +1,88 @@
+from typing import Dict, Any, Callable, Awaitable, Optional, Set
+import asyncio
+import logging
+from models import SimulationSession
+
+logger = logging.getLogger(__name__)
+
+Listener = Callable[[Dict[str, Any]], None]
+
+
+class PinnedSession:
+    """A session held in memory while at least one channel has it open"""
+
+    __slots__ = ("session", "refs", "dirty", "listeners", "flush_lock")
+
+    def __init__(self, session: SimulationSession):
+        self.session = session
+        self.refs = 0
+        self.dirty = False
+        self.listeners: Set[Listener] = set()
+        self.flush_lock = asyncio.Lock()
+
+
+class SessionPins:
+    """Sessions pinned in memory by open WebSocket channels.
+
+    A pinned session is the single live copy: commands mutate it in place and
+    only mark it dirty, and storage is brought up to date by ``flush()`` on an
+    interval and when the last channel releases it.
+    """
+
+    def __init__(self):
+        self.pinned: Dict[str, PinnedSession] = {}
+
+    def get(self, session_id: str) -> Optional[PinnedSession]:
+        return self.pinned.get(session_id)
+
+    async def acquire(
+        self,
+        session_id: str,
+        loader: Callable[[str], Awaitable[Optional[SimulationSession]]]
+    ) -> Optional[PinnedSession]:
+        """Pin a session, loading it from storage unless another channel already has it"""
+        entry = self.pinned.get(session_id)
+        if entry is None:
+            session = await loader(session_id)
+            if session is None:
+                return None
+            # Another channel may have pinned it while we were loading
+            entry = self.pinned.setdefault(session_id, PinnedSession(session))
+        entry.refs += 1
+        return entry
+
+    async def release(
+        self,
+        session_id: str,
+        saver: Callable[[SimulationSession], Awaitable[None]]
+    ):
+        """Drop one reference, flushing and unpinning the session after the last one"""
+        entry = self.pinned.get(session_id)
+        if entry is None:
+            return
+        entry.refs -= 1
+        if entry.refs <= 0:
+            try:
+                await self.flush(entry, saver)
+            finally:
+                if entry.refs <= 0:
+                    self.pinned.pop(session_id, None)
+
+    async def flush(self, entry: PinnedSession, saver: Callable[[SimulationSession], Awaitable[None]]):
+        """Write a dirty session to storage; commands during the write mark it dirty again"""
+        async with entry.flush_lock:
+            if not entry.dirty:
+                return
+            entry.dirty = False
+            try:
+                await saver(entry.session)
+            except Exception:
+                entry.dirty = True
+                raise
+
+    def on_engine_event(self, event: Dict[str, Any]):
+        """EngineEventBus subscriber: fan events out to the channels watching that session"""
+        entry = self.pinned.get(event.get("session_id"))
+        if entry is not None:
+            for listener in list(entry.listeners):
+                listener(event)
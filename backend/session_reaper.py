@@ -0,0 +1,160 @@
+from typing import List, Dict, Any, Callable, Optional
+from datetime import datetime, timedelta, timezone
+import asyncio
+import logging
+import time
+from storage import Storage
+
+logger = logging.getLogger(__name__)
+
+OPEN_STATUSES = ["active", "paused"]
+
+# History moved out of an expired session into its archive document
+ARCHIVED_FIELDS = ("alerts", "commands_history", "attacker_actions")
+
+
+def summarize(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Small summary kept on an expired session in place of its history"""
+    commands = doc.get("commands_history") or []
+    return {
+        "commands": len(commands),
+        "alerts": len(doc.get("alerts") or []),
+        "attacker_actions": len(doc.get("attacker_actions") or []),
+        "last_command": commands[-1].get("command") if commands else None,
+        "final_phase": (doc.get("attacker_state") or {}).get("current_phase"),
+        "simulation_time": doc.get("simulation_time", 0.0),
+    }
+
+
+class SessionReaper:
+    """Expires sessions nobody has touched for `ttl_minutes`.
+
+    Each pass finds open sessions whose ``last_activity`` is older than the TTL,
+    copies their alert, command and attacker history into ``session_archive``
+    and compacts the session document to a summary with status ``failed`` and
+    ending ``expired``. Both documents get a ``purge_at`` date
+    ``retention_days`` out, which a TTL index uses for final deletion.
+
+    `is_pinned` skips sessions held open by a live connection, `live_document`
+    returns the in-memory copy of a session when it is newer than storage, and
+    `on_expired` is called after compaction to evict it from memory.
+    """
+
+    def __init__(
+        self,
+        storage: Storage,
+        ttl_minutes: float,
+        retention_days: float = 30,
+        interval_seconds: float = 60,
+        batch: int = 200,
+        is_pinned: Callable[[str], bool] = lambda session_id: False,
+        live_document: Callable[[str], Optional[Dict[str, Any]]] = lambda session_id: None,
+        on_expired: Callable[[Dict[str, Any]], None] = lambda doc: None
+    ):
+        self.storage = storage
+        self.archive = storage.collection("session_archive")
+        self.ttl = timedelta(minutes=ttl_minutes)
+        self.retention = timedelta(days=retention_days) if retention_days > 0 else None
+        self.interval_seconds = interval_seconds
+        self.batch = batch
+        self.is_pinned = is_pinned
+        self.live_document = live_document
+        self.on_expired = on_expired
+
+        # Metrics
+        self.passes = 0
+        self.expired = 0
+        self.skipped = 0
+        self.purged = 0
+        self.errors = 0
+        self.last_pass_ms = 0.0
+
+    async def setup(self):
+        await self.archive.create_index("session_id", unique=True)
+        await self.archive.create_index("purge_at", expire_after_seconds=0)
+
+    def _stale(self, doc: Dict[str, Any], cutoff: str) -> bool:
+        last_activity = doc.get("last_activity") or doc.get("start_time")
+        return doc.get("status") in OPEN_STATUSES and last_activity is not None and last_activity < cutoff
+
+    async def reap(self, now: Optional[datetime] = None) -> List[str]:
+        """One pass: expire up to `batch` idle sessions; returns their ids"""
+        now = now or datetime.now(timezone.utc)
+        # Timestamps are stored as ISO strings, which sort chronologically
+        cutoff = (now - self.ttl).isoformat()
+        candidates = await self.storage.sessions.find_all(
+            {"status": {"$in": OPEN_STATUSES}, "$or": [
+                {"last_activity": {"$lt": cutoff}},
+                # Sessions stored before last_activity was tracked
+                {"last_activity": {"$exists": False}, "start_time": {"$lt": cutoff}},
+            ]},
+            limit=self.batch
+        )
+        purge_at = now + self.retention if self.retention else None
+
+        expired = []
+        for doc in candidates:
+            session_id = doc["id"]
+            if self.is_pinned(session_id):
+                self.skipped += 1
+                continue
+            doc = self.live_document(session_id) or doc
+            if not self._stale(doc, cutoff):
+                self.skipped += 1
+                continue
+            await self._expire(doc, now, purge_at)
+            expired.append(session_id)
+            self.on_expired(doc)
+        self.expired += len(expired)
+        return expired
+
+    async def _expire(self, doc: Dict[str, Any], now: datetime, purge_at: Optional[datetime]):
+        archive = {
+            "session_id": doc["id"],
+            "scenario_id": doc.get("scenario_id"),
+            "user_id": doc.get("user_id"),
+            "cohort_id": doc.get("cohort_id"),
+            "archived_at": now.isoformat(),
+            **{field: doc.get(field) or [] for field in ARCHIVED_FIELDS},
+        }
+        compacted = {
+            "status": "failed",
+            "ending_type": "expired",
+            "end_time": doc.get("last_activity") or doc.get("start_time"),
+            "summary": summarize(doc),
+            **{field: [] for field in ARCHIVED_FIELDS},
+        }
+        if purge_at is not None:
+            archive["purge_at"] = compacted["purge_at"] = purge_at
+
+        # Archive first: a crash in between leaves a duplicate archive, never lost history
+        await self.archive.update_one({"session_id": doc["id"]}, {"$set": archive}, upsert=True)
+        await self.storage.sessions.update(doc["id"], compacted, where={"status": {"$in": OPEN_STATUSES}})
+        doc.update(compacted)
+
+    async def run(self):
+        """Background reaper"""
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            started = time.monotonic()
+            try:
+                while len(await self.reap()) == self.batch:
+                    pass
+                self.purged += await self.storage.sessions.expire() + await self.archive.expire()
+            except Exception:
+                self.errors += 1
+                logger.exception("Session reaper pass failed; retrying next interval")
+            self.passes += 1
+            self.last_pass_ms = (time.monotonic() - started) * 1000
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "ttl_minutes": self.ttl.total_seconds() / 60,
+            "retention_days": self.retention.total_seconds() / 86400 if self.retention else None,
+            "passes": self.passes,
+            "expired": self.expired,
+            "skipped": self.skipped,
+            "purged": self.purged,
+            "errors": self.errors,
+            "last_pass_ms": round(self.last_pass_ms, 2),
+        }
@@ -0,0 +1,234 @@
+"""Bulk re-scoring of completed sessions.
+
+Recomputes ``final_score`` and ``ending_type`` for completed sessions after a
+change to the scoring rules. Sessions are read in chunks with only the fields
+scoring needs, turned into column arrays, and scored with NumPy, one array
+operation per term of ``SimulationEngine._final_score``. Changed sessions are
+written back with one bulk update per chunk. Without ``--apply`` nothing is
+written and the run reports what would change.
+
+With the weights the engine uses, the results match ``evaluate_session``
+exactly: each session's metrics are averaged with ``sum()`` like the engine
+does, the weighted terms are added in the same order, and the final values
+are rounded with ``round()``. The attacker's action count is read from
+``attacker_action_count``, which the server stores with each session;
+documents written before it existed have their action lists loaded instead.
+
+Usage: python backend/session_rescoring.py [--apply] [--scenario-id ID] [--chunk 20000] [--weights '{"metrics": 0.5}']
+"""
+from typing import List, Dict, Any, Optional, Tuple
+from collections import Counter
+from pathlib import Path
+import argparse
+import asyncio
+import json
+import numpy as np
+from models import AttackerPhase
+from simulation_engine import (
+    SCORE_WEIGHTS, ENDING_ADJUSTMENTS, EARLY_PHASES, LATE_PHASES, ADVANCED_PHASES,
+    EARLY_SUCCESS_MIN_BLOCKED, BUSINESS_IMPACT_THRESHOLD, ending_adjustment
+)
+from storage import Storage, open_storage
+
+SCORING_FIELDS = {
+    "id": 1, "scenario_id": 1, "final_score": 1, "ending_type": 1, "metrics": 1, "stress_level": 1,
+    "system_state": 1, "attacker_state": 1, "attacker_action_count": 1,
+}
+
+# Same order as the checks in SimulationEngine._determine_ending
+ENDINGS = ("early_success", "late_containment", "business_impact", "successful_containment")
+
+PHASE_CODES = {phase.value: code for code, phase in enumerate(AttackerPhase)}
+
+
+def _codes(phases) -> np.ndarray:
+    # Stored phases are plain strings; live models hold the enum
+    return np.array([PHASE_CODES[getattr(phase, "value", phase)] for phase in phases], dtype=np.int8)
+
+
+class ScoreColumns:
+    """The inputs to the final score for a chunk of sessions, one array per field"""
+
+    def __init__(self, docs: List[Dict[str, Any]]):
+        self.ids = [doc["id"] for doc in docs]
+        self.stress = np.array([doc.get("stress_level", 20.0) for doc in docs], dtype=np.float64)
+        self.continuity = np.array(
+            [(doc.get("system_state") or {}).get("business_continuity_score", 100.0) for doc in docs],
+            dtype=np.float64
+        )
+        attacker = [doc.get("attacker_state") or {} for doc in docs]
+        self.phase = _codes(state.get("current_phase", AttackerPhase.RECONNAISSANCE.value) for state in attacker)
+        self.blocked = np.array([len(state.get("blocked_paths") or []) for state in attacker], dtype=np.int32)
+        self.actions = np.array([doc["attacker_action_count"] for doc in docs], dtype=np.int32)
+        # sum() per session, as the engine averages them: the last bit depends on
+        # summation order and on the interpreter's sum()
+        self.avg_metrics = np.array(
+            [sum(metrics.values()) / len(metrics) for metrics in (doc.get("metrics") or {} for doc in docs)],
+            dtype=np.float64
+        )
+
+
+def _in(codes: np.ndarray, phases) -> np.ndarray:
+    return np.isin(codes, [PHASE_CODES[phase.value] for phase in phases])
+
+
+def score_columns(
+    columns: ScoreColumns,
+    weights: Optional[Dict[str, float]] = None,
+    adjustments=ENDING_ADJUSTMENTS
+) -> Tuple[List[float], List[str]]:
+    """Final scores (rounded like evaluate_session) and ending types for a chunk"""
+    weights = {**SCORE_WEIGHTS, **(weights or {})}
+
+    ending_index = np.select(
+        [
+            _in(columns.phase, EARLY_PHASES) & (columns.blocked >= EARLY_SUCCESS_MIN_BLOCKED),
+            _in(columns.phase, LATE_PHASES),
+            columns.continuity < BUSINESS_IMPACT_THRESHOLD,
+        ],
+        [0, 1, 2],
+        default=3
+    )
+
+    interaction = np.full(len(columns.ids), 70.0)
+    interaction += np.where(columns.actions < 3, 15.0, 0.0)
+    interaction -= np.where(_in(columns.phase, ADVANCED_PHASES), 20.0, 0.0)
+    interaction += columns.blocked * 5
+    interaction = np.clip(interaction, 0, 100)
+
+    final = (
+        columns.avg_metrics * weights["metrics"] +
+        interaction * weights["attacker_interaction"] +
+        np.maximum(0, 100 - columns.stress) * weights["stress_management"] +
+        columns.continuity * weights["business_continuity"]
+    )
+    final += np.array([ending_adjustment(ending, adjustments) for ending in ENDINGS], dtype=np.float64)[ending_index]
+    final = np.clip(final, 0, 100)
+
+    # numpy's round() scales by 100 first and can land on the other side of a tie
+    return [round(score, 2) for score in final.tolist()], [ENDINGS[i] for i in ending_index]
+
+
+class SessionRescorer:
+    """Recomputes stored scores for completed sessions, chunk by chunk"""
+
+    def __init__(
+        self,
+        storage: Storage,
+        weights: Optional[Dict[str, float]] = None,
+        chunk_size: int = 20000,
+        sample_size: int = 20
+    ):
+        unknown = set(weights or {}) - set(SCORE_WEIGHTS)
+        if unknown:
+            raise ValueError(f"Unknown score weights: {', '.join(sorted(unknown))}")
+        self.storage = storage
+        self.weights = weights
+        self.chunk_size = chunk_size
+        self.sample_size = sample_size
+
+    async def run(self, apply: bool = False, scenario_id: Optional[str] = None) -> Dict[str, Any]:
+        """Rescore every completed session; writes only when `apply` is set"""
+        flt: Dict[str, Any] = {"status": "completed"}
+        if scenario_id:
+            flt["scenario_id"] = scenario_id
+
+        report = _DiffReport(self.sample_size)
+        chunk: List[Dict[str, Any]] = []
+        async for doc in self.storage.sessions.find(flt, SCORING_FIELDS):
+            chunk.append(doc)
+            if len(chunk) >= self.chunk_size:
+                await self._rescore(chunk, report, apply)
+                chunk = []
+        if chunk:
+            await self._rescore(chunk, report, apply)
+        return report.to_dict(applied=apply)
+
+    async def _rescore(self, docs: List[Dict[str, Any]], report: "_DiffReport", apply: bool):
+        await self._count_actions([doc for doc in docs if "attacker_action_count" not in doc])
+        scores, endings = await asyncio.to_thread(
+            lambda: score_columns(ScoreColumns(docs), self.weights)
+        )
+        updates = []
+        for doc, score, ending in zip(docs, scores, endings):
+            if report.add(doc, score, ending):
+                updates.append((doc["id"], {"final_score": score, "ending_type": ending}))
+        if apply and updates:
+            await self.storage.sessions.update_many(updates)
+
+    async def _count_actions(self, docs: List[Dict[str, Any]]):
+        """Fill in attacker_action_count for documents stored without it"""
+        if not docs:
+            return
+        actions = await self.storage.sessions.find_all(
+            {"id": {"$in": [doc["id"] for doc in docs]}}, {"id": 1, "attacker_actions": 1}
+        )
+        counts = {found["id"]: len(found.get("attacker_actions") or []) for found in actions}
+        for doc in docs:
+            doc["attacker_action_count"] = counts.get(doc["id"], 0)
+
+
+class _DiffReport:
+    """Old vs new scores across a run"""
+
+    def __init__(self, sample_size: int):
+        self.sample_size = sample_size
+        self.scanned = 0
+        self.changed = 0
+        self.ending_changes: Counter = Counter()
+        self.delta_sum = 0.0
+        self.delta_abs_max = 0.0
+        self.samples: List[Dict[str, Any]] = []
+
+    def add(self, doc: Dict[str, Any], score: float, ending: str) -> bool:
+        self.scanned += 1
+        old_score, old_ending = doc.get("final_score"), doc.get("ending_type")
+        if old_score == score and old_ending == ending:
+            return False
+        self.changed += 1
+        delta = score - (old_score or 0.0)
+        self.delta_sum += delta
+        self.delta_abs_max = max(self.delta_abs_max, abs(delta))
+        if old_ending != ending:
+            self.ending_changes[f"{old_ending} -> {ending}"] += 1
+        if len(self.samples) < self.sample_size:
+            self.samples.append({
+                "session_id": doc["id"],
+                "scenario_id": doc.get("scenario_id"),
+                "final_score": [old_score, score],
+                "ending_type": [old_ending, ending],
+            })
+        return True
+
+    def to_dict(self, applied: bool) -> Dict[str, Any]:
+        return {
+            "applied": applied,
+            "scanned": self.scanned,
+            "changed": self.changed,
+            "unchanged": self.scanned - self.changed,
+            "mean_delta": round(self.delta_sum / self.changed, 4) if self.changed else 0.0,
+            "max_abs_delta": round(self.delta_abs_max, 4),
+            "ending_changes": dict(self.ending_changes.most_common()),
+            "samples": self.samples,
+        }
+
+
+async def main(apply: bool, scenario_id: Optional[str], chunk_size: int, weights: Optional[Dict[str, float]]):
+    storage = open_storage()
+    try:
+        report = await SessionRescorer(storage, weights, chunk_size).run(apply, scenario_id)
+    finally:
+        await storage.close()
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    load_dotenv(Path(__file__).parent / '.env')
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--apply", action="store_true", help="write new scores (default: dry run)")
+    parser.add_argument("--scenario-id")
+    parser.add_argument("--chunk", type=int, default=20000)
+    parser.add_argument("--weights", type=json.loads, help="JSON overrides for SCORE_WEIGHTS")
+    args = parser.parse_args()
+    asyncio.run(main(args.apply, args.scenario_id, args.chunk, args.weights))
@@ -1,15 +1,55 @@
 from typing import Dict, List, Tuple, Optional
 from models import (
     SystemState, AttackerState, Alert, Command, SimulationSession,
-    AlertSeverity, AttackerPhase, CommandExecutionResponse
+    AlertSeverity, AttackerPhase, SimulationStatus, CommandExecutionResponse
 )
 from datetime import datetime, timezone
 import random
+import time
 import uuid
 from realtime_events import RealtimeEventGenerator
 from timeline_manager import TimelineManager
 from ai_assistant import AIAssistant
 from advanced_features import SoundEffects, RankingSystem, DifficultyManager
+from alert_dedup import AlertDeduplicator
+from achievements import AchievementEngine, metrics_changed
+from log_store import LogStore, QueryError, parse_query
+from telemetry import TelemetryStream
+from detection_rules import DetectionEngine
+from scenario_packs import ScenarioRegistry
+from engine_events import EngineEventBus
+from attack_graph import AttackGraph, default_graph
+from topology import HostState, default_topology
+
+# Final score = weighted components + ending adjustment, clamped to 0-100.
+# Shared with session_rescoring.py, which recomputes stored scores in bulk.
+SCORE_WEIGHTS = {
+    "metrics": 0.4,
+    "attacker_interaction": 0.25,
+    "stress_management": 0.15,
+    "business_continuity": 0.2,
+}
+# Checked in order against the ending type; the first substring match applies
+ENDING_ADJUSTMENTS = (("success", 10), ("stealth", -20))
+
+# Attacker phases that decide the ending and the attacker interaction score
+EARLY_PHASES = (AttackerPhase.RECONNAISSANCE, AttackerPhase.INITIAL_ACCESS)
+LATE_PHASES = (AttackerPhase.DATA_EXFILTRATION, AttackerPhase.COVER_TRACKS)
+ADVANCED_PHASES = (AttackerPhase.DATA_EXFILTRATION, AttackerPhase.PERSISTENCE, AttackerPhase.COVER_TRACKS)
+# Phases in which an advancing attacker also spreads to more hosts
+SPREAD_PHASES = (
+    AttackerPhase.LATERAL_MOVEMENT, AttackerPhase.DATA_EXFILTRATION,
+    AttackerPhase.PERSISTENCE, AttackerPhase.COVER_TRACKS
+)
+EARLY_SUCCESS_MIN_BLOCKED = 2
+BUSINESS_IMPACT_THRESHOLD = 60
+
+
+def ending_adjustment(ending_type: str, adjustments=ENDING_ADJUSTMENTS) -> float:
+    for marker, adjustment in adjustments:
+        if marker in ending_type:
+            return adjustment
+    return 0
 
 class SimulationEngine:
     """Core engine for the interactive SIEM simulation"""
@@ -18,6 +58,13 @@ class SimulationEngine:
         self.event_generator = RealtimeEventGenerator()
         self.timeline = TimelineManager()
         self.ai_assistant = AIAssistant()
+        self.alert_dedup = AlertDeduplicator()
+        self.achievements = AchievementEngine()
+        self.log_store = LogStore()
+        self.detection = DetectionEngine()
+        self.scenarios = ScenarioRegistry()
+        self.events = EngineEventBus()
+        self.telemetry_per_minute = 400
         self.difficulty = "normal"
         
         # Command definitions with their effects
@@ -136,6 +183,16 @@ class SimulationEngine:
                 "time": 2.0
             }
         }
+        
+        # SIEM query issued by each investigation command
+        self.investigation_queries = {
+            "query_logs": lambda p: p.get("query") or "*",
+            "check_iam_activity": lambda p: (
+                f'source=cloudtrail user="{p["username"]}"' if p.get("username")
+                else "source=cloudtrail outcome=failure | top 10 user"
+            ),
+            "analyze_network_traffic": lambda p: "source=vpc_flow | sum(bytes) by dst_ip",
+        }
     
     def execute_command(
         self,
@@ -144,25 +201,26 @@ class SimulationEngine:
         parameters: Dict
     ) -> CommandExecutionResponse:
         """Execute a user command and update simulation state"""
+        session.last_activity = datetime.now(timezone.utc)
         
         if command not in self.available_commands:
-            return CommandExecutionResponse(
-                success=False,
-                message=f"Unknown command: {command}",
-                system_state=session.system_state,
-                attacker_state=session.attacker_state,
-                stress_level=session.stress_level,
-                metrics=session.metrics,
-                simulation_time=session.simulation_time,
-                timeline_events=[],
-                team_messages=[],
-                achievements=[]
-            )
+            return self._rejected(session, f"Unknown command: {command}")
+        
+        # Investigation commands run a SIEM query; reject malformed ones up front
+        query = None
+        if command in self.investigation_queries:
+            query = self.investigation_queries[command](parameters)
+            try:
+                parse_query(query)
+            except QueryError as e:
+                return self._rejected(session, f"Invalid query: {e}")
         
         cmd_def = self.available_commands[command]
+        metrics_before = dict(session.metrics)
         
         # Update simulation time
         session.simulation_time += cmd_def["time"]
+        session.revision += 1
         
         # Add command to timeline
         timeline_event = self.timeline.add_event(
@@ -178,11 +236,18 @@ class SimulationEngine:
         team_messages = []
         achievements = []
         message = ""
+        query_result = None
         
         if command == "isolate_network":
             segment = parameters.get("segment", "production")
             session.system_state.network_segment_isolated[segment] = True
             message = f"Network segment '{segment}' isolated successfully"
+            hosts = self._host_state(session)
+            contained = hosts.isolate_segment(segment)
+            if contained is not None:
+                hosts.store(session.system_state)
+                if contained:
+                    message += f" ({contained} compromised hosts contained)"
             
             # Impact on business continuity
             session.system_state.business_continuity_score -= cmd_def["cost"]
@@ -191,13 +256,17 @@ class SimulationEngine:
             
             # Block attacker's lateral movement
             if session.attacker_state.current_phase == AttackerPhase.LATERAL_MOVEMENT:
-                session.attacker_state.blocked_paths.append("network_lateral")
+                self._block_path(session, "network_lateral")
                 message += " - Attacker's lateral movement blocked!"
         
         elif command == "isolate_host":
             hostname = parameters.get("hostname", "unknown")
-            if hostname not in session.system_state.isolated_hosts:
+            hosts = self._host_state(session)
+            compromised = hosts.is_compromised(hostname)
+            newly_isolated = hosts.isolate_host(hostname)
+            if newly_isolated or hostname not in session.system_state.isolated_hosts:
                 session.system_state.isolated_hosts.append(hostname)
+            hosts.store(session.system_state)
             message = f"Host '{hostname}' isolated from network"
             
             session.system_state.business_continuity_score -= cmd_def["cost"]
@@ -205,21 +274,24 @@ class SimulationEngine:
             session.metrics["riskManagement"] += 10
             
             # If attacker is on this host, severely impact their progress
-            if hostname in session.system_state.compromised_hosts:
+            if compromised or (compromised is None and hostname in session.system_state.compromised_hosts):
                 session.attacker_state.progress = max(0, session.attacker_state.progress - 20)
                 message += " - Critical attacker foothold eliminated!"
         
         elif command == "disable_account":
             username = parameters.get("username", "unknown")
-            if username not in session.system_state.suspicious_accounts_disabled:
+            hosts = self._host_state(session)
+            newly_disabled = hosts.disable_account(username)
+            if newly_disabled or username not in session.system_state.suspicious_accounts_disabled:
                 session.system_state.suspicious_accounts_disabled.append(username)
+            hosts.store(session.system_state)
             message = f"Account '{username}' disabled"
             
             session.metrics["responseAccuracy"] += 6
             
             # If this is the attacker's account, major impact
             if "attacker" in username.lower() or username == "admin-backup":
-                session.attacker_state.blocked_paths.append("iam_access")
+                self._block_path(session, "iam_access")
                 session.attacker_state.progress = max(0, session.attacker_state.progress - 30)
                 message += " - Attacker's access revoked!"
         
@@ -227,26 +299,29 @@ class SimulationEngine:
             session.system_state.mfa_enforced = True
             message = "MFA enforced across organization"
             session.metrics["riskManagement"] += 15
-            session.attacker_state.blocked_paths.append("credential_reuse")
+            self._block_path(session, "credential_reuse")
         
         elif command == "secure_s3_bucket":
             bucket_name = parameters.get("bucket_name", "unknown")
-            if bucket_name not in session.system_state.s3_buckets_secured:
+            hosts = self._host_state(session)
+            newly_secured = hosts.secure_bucket(bucket_name)
+            if newly_secured or bucket_name not in session.system_state.s3_buckets_secured:
                 session.system_state.s3_buckets_secured.append(bucket_name)
+            hosts.store(session.system_state)
             message = f"S3 bucket '{bucket_name}' secured with strict policies"
             session.metrics["riskManagement"] += 8
             
             # Prevent data exfiltration
             if session.attacker_state.current_phase == AttackerPhase.DATA_EXFILTRATION:
                 session.system_state.data_loss_prevented = True
-                session.attacker_state.blocked_paths.append("s3_exfiltration")
+                self._block_path(session, "s3_exfiltration")
                 message += " - Data exfiltration prevented!"
         
         elif command == "enable_dlp":
             session.system_state.data_loss_prevented = True
             message = "Data Loss Prevention enabled"
             session.metrics["riskManagement"] += 12
-            session.attacker_state.blocked_paths.append("data_exfiltration")
+            self._block_path(session, "data_exfiltration")
         
         elif command == "capture_memory_dump":
             hostname = parameters.get("hostname", "unknown")
@@ -276,19 +351,25 @@ class SimulationEngine:
                 ))
                 message += " - Malware detected and contained!"
         
-        elif command in ["query_logs", "check_iam_activity", "analyze_network_traffic"]:
-            # Investigation commands provide information
-            message = f"Investigation command '{command}' executed"
+        elif command in self.investigation_queries:
+            # Investigation commands query the scenario's SIEM corpus and the
+            # session's own live telemetry up to "now"
+            result = self.log_store.query(
+                session.scenario_id, query, max_ts=int(session.simulation_time * 60), stream_id=session.id
+            )
+            query_result = result.to_dict()
+            message = f"Investigation command '{command}' executed - {result.payload['total_matched']} matching events"
             session.metrics["decisionQuality"] += 3
             
-            # Possibly reveal attacker activity
-            if random.random() > 0.5 and not session.attacker_state.stealth_mode:
+            # Reveal attacker activity when the query actually surfaces it
+            # (at least 1% of matches, so a catch-all query doesn't count)
+            if result.malicious_rows and result.malicious_rows * 100 >= result.payload["total_matched"]:
                 new_alerts.append(Alert(
                     title="Suspicious Activity Detected",
-                    description=f"Investigation revealed anomalous patterns",
+                    description=f"Investigation surfaced {result.malicious_rows} events linked to attacker activity",
                     severity=AlertSeverity.HIGH,
                     source="SIEM Analysis",
-                    indicators=["Unusual access patterns", "Off-hours activity"]
+                    indicators=result.indicators
                 ))
         
         # Record command in history
@@ -311,23 +392,27 @@ class SimulationEngine:
         if attacker_response:
             new_alerts.extend(attacker_response)
         
+        # Run detection rules over the telemetry produced while the command ran
+        for alert in self._detect(session, cmd_def["time"]):
+            new_alerts.append(alert)
+            self.timeline.add_event("alert", alert.title, alert.description, alert.severity)
+        
         # Generate random realistic events
         random_event = self.event_generator.generate_random_event()
         if random_event:
-            if random_event["type"] == "alert":
-                alert = self.event_generator.create_alert_from_event(random_event)
-                new_alerts.append(alert)
-                self.timeline.add_event("alert", alert.title, alert.description, alert.severity)
-            elif random_event["type"] == "system":
-                team_messages.append({
-                    "sender": "System",
-                    "message": random_event["message"],
-                    "type": "system",
-                    "positive": random_event.get("positive", False)
-                })
+            team_messages.append({
+                "sender": "System",
+                "message": random_event["message"],
+                "type": "system",
+                "positive": random_event.get("positive", False)
+            })
         
         # Check for pressure messages
-        pressure_msg = self.event_generator.get_pressure_message(session.simulation_time)
+        template = self.scenarios.get(session.scenario_id)
+        pressure_msg = self.event_generator.get_pressure_message(
+            session.simulation_time,
+            template.event_schedule if template else None
+        )
         if pressure_msg:
             team_messages.append(pressure_msg)
             session.stress_level = min(100, session.stress_level + 10)
@@ -337,11 +422,11 @@ class SimulationEngine:
         if team_msg:
             team_messages.append(team_msg)
         
-        # Check for achievements
-        achievements = self.event_generator.get_achievement(
-            session.metrics, 
-            len(session.commands_history)
-        )
+        # Fold repeated alerts into existing ones instead of growing the history
+        new_alerts = self.alert_dedup.merge(session.alerts, new_alerts, session.simulation_time)
+        
+        # Achievements this command unlocked, checking only rules whose inputs changed
+        achievements = self.achievements.unlock(session, metrics_changed(metrics_before, session.metrics))
         
         # Get AI assistant advice
         ai_advice = self.ai_assistant.analyze_situation(session)
@@ -353,9 +438,15 @@ class SimulationEngine:
         elif new_alerts:
             sound_effect = SoundEffects.get_sound_config(f"alert_{new_alerts[0].severity}")
         
+        if self.events:
+            event = self.session_snapshot(session)
+            event["command"] = command
+            self.events.publish(event)
+        
         return CommandExecutionResponse(
             success=True,
             message=message,
+            revision=session.revision,
             system_state=session.system_state,
             attacker_state=session.attacker_state,
             new_alerts=new_alerts,
@@ -366,9 +457,44 @@ class SimulationEngine:
             team_messages=team_messages,
             achievements=achievements,
             ai_advice=ai_advice,
-            sound_effect=sound_effect
+            sound_effect=sound_effect,
+            query_result=query_result
+        )
+    
+    def _rejected(self, session: SimulationSession, message: str) -> CommandExecutionResponse:
+        """Response for a command that was not executed"""
+        return CommandExecutionResponse(
+            success=False,
+            message=message,
+            revision=session.revision,
+            system_state=session.system_state,
+            attacker_state=session.attacker_state,
+            stress_level=session.stress_level,
+            metrics=session.metrics,
+            simulation_time=session.simulation_time,
+            timeline_events=[],
+            team_messages=[],
+            achievements=[]
         )
     
+    def _detect(self, session: SimulationSession, minutes: float) -> List[Alert]:
+        """Generate telemetry for the last `minutes` of simulation time and evaluate rules on it"""
+        scenario = self.log_store.scenarios.get(session.scenario_id, {})
+        stream = TelemetryStream(
+            scenario.get("objectives", []),
+            lambda: session.attacker_state,
+            rate=None,
+            start_ts=(session.simulation_time - minutes) * 60,
+            # Forks replay the telemetry their original session would have seen
+            seed=f"{session.forked_from or session.id}:{len(session.commands_history)}"
+        )
+        batch = stream.next_batch(
+            size=max(1, int(minutes * self.telemetry_per_minute)),
+            span_seconds=minutes * 60
+        )
+        self.log_store.ingest(session.id, batch.columns)
+        return self.detection.evaluate(batch, session.id)
+    
     def _attacker_responds(self, session: SimulationSession, defender_action: str) -> List[Alert]:
         """Attacker adapts to defender's actions"""
         new_alerts = []
@@ -402,29 +528,67 @@ class SimulationEngine:
         elif random.random() > 0.6:  # 40% chance to progress
             session.attacker_state.progress += 10
             
+            # Spread to hosts next to the ones already compromised
+            if session.attacker_state.current_phase in SPREAD_PHASES:
+                self._spread_infection(session)
+            
             # Phase progression
             if session.attacker_state.progress >= 100:
                 self._advance_attacker_phase(session)
         
         return new_alerts
     
-    def _advance_attacker_phase(self, session: SimulationSession):
-        """Advance attacker to next phase"""
-        phases = [
-            AttackerPhase.RECONNAISSANCE,
-            AttackerPhase.INITIAL_ACCESS,
-            AttackerPhase.PRIVILEGE_ESCALATION,
-            AttackerPhase.LATERAL_MOVEMENT,
-            AttackerPhase.DATA_EXFILTRATION,
-            AttackerPhase.PERSISTENCE,
-            AttackerPhase.COVER_TRACKS
+    def _attack_graph(self, session: SimulationSession) -> AttackGraph:
+        template = self.scenarios.get(session.scenario_id)
+        return template.attack_graph if template else default_graph()
+    
+    def _host_state(self, session: SimulationSession) -> HostState:
+        template = self.scenarios.get(session.scenario_id)
+        return HostState.load(template.topology if template else default_topology(), session.system_state)
+    
+    def _spread_infection(self, session: SimulationSession) -> List[str]:
+        """Compromise more hosts one segment hop from the attacker's current footholds"""
+        hosts = self._host_state(session)
+        isolated_segments = [
+            name for name, isolated in session.system_state.network_segment_isolated.items() if isolated
         ]
-        
-        current_idx = phases.index(session.attacker_state.current_phase)
-        if current_idx < len(phases) - 1:
-            session.attacker_state.current_phase = phases[current_idx + 1]
-            session.attacker_state.progress = 0
-            
+        infected = hosts.spread(isolated_segments)
+        if infected:
+            hosts.store(session.system_state)
+        return infected
+    
+    def _block_path(self, session: SimulationSession, path: str):
+        """Record a defender block once and prune the objectives the attacker can still reach"""
+        state = session.attacker_state
+        if path in state.blocked_paths:
+            return
+        graph = self._attack_graph(session)
+        node = graph.node_for(state.technique, state.current_phase)
+        blocked = graph.block(node, graph.blocked_mask(state.blocked_paths), path)
+        state.blocked_paths.append(path)
+        state.reachable_objectives = graph.reachable_objectives(node, blocked, state.objectives_completed)
+    
+    def _advance_attacker_phase(self, session: SimulationSession):
+        """Move the attacker along an open edge of the attack graph toward a remaining objective"""
+        state = session.attacker_state
+        graph = self._attack_graph(session)
+        node = graph.node_for(state.technique, state.current_phase)
+        blocked = graph.blocked_mask(state.blocked_paths)
+        candidates = graph.next_techniques(node, blocked, state.objectives_completed)
+        if not candidates:
+            # Every route to an objective is blocked: the attacker stalls here
+            return
+        
+        target = random.choice(candidates)
+        previous_phase = state.current_phase
+        state.technique = graph.ids[target]
+        state.current_phase = graph.phases[target]
+        state.progress = 0
+        if graph.is_objective(target) and state.technique not in state.objectives_completed:
+            state.objectives_completed.append(state.technique)
+        state.reachable_objectives = graph.reachable_objectives(target, blocked, state.objectives_completed)
+        
+        if state.current_phase != previous_phase:
             # Increase stress
             session.stress_level = min(100, session.stress_level + 15)
     
@@ -451,7 +615,6 @@ class SimulationEngine:
             session.attacker_state.ttc = first_containment.timestamp.timestamp() - session.start_time.timestamp()
         
         # Calculate component scores
-        avg_metrics = sum(session.metrics.values()) / len(session.metrics)
         attacker_interaction_score = self._calculate_attacker_interaction_score(session)
         stress_management_score = max(0, 100 - session.stress_level)
         business_continuity_score = session.system_state.business_continuity_score
@@ -459,21 +622,7 @@ class SimulationEngine:
         # Determine ending type
         ending_type, ending_description = self._determine_ending(session)
         
-        # Calculate final score
-        final_score = (
-            avg_metrics * 0.4 +
-            attacker_interaction_score * 0.25 +
-            stress_management_score * 0.15 +
-            business_continuity_score * 0.2
-        )
-        
-        # Apply ending bonus/penalty
-        if "success" in ending_type:
-            final_score += 10
-        elif "stealth" in ending_type:
-            final_score -= 20
-        
-        final_score = max(0, min(100, final_score))
+        final_score = self._final_score(session, ending_type)
         
         # Determine grade
         if final_score >= 90:
@@ -501,6 +650,81 @@ class SimulationEngine:
             "recommendations": self._generate_recommendations(session)
         }
     
+    def _final_score(self, session: SimulationSession, ending_type: str) -> float:
+        """Weighted final score including the ending bonus/penalty, clamped to 0-100"""
+        avg_metrics = sum(session.metrics.values()) / len(session.metrics)
+        final_score = (
+            avg_metrics * SCORE_WEIGHTS["metrics"] +
+            self._calculate_attacker_interaction_score(session) * SCORE_WEIGHTS["attacker_interaction"] +
+            max(0, 100 - session.stress_level) * SCORE_WEIGHTS["stress_management"] +
+            session.system_state.business_continuity_score * SCORE_WEIGHTS["business_continuity"]
+        )
+        
+        # Apply ending bonus/penalty
+        adjustment = ending_adjustment(ending_type)
+        if adjustment:
+            final_score += adjustment
+        
+        return max(0, min(100, final_score))
+    
+    def project_score(self, session: SimulationSession) -> float:
+        """Final score the session would get if it ended now (no side effects)"""
+        ending_type, _ = self._determine_ending(session)
+        return self._final_score(session, ending_type)
+    
+    def session_achievements(self, session: SimulationSession) -> List[Dict]:
+        """Achievements a session has earned, each once"""
+        return self.achievements.earned(session)
+    
+    def fork_session(self, session: SimulationSession) -> SimulationSession:
+        """An active what-if branch of a session that shares its history.
+        
+        The history lists are new lists over the same entries. Alerts are the
+        only entries changed after they are appended (repeats fold into them),
+        and only while inside the dedup window, so just those are copied.
+        System and attacker state are small and changed in place: copied.
+        """
+        fork = session.model_copy(update={
+            "id": str(uuid.uuid4()),
+            "cohort_id": None,
+            "status": SimulationStatus.ACTIVE,
+            "end_time": None,
+            "final_score": None,
+            "ending_type": None,
+            "system_state": session.system_state.model_copy(deep=True),
+            "attacker_state": session.attacker_state.model_copy(deep=True),
+            "alerts": [
+                alert.model_copy() if self.alert_dedup.within_window(alert, session.simulation_time) else alert
+                for alert in session.alerts
+            ],
+            "commands_history": list(session.commands_history),
+            "attacker_actions": list(session.attacker_actions),
+            "metrics": dict(session.metrics),
+            "achievements_unlocked": None if session.achievements_unlocked is None else list(session.achievements_unlocked),
+            "hints_given": list(session.hints_given),
+            "forked_from": session.forked_from or session.id,
+            "forked_at": len(session.commands_history)
+        })
+        self.detection.fork(session.id, fork.id)
+        self.log_store.fork(session.id, fork.id)
+        return fork
+    
+    def session_snapshot(self, session: SimulationSession, event_type: str = "command") -> Dict:
+        """Compact engine event describing a session's live state"""
+        return {
+            "type": event_type,
+            "session_id": session.id,
+            "cohort_id": session.cohort_id,
+            "user_id": session.user_id,
+            "phase": AttackerPhase(session.attacker_state.current_phase).value,
+            "stress": session.stress_level,
+            "blocked": len(session.attacker_state.blocked_paths),
+            "projected_score": self.project_score(session),
+            "status": session.status.value if hasattr(session.status, "value") else session.status,
+            "commands": len(session.commands_history),
+            "last_activity": time.time()
+        }
+    
     def _calculate_attacker_interaction_score(self, session: SimulationSession) -> float:
         """Calculate how well the defender handled the attacker"""
         score = 70.0
@@ -510,11 +734,7 @@ class SimulationEngine:
             score += 15
         
         # Penalty for letting attacker advance
-        if session.attacker_state.current_phase in [
-            AttackerPhase.DATA_EXFILTRATION,
-            AttackerPhase.PERSISTENCE,
-            AttackerPhase.COVER_TRACKS
-        ]:
+        if session.attacker_state.current_phase in ADVANCED_PHASES:
             score -= 20
         
         # Reward for blocking paths
@@ -526,23 +746,18 @@ class SimulationEngine:
         """Determine the ending type based on session state"""
         
         # Check if attacker was contained early
-        if session.attacker_state.current_phase in [
-            AttackerPhase.RECONNAISSANCE,
-            AttackerPhase.INITIAL_ACCESS
-        ] and len(session.attacker_state.blocked_paths) >= 2:
+        if session.attacker_state.current_phase in EARLY_PHASES \
+                and len(session.attacker_state.blocked_paths) >= EARLY_SUCCESS_MIN_BLOCKED:
             return ("early_success", 
                     "نجاح باهر! تم احتواء الهجوم في مراحله المبكرة قبل حدوث أي ضرر جوهري.")
         
         # Check if attacker reached advanced phases
-        if session.attacker_state.current_phase in [
-            AttackerPhase.DATA_EXFILTRATION,
-            AttackerPhase.COVER_TRACKS
-        ]:
+        if session.attacker_state.current_phase in LATE_PHASES:
             return ("late_containment",
                     "احتواء متأخر. تم وقف الهجوم لكن بعد أن حقق المهاجم بعض أهدافه.")
         
         # Check business continuity
-        if session.system_state.business_continuity_score < 60:
+        if session.system_state.business_continuity_score < BUSINESS_IMPACT_THRESHOLD:
             return ("business_impact",
                     "تأثير كبير على الأعمال. تم احتواء الهجوم لكن مع تعطل ملحوظ في الخدمات.")
         
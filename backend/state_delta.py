@@ -0,0 +1,137 @@
+from typing import List, Dict, Any, Optional
+from collections import OrderedDict, deque
+import copy
+import json
+from models import CommandExecutionResponse
+
+# Response fields that describe session state (as opposed to per-command output)
+STATE_FIELDS = ("system_state", "attacker_state", "stress_level", "metrics", "simulation_time", "timeline_events")
+
+Patch = List[Dict[str, Any]]
+
+
+def _escape(key: str) -> str:
+    return str(key).replace("~", "~0").replace("/", "~1")
+
+
+def _unescape(token: str) -> str:
+    return token.replace("~1", "/").replace("~0", "~")
+
+
+def json_patch(old: Any, new: Any, path: str = "") -> Patch:
+    """RFC 6902 operations turning `old` into `new` (both JSON-compatible).
+
+    Objects are diffed key by key; lists that only grew get `add` operations
+    for the appended items, any other list change replaces the whole list.
+    """
+    if isinstance(old, dict) and isinstance(new, dict):
+        ops: Patch = []
+        for key in old:
+            if key not in new:
+                ops.append({"op": "remove", "path": f"{path}/{_escape(key)}"})
+        for key, value in new.items():
+            child = f"{path}/{_escape(key)}"
+            if key not in old:
+                ops.append({"op": "add", "path": child, "value": value})
+            elif old[key] != value or type(old[key]) is not type(value):
+                ops.extend(json_patch(old[key], value, child))
+        return ops
+    if isinstance(old, list) and isinstance(new, list):
+        if len(new) > len(old) and new[:len(old)] == old:
+            return [{"op": "add", "path": f"{path}/-", "value": value} for value in new[len(old):]]
+        # A newest-first window that slid: items added in front, oldest dropped at the end
+        for shift in range(1, len(new)):
+            kept = len(new) - shift
+            if kept <= len(old) and new[shift:] == old[:kept]:
+                ops = [{"op": "remove", "path": f"{path}/{i}"} for i in range(len(old) - 1, kept - 1, -1)]
+                ops.extend({"op": "add", "path": f"{path}/{i}", "value": new[i]} for i in range(shift))
+                return ops
+    return [{"op": "replace", "path": path, "value": new}]
+
+
+def apply_patch(doc: Any, ops: Patch) -> Any:
+    """Apply operations produced by json_patch to a copy of `doc`"""
+    doc = copy.deepcopy(doc)
+    for op in ops:
+        tokens = [_unescape(t) for t in op["path"].split("/")[1:]]
+        if not tokens:
+            doc = copy.deepcopy(op["value"])
+            continue
+        parent = doc
+        for token in tokens[:-1]:
+            parent = parent[int(token)] if isinstance(parent, list) else parent[token]
+        last = tokens[-1]
+        if op["op"] == "remove":
+            del parent[int(last) if isinstance(parent, list) else last]
+        elif isinstance(parent, list):
+            if last == "-":
+                parent.append(copy.deepcopy(op["value"]))
+            elif op["op"] == "add":
+                parent.insert(int(last), copy.deepcopy(op["value"]))
+            else:
+                parent[int(last)] = copy.deepcopy(op["value"])
+        else:
+            parent[last] = copy.deepcopy(op["value"])
+    return doc
+
+
+class StateHistory:
+    """Recent per-session state views keyed by revision, used to answer with deltas.
+
+    Only the last few revisions of the most recently active sessions are kept;
+    a client whose base revision has been evicted gets the full state.
+    """
+
+    def __init__(self, max_sessions: int = 5000, depth: int = 3):
+        self.max_sessions = max_sessions
+        self.depth = depth
+        self._sessions: "OrderedDict[str, deque]" = OrderedDict()
+        self.full_responses = 0
+        self.delta_responses = 0
+
+    def _record(self, session_id: str, revision: int, state: Dict[str, Any]):
+        history = self._sessions.get(session_id)
+        if history is None:
+            history = self._sessions[session_id] = deque(maxlen=self.depth)
+            if len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        else:
+            self._sessions.move_to_end(session_id)
+        if not history or history[-1][0] != revision:
+            history.append((revision, state))
+
+    def _lookup(self, session_id: str, revision: int) -> Optional[Dict[str, Any]]:
+        for recorded, state in self._sessions.get(session_id, ()):
+            if recorded == revision:
+                return state
+        return None
+
+    def respond(
+        self,
+        session_id: str,
+        response: CommandExecutionResponse,
+        since_revision: Optional[int] = None
+    ) -> CommandExecutionResponse:
+        """Replace the state fields of a response with a patch against `since_revision` when that is smaller"""
+        state = self._lookup(session_id, response.revision)
+        if state is None:
+            state = response.model_dump(mode="json", include=set(STATE_FIELDS))
+            self._record(session_id, response.revision, state)
+        else:
+            # Rejected commands leave the revision unchanged; every response for a
+            # revision must carry the state recorded for it
+            response = CommandExecutionResponse.model_validate({**response.model_dump(), **state})
+        base = self._lookup(session_id, since_revision) if since_revision is not None else None
+
+        if base is not None:
+            patch = json_patch(base, state)
+            if len(json.dumps(patch)) < len(json.dumps(state)):
+                self.delta_responses += 1
+                update = {field: None for field in STATE_FIELDS}
+                update.update(patch=patch, base_revision=since_revision)
+                return response.model_copy(update=update)
+        self.full_responses += 1
+        return response
+
+    def forget(self, session_id: str):
+        self._sessions.pop(session_id, None)
@@ -0,0 +1,782 @@
+from typing import List, Dict, Any, Optional, Tuple, AsyncIterator, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from enum import Enum
+from pathlib import Path
+import asyncio
+import os
+import pickle
+import sqlite3
+import orjson
+
+Filter = Dict[str, Any]
+Update = Dict[str, Any]
+Projection = Optional[Dict[str, Any]]
+Sort = Optional[Sequence[Tuple[str, int]]]
+
+STORAGE_BACKENDS = ("mongo", "memory", "sqlite")
+
+
+class StorageError(Exception):
+    """Raised for storage failures and unsupported queries"""
+
+
+class DuplicateKeyError(StorageError):
+    """Raised when an insert violates a unique index"""
+
+
+class BulkInsertError(StorageError):
+    """Raised by an unordered insert_many after inserting every document it could"""
+
+    def __init__(self, failed: List[int]):
+        super().__init__(f"{len(failed)} documents failed to insert")
+        self.failed = failed
+
+
+# ===== FILTERS, PROJECTIONS AND UPDATES (shared by the in-process backends) =====
+#
+# The supported subset of MongoDB's query language: field equality (dotted
+# paths allowed), $eq, $ne, $gt, $gte, $lt, $lte, $in, $nin, $exists, and
+# top-level $and / $or. Equality does not match array elements.
+
+_MISSING = object()
+
+
+def _get_path(doc: Any, path: str) -> Any:
+    for part in path.split("."):
+        if not isinstance(doc, dict) or part not in doc:
+            return _MISSING
+        doc = doc[part]
+    return doc
+
+
+def _equals(value: Any, expected: Any) -> bool:
+    if expected is None:
+        return value is _MISSING or value is None
+    return value is not _MISSING and value == expected
+
+
+def _compare(value: Any, op: str, arg: Any) -> bool:
+    if value is _MISSING or value is None or arg is None:
+        return False
+    try:
+        if op == "$gt":
+            return value > arg
+        if op == "$gte":
+            return value >= arg
+        if op == "$lt":
+            return value < arg
+        return value <= arg
+    except TypeError:
+        return False
+
+
+def _is_operator_dict(cond: Any) -> bool:
+    return isinstance(cond, dict) and bool(cond) and all(str(k).startswith("$") for k in cond)
+
+
+def _match_operator(value: Any, op: str, arg: Any) -> bool:
+    if op == "$eq":
+        return _equals(value, arg)
+    if op == "$ne":
+        return not _equals(value, arg)
+    if op in ("$gt", "$gte", "$lt", "$lte"):
+        return _compare(value, op, arg)
+    if op == "$in":
+        return any(_equals(value, a) for a in arg)
+    if op == "$nin":
+        return not any(_equals(value, a) for a in arg)
+    if op == "$exists":
+        return (value is not _MISSING) == bool(arg)
+    raise StorageError(f"Unsupported query operator {op}")
+
+
+def matches(doc: Dict[str, Any], flt: Filter) -> bool:
+    """Evaluate a filter against a document"""
+    for key, cond in flt.items():
+        if key == "$and":
+            if not all(matches(doc, sub) for sub in cond):
+                return False
+        elif key == "$or":
+            if not any(matches(doc, sub) for sub in cond):
+                return False
+        elif key.startswith("$"):
+            raise StorageError(f"Unsupported query operator {key}")
+        else:
+            value = _get_path(doc, key)
+            if _is_operator_dict(cond):
+                if not all(_match_operator(value, op, arg) for op, arg in cond.items()):
+                    return False
+            elif not _equals(value, cond):
+                return False
+    return True
+
+
+def project(doc: Dict[str, Any], projection: Projection) -> Dict[str, Any]:
+    """Apply a top-level inclusion or exclusion projection; `_id` is never returned"""
+    doc.pop("_id", None)
+    if not projection:
+        return doc
+    fields = {k: v for k, v in projection.items() if k != "_id"}
+    if any(fields.values()):
+        return {k: doc[k] for k in fields if fields[k] and k in doc}
+    for k in fields:
+        doc.pop(k, None)
+    return doc
+
+
+def _set_path(doc: Dict[str, Any], path: str, value: Any):
+    parts = path.split(".")
+    for part in parts[:-1]:
+        doc = doc.setdefault(part, {})
+    doc[parts[-1]] = value
+
+
+def _each(arg: Any) -> List[Any]:
+    return list(arg["$each"]) if isinstance(arg, dict) and "$each" in arg else [arg]
+
+
+def _push_modifiers(items: List[Any], arg: Any) -> List[Any]:
+    """$push's $sort and $slice, applied after the new items are appended"""
+    if not isinstance(arg, dict) or "$each" not in arg:
+        return items
+    order = arg.get("$sort")
+    if isinstance(order, dict):
+        for field, direction in reversed(list(order.items())):
+            items.sort(key=_sort_key(field), reverse=direction < 0)
+    elif order is not None:
+        items.sort(reverse=order < 0)
+    limit = arg.get("$slice")
+    if limit is not None:
+        items = items[:limit] if limit >= 0 else items[limit:]
+    return items
+
+
+def apply_update(doc: Dict[str, Any], update: Update, inserting: bool = False):
+    """Apply $set, $unset, $inc, $min, $max, $push (with $each/$sort/$slice), $addToSet
+    and $setOnInsert in place"""
+    if not _is_operator_dict(update):
+        raise StorageError("Updates must use update operators")
+    for op, fields in update.items():
+        for path, arg in fields.items():
+            current = _get_path(doc, path)
+            if op == "$set" or (op == "$setOnInsert" and inserting):
+                _set_path(doc, path, arg)
+            elif op == "$setOnInsert":
+                continue
+            elif op == "$unset":
+                parts = path.split(".")
+                parent = _get_path(doc, ".".join(parts[:-1])) if len(parts) > 1 else doc
+                if isinstance(parent, dict):
+                    parent.pop(parts[-1], None)
+            elif op == "$inc":
+                _set_path(doc, path, (0 if current is _MISSING else current) + arg)
+            elif op in ("$min", "$max"):
+                if current is _MISSING or current is None or (arg < current if op == "$min" else arg > current):
+                    _set_path(doc, path, arg)
+            elif op in ("$push", "$addToSet"):
+                items = [] if current is _MISSING else current
+                for item in _each(arg):
+                    if op == "$push" or item not in items:
+                        items.append(item)
+                _set_path(doc, path, _push_modifiers(items, arg) if op == "$push" else items)
+            else:
+                raise StorageError(f"Unsupported update operator {op}")
+
+
+def _upsert_base(flt: Filter) -> Dict[str, Any]:
+    """Document seeded from a filter's equality clauses"""
+    doc: Dict[str, Any] = {}
+    for key, cond in flt.items():
+        if not key.startswith("$"):
+            if _is_operator_dict(cond):
+                if "$eq" in cond:
+                    _set_path(doc, key, cond["$eq"])
+            else:
+                _set_path(doc, key, cond)
+    return doc
+
+
+def _sort_key(field: str):
+    def key(doc):
+        value = _get_path(doc, field)
+        # Missing and null sort first, as in MongoDB
+        return (0, 0) if value is _MISSING or value is None else (1, value)
+    return key
+
+
+async def _expire(collection, ttl: Dict[str, int]) -> int:
+    """Emulate MongoDB TTL indexes: delete documents whose date field is older than its expiry"""
+    now = datetime.now(timezone.utc)
+    deleted = 0
+    for field, seconds in ttl.items():
+        deleted += await collection.delete_many({field: {"$lte": now - timedelta(seconds=seconds)}})
+    return deleted
+
+
+# ===== MOTOR =====
+
+class MotorCollection:
+    """MongoDB collection through Motor"""
+
+    def __init__(self, collection):
+        self._collection = collection
+
+    @staticmethod
+    def _projection(projection: Projection) -> Dict[str, Any]:
+        return {"_id": 0, **(projection or {})}
+
+    async def insert_one(self, doc: Dict[str, Any]):
+        from pymongo.errors import DuplicateKeyError as MongoDuplicateKeyError
+        try:
+            await self._collection.insert_one(doc)
+        except MongoDuplicateKeyError as e:
+            raise DuplicateKeyError(str(e))
+        finally:
+            doc.pop("_id", None)
+
+    async def insert_many(self, docs: List[Dict[str, Any]]):
+        from pymongo.errors import BulkWriteError
+        try:
+            await self._collection.insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            raise BulkInsertError(sorted({error['index'] for error in e.details.get('writeErrors', [])}))
+        finally:
+            for doc in docs:
+                doc.pop("_id", None)
+
+    async def find_one(self, flt: Filter, projection: Projection = None) -> Optional[Dict[str, Any]]:
+        return await self._collection.find_one(flt, self._projection(projection))
+
+    async def find(
+        self, flt: Filter, projection: Projection = None, sort: Sort = None, limit: int = 0
+    ) -> AsyncIterator[Dict[str, Any]]:
+        cursor = self._collection.find(flt, self._projection(projection))
+        if sort:
+            cursor = cursor.sort(list(sort))
+        if limit:
+            cursor = cursor.limit(limit)
+        async for doc in cursor:
+            yield doc
+
+    async def update_one(self, flt: Filter, update: Update, upsert: bool = False) -> bool:
+        result = await self._collection.update_one(flt, update, upsert=upsert)
+        return result.matched_count > 0 or result.upserted_id is not None
+
+    async def bulk_update(self, operations: List[Tuple[Filter, Update]], upsert: bool = False) -> int:
+        from pymongo import UpdateOne
+        if not operations:
+            return 0
+        result = await self._collection.bulk_write(
+            [UpdateOne(flt, update, upsert=upsert) for flt, update in operations], ordered=False
+        )
+        return result.matched_count + result.upserted_count
+
+    async def delete_many(self, flt: Filter) -> int:
+        return (await self._collection.delete_many(flt)).deleted_count
+
+    async def count(self, flt: Filter) -> int:
+        return await self._collection.count_documents(flt)
+
+    async def create_index(self, field: str, unique: bool = False, expire_after_seconds: Optional[int] = None):
+        options = {} if expire_after_seconds is None else {"expireAfterSeconds": expire_after_seconds}
+        await self._collection.create_index(field, unique=unique, **options)
+
+    async def expire(self) -> int:
+        """TTL indexes are enforced by the MongoDB server"""
+        return 0
+
+
+class MotorBackend:
+    """MongoDB through Motor; MONGO_URL and DB_NAME are read when first used"""
+
+    def __init__(self, url: Optional[str] = None, db_name: Optional[str] = None):
+        self._url = url
+        self._db_name = db_name
+        self._client = None
+        self._db = None
+
+    @property
+    def db(self):
+        if self._db is None:
+            from motor.motor_asyncio import AsyncIOMotorClient
+            self._client = AsyncIOMotorClient(self._url or os.environ['MONGO_URL'])
+            self._db = self._client[self._db_name or os.environ['DB_NAME']]
+        return self._db
+
+    def collection(self, name: str) -> MotorCollection:
+        return MotorCollection(self.db[name])
+
+    async def close(self):
+        if self._client is not None:
+            self._client.close()
+
+
+# ===== IN-MEMORY =====
+
+def _copy(value: Any) -> Any:
+    return pickle.loads(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+class MemoryCollection:
+    """Documents in a dict; results are copies, so callers can't mutate stored state"""
+
+    def __init__(self):
+        self.docs: Dict[int, Dict[str, Any]] = {}
+        self._next_key = 0
+        self._unique: Dict[str, Dict[Any, int]] = {}
+        self._ttl: Dict[str, int] = {}
+
+    def _candidates(self, flt: Filter) -> List[Tuple[int, Dict[str, Any]]]:
+        # Point lookups on a unique field skip the scan
+        for field, index in self._unique.items():
+            value = flt.get(field)
+            if value is not None and not isinstance(value, dict):
+                key = index.get(value)
+                return [(key, self.docs[key])] if key is not None else []
+        return list(self.docs.items())
+
+    def _insert(self, doc: Dict[str, Any]):
+        for field, index in self._unique.items():
+            if doc.get(field) in index:
+                raise DuplicateKeyError(f"Duplicate {field}: {doc.get(field)!r}")
+        key = self._next_key
+        self._next_key += 1
+        self.docs[key] = project(_copy(doc), None)
+        for field, index in self._unique.items():
+            if field in doc:
+                index[doc[field]] = key
+
+    def _reindex(self, key: int, before: Dict[str, Any], after: Dict[str, Any]):
+        for field, index in self._unique.items():
+            if before.get(field) != after.get(field):
+                if after.get(field) in index:
+                    raise DuplicateKeyError(f"Duplicate {field}: {after.get(field)!r}")
+                index.pop(before.get(field), None)
+                if field in after:
+                    index[after[field]] = key
+
+    async def insert_one(self, doc: Dict[str, Any]):
+        self._insert(doc)
+
+    async def insert_many(self, docs: List[Dict[str, Any]]):
+        failed = []
+        for i, doc in enumerate(docs):
+            try:
+                self._insert(doc)
+            except DuplicateKeyError:
+                failed.append(i)
+        if failed:
+            raise BulkInsertError(failed)
+
+    async def find_one(self, flt: Filter, projection: Projection = None) -> Optional[Dict[str, Any]]:
+        for _, doc in self._candidates(flt):
+            if matches(doc, flt):
+                return project(_copy(doc), projection)
+        return None
+
+    async def find(
+        self, flt: Filter, projection: Projection = None, sort: Sort = None, limit: int = 0
+    ) -> AsyncIterator[Dict[str, Any]]:
+        found = [doc for _, doc in self._candidates(flt) if matches(doc, flt)]
+        for field, direction in reversed(list(sort or [])):
+            found.sort(key=_sort_key(field), reverse=direction < 0)
+        for doc in found[:limit] if limit else found:
+            yield project(_copy(doc), projection)
+
+    def _update(self, flt: Filter, update: Update, upsert: bool) -> bool:
+        update = _copy(update)
+        for key, doc in self._candidates(flt):
+            if matches(doc, flt):
+                before = {field: doc.get(field) for field in self._unique}
+                apply_update(doc, update)
+                self._reindex(key, before, doc)
+                return True
+        if upsert:
+            doc = _upsert_base(flt)
+            apply_update(doc, update, inserting=True)
+            self._insert(doc)
+            return True
+        return False
+
+    async def update_one(self, flt: Filter, update: Update, upsert: bool = False) -> bool:
+        return self._update(flt, update, upsert)
+
+    async def bulk_update(self, operations: List[Tuple[Filter, Update]], upsert: bool = False) -> int:
+        return sum(self._update(flt, update, upsert) for flt, update in operations)
+
+    async def delete_many(self, flt: Filter) -> int:
+        doomed = [key for key, doc in self._candidates(flt) if matches(doc, flt)]
+        for key in doomed:
+            doc = self.docs.pop(key)
+            for field, index in self._unique.items():
+                index.pop(doc.get(field), None)
+        return len(doomed)
+
+    async def count(self, flt: Filter) -> int:
+        return sum(1 for _, doc in self._candidates(flt) if matches(doc, flt))
+
+    async def create_index(self, field: str, unique: bool = False, expire_after_seconds: Optional[int] = None):
+        if unique and field not in self._unique:
+            self._unique[field] = {doc[field]: key for key, doc in self.docs.items() if field in doc}
+        if expire_after_seconds is not None:
+            self._ttl[field] = expire_after_seconds
+
+    async def expire(self) -> int:
+        return await _expire(self, self._ttl)
+
+
+class MemoryBackend:
+    """Process-local storage for microbenchmarks and tests"""
+
+    def __init__(self):
+        self.collections: Dict[str, MemoryCollection] = {}
+
+    def collection(self, name: str) -> MemoryCollection:
+        if name not in self.collections:
+            self.collections[name] = MemoryCollection()
+        return self.collections[name]
+
+    async def close(self):
+        pass
+
+
+# ===== SQLITE =====
+
+def _encode(doc: Any) -> str:
+    return orjson.dumps(doc, default=_encode_default).decode("utf-8")
+
+
+def _encode_default(obj: Any) -> Any:
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump()
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def _sql_param(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    return value
+
+
+def _json_path(field: str) -> str:
+    return "$" + "".join('."' + part.replace('"', '') + '"' for part in field.split("."))
+
+
+def _field_sql(field: str) -> str:
+    return f"json_extract(doc, '{_json_path(field)}')"
+
+
+def _sql_operator(field: str, op: str, arg: Any) -> Tuple[str, List[Any]]:
+    expr = _field_sql(field)
+    if op == "$eq":
+        return (f"{expr} IS NULL", []) if arg is None else (f"{expr} = ?", [_sql_param(arg)])
+    if op == "$ne":
+        return (f"{expr} IS NOT NULL", []) if arg is None else (f"({expr} IS NULL OR {expr} != ?)", [_sql_param(arg)])
+    if op in ("$gt", "$gte", "$lt", "$lte"):
+        symbol = {"$gt": ">", "$gte": ">=", "$lt": "<", "$lte": "<="}[op]
+        return f"{expr} {symbol} ?", [_sql_param(arg)]
+    if op in ("$in", "$nin"):
+        values = [_sql_param(a) for a in arg if a is not None]
+        has_null = len(values) != len(arg)
+        listed = f"{expr} IN ({', '.join('?' * len(values))})" if values else "0"
+        if op == "$in":
+            return (f"({listed} OR {expr} IS NULL)" if has_null else listed), values
+        if has_null:
+            return f"({expr} IS NOT NULL AND NOT {listed})", values
+        return f"({expr} IS NULL OR NOT {listed})", values
+    if op == "$exists":
+        return f"json_type(doc, '{_json_path(field)}') IS {'NOT ' if arg else ''}NULL", []
+    raise StorageError(f"Unsupported query operator {op}")
+
+
+def _sql_where(flt: Filter) -> Tuple[str, List[Any]]:
+    """Translate a filter into a WHERE clause over json_extract() of the document"""
+    clauses: List[str] = []
+    params: List[Any] = []
+    for key, cond in flt.items():
+        if key in ("$and", "$or"):
+            parts = [_sql_where(sub) for sub in cond]
+            joiner = " AND " if key == "$and" else " OR "
+            clauses.append("(" + (joiner.join(c for c, _ in parts) or ("1" if key == "$and" else "0")) + ")")
+            for _, p in parts:
+                params.extend(p)
+        elif key.startswith("$"):
+            raise StorageError(f"Unsupported query operator {key}")
+        else:
+            for op, arg in (cond.items() if _is_operator_dict(cond) else [("$eq", cond)]):
+                clause, p = _sql_operator(key, op, arg)
+                clauses.append(clause)
+                params.extend(p)
+    return " AND ".join(clauses) or "1", params
+
+
+class SQLiteCollection:
+    """JSON documents in a SQLite table, with expression indexes over json_extract()"""
+
+    def __init__(self, backend: "SQLiteBackend", name: str):
+        self.backend = backend
+        self.table = '"' + name.replace('"', '') + '"'
+        self.name = name
+        self._ttl: Dict[str, int] = {}
+        backend.execute_now(f"CREATE TABLE IF NOT EXISTS {self.table} (key INTEGER PRIMARY KEY, doc TEXT NOT NULL)")
+
+    def _select(self, flt: Filter, sort: Sort = None, limit: int = 0, columns: str = "key, doc") -> Tuple[str, List[Any]]:
+        where, params = _sql_where(flt)
+        sql = f"SELECT {columns} FROM {self.table} WHERE {where}"
+        if sort:
+            sql += " ORDER BY " + ", ".join(f"{_field_sql(field)} {'DESC' if d < 0 else 'ASC'}" for field, d in sort)
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        return sql, params
+
+    def _insert(self, conn: sqlite3.Connection, doc: Dict[str, Any]):
+        try:
+            conn.execute(f"INSERT INTO {self.table} (doc) VALUES (?)", (_encode(project(dict(doc), None)),))
+        except sqlite3.IntegrityError as e:
+            raise DuplicateKeyError(str(e))
+
+    async def insert_one(self, doc: Dict[str, Any]):
+        def run(conn):
+            with conn:
+                self._insert(conn, doc)
+        await self.backend.run(run)
+
+    async def insert_many(self, docs: List[Dict[str, Any]]):
+        def run(conn):
+            failed = []
+            with conn:
+                for i, doc in enumerate(docs):
+                    try:
+                        self._insert(conn, doc)
+                    except DuplicateKeyError:
+                        failed.append(i)
+            return failed
+        failed = await self.backend.run(run)
+        if failed:
+            raise BulkInsertError(failed)
+
+    async def find_one(self, flt: Filter, projection: Projection = None) -> Optional[Dict[str, Any]]:
+        sql, params = self._select(flt, limit=1, columns="doc")
+        row = await self.backend.run(lambda conn: conn.execute(sql, params).fetchone())
+        return project(orjson.loads(row[0]), projection) if row else None
+
+    async def find(
+        self, flt: Filter, projection: Projection = None, sort: Sort = None, limit: int = 0
+    ) -> AsyncIterator[Dict[str, Any]]:
+        sql, params = self._select(flt, sort, limit, columns="doc")
+        cursor = await self.backend.run(lambda conn: conn.execute(sql, params))
+        try:
+            while True:
+                rows = await self.backend.run(lambda conn: cursor.fetchmany(500))
+                if not rows:
+                    break
+                for (doc,) in rows:
+                    yield project(orjson.loads(doc), projection)
+        finally:
+            await self.backend.run(lambda conn: cursor.close())
+
+    def _update(self, conn: sqlite3.Connection, flt: Filter, update: Update, upsert: bool) -> bool:
+        sql, params = self._select(flt, limit=1)
+        row = conn.execute(sql, params).fetchone()
+        if row is None:
+            if upsert:
+                doc = _upsert_base(flt)
+                apply_update(doc, update, inserting=True)
+                self._insert(conn, doc)
+            return upsert
+        doc = orjson.loads(row[1])
+        apply_update(doc, orjson.loads(_encode(update)))
+        try:
+            conn.execute(f"UPDATE {self.table} SET doc = ? WHERE key = ?", (_encode(doc), row[0]))
+        except sqlite3.IntegrityError as e:
+            raise DuplicateKeyError(str(e))
+        return True
+
+    async def update_one(self, flt: Filter, update: Update, upsert: bool = False) -> bool:
+        def run(conn):
+            with conn:
+                return self._update(conn, flt, update, upsert)
+        return await self.backend.run(run)
+
+    async def bulk_update(self, operations: List[Tuple[Filter, Update]], upsert: bool = False) -> int:
+        def run(conn):
+            # One transaction (and one WAL commit) for the whole batch
+            with conn:
+                return sum(self._update(conn, flt, update, upsert) for flt, update in operations)
+        return await self.backend.run(run)
+
+    async def delete_many(self, flt: Filter) -> int:
+        where, params = _sql_where(flt)
+
+        def run(conn):
+            with conn:
+                return conn.execute(f"DELETE FROM {self.table} WHERE {where}", params).rowcount
+        return await self.backend.run(run)
+
+    async def count(self, flt: Filter) -> int:
+        sql, params = self._select(flt, columns="COUNT(*)")
+        return (await self.backend.run(lambda conn: conn.execute(sql, params).fetchone()))[0]
+
+    async def create_index(self, field: str, unique: bool = False, expire_after_seconds: Optional[int] = None):
+        index = '"' + f"ix_{self.name}_{field}".replace('"', '').replace(".", "_") + '"'
+        sql = (f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS {index} "
+               f"ON {self.table} ({_field_sql(field)})")
+        await self.backend.run(lambda conn: conn.execute(sql))
+        if expire_after_seconds is not None:
+            self._ttl[field] = expire_after_seconds
+
+    async def expire(self) -> int:
+        return await _expire(self, self._ttl)
+
+
+class SQLiteBackend:
+    """Single-node storage in one SQLite file (WAL mode).
+
+    All statements run on one worker thread that owns the connection, so the
+    event loop never blocks on disk and no locking is needed.
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path or os.environ.get("SQLITE_PATH", Path(__file__).parent / "data" / "seim.sqlite3"))
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite")
+        self._conn = self._executor.submit(self._connect).result()
+        self.collections: Dict[str, SQLiteCollection] = {}
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level="DEFERRED")
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def execute_now(self, sql: str):
+        self._executor.submit(lambda: self._conn.execute(sql)).result()
+
+    async def run(self, fn):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, self._conn)
+
+    def collection(self, name: str) -> SQLiteCollection:
+        if name not in self.collections:
+            self.collections[name] = SQLiteCollection(self, name)
+        return self.collections[name]
+
+    async def close(self):
+        await self.run(lambda conn: conn.close())
+        self._executor.shutdown(wait=False)
+
+
+# ===== STORES =====
+
+class SessionStore:
+    """Simulation session documents"""
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def setup(self):
+        await self.collection.create_index("id", unique=True)
+        for field in ("user_id", "scenario_id", "cohort_id", "status", "last_activity"):
+            await self.collection.create_index(field)
+        # Expired sessions carry the date they may be deleted
+        await self.collection.create_index("purge_at", expire_after_seconds=0)
+
+    async def get(self, session_id: str, projection: Projection = None) -> Optional[Dict[str, Any]]:
+        return await self.collection.find_one({"id": session_id}, projection)
+
+    async def insert(self, doc: Dict[str, Any]):
+        await self.collection.insert_one(doc)
+
+    async def insert_many(self, docs: List[Dict[str, Any]]) -> List[int]:
+        """Insert unordered; returns the indexes of documents that failed"""
+        try:
+            await self.collection.insert_many(docs)
+        except BulkInsertError as e:
+            return e.failed
+        return []
+
+    async def update(self, session_id: str, fields: Dict[str, Any], where: Optional[Filter] = None) -> bool:
+        """Set fields on a session, optionally only if it still matches `where`; False if it did not"""
+        return await self.collection.update_one({"id": session_id, **(where or {})}, {"$set": fields})
+
+    async def update_many(
+        self,
+        updates: List[Tuple[str, Dict[str, Any]]],
+        where: Optional[Filter] = None
+    ) -> List[str]:
+        """Set fields on many sessions in one batch; returns the ids that no longer matched `where`"""
+        matched = await self.collection.bulk_update(
+            [({"id": sid, **(where or {})}, {"$set": fields}) for sid, fields in updates]
+        )
+        if matched == len(updates):
+            return []
+        ids = [sid for sid, _ in updates]
+        found = await self.find_all({"id": {"$in": ids}, **(where or {})}, {"id": 1})
+        found = {doc["id"] for doc in found}
+        return [sid for sid in ids if sid not in found]
+
+    def find(self, flt: Filter, projection: Projection = None, sort: Sort = None, limit: int = 0):
+        return self.collection.find(flt, projection, sort, limit)
+
+    async def find_all(self, flt: Filter, projection: Projection = None, sort: Sort = None, limit: int = 0):
+        return [doc async for doc in self.collection.find(flt, projection, sort, limit)]
+
+    async def count(self, flt: Filter) -> int:
+        return await self.collection.count(flt)
+
+    async def expire(self) -> int:
+        """Delete sessions past their purge_at date (MongoDB does this itself)"""
+        return await self.collection.expire()
+
+
+class ScenarioStore:
+    """Scenarios created through the API (scenario packs live on disk)"""
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def setup(self):
+        await self.collection.create_index("id", unique=True)
+
+    async def get(self, scenario_id: str) -> Optional[Dict[str, Any]]:
+        return await self.collection.find_one({"id": scenario_id})
+
+    async def insert(self, doc: Dict[str, Any]):
+        await self.collection.insert_one(doc)
+
+    async def find_all(self, flt: Filter, limit: int = 0) -> List[Dict[str, Any]]:
+        return [doc async for doc in self.collection.find(flt, limit=limit)]
+
+
+class Storage:
+    """The stores the server uses, over one backend"""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.sessions = SessionStore(backend.collection("simulation_sessions"))
+        self.scenarios = ScenarioStore(backend.collection("scenarios"))
+
+    def collection(self, name: str):
+        """Raw collection for data without a dedicated store"""
+        return self.backend.collection(name)
+
+    async def setup(self):
+        await self.sessions.setup()
+        await self.scenarios.setup()
+
+    async def close(self):
+        await self.backend.close()
+
+
+def open_storage(kind: Optional[str] = None) -> Storage:
+    """Storage selected by STORAGE_BACKEND: mongo (default), memory or sqlite"""
+    kind = (kind or os.environ.get("STORAGE_BACKEND", "mongo")).lower()
+    if kind == "mongo":
+        return Storage(MotorBackend())
+    if kind == "memory":
+        return Storage(MemoryBackend())
+    if kind == "sqlite":
+        return Storage(SQLiteBackend())
+    raise StorageError(f"Unknown STORAGE_BACKEND {kind!r}; expected one of {', '.join(STORAGE_BACKENDS)}")
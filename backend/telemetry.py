@@ -0,0 +1,168 @@
+from typing import List, Dict, Any, Optional, Callable, AsyncIterator
+import asyncio
+import hashlib
+import time
+import numpy as np
+from models import AttackerState
+from log_store import (
+    VOCAB, CATEGORICAL_COLUMNS, QUERYABLE_COLUMNS, PHASE_TEMPLATES,
+    synthesize_benign, synthesize_phase, concat_columns, objective_phases
+)
+
+
+class EventBatch:
+    """A micro-batch of telemetry events in the log store's columnar schema"""
+
+    __slots__ = ("columns", "start_ts", "end_ts")
+
+    def __init__(self, columns: Dict[str, np.ndarray], start_ts: float, end_ts: float):
+        self.columns = columns
+        self.start_ts = start_ts
+        self.end_ts = end_ts
+
+    def __len__(self) -> int:
+        return len(self.columns["ts"])
+
+    def events(self) -> List[Dict[str, Any]]:
+        """Decode the batch into per-event dictionaries (ground-truth phase excluded)"""
+        decoded = {}
+        for field in QUERYABLE_COLUMNS:
+            values = self.columns[field].tolist()
+            if field in CATEGORICAL_COLUMNS:
+                vocab = VOCAB[field]
+                values = [vocab[v] for v in values]
+            decoded[field] = values
+        return [dict(zip(QUERYABLE_COLUMNS, row)) for row in zip(*(decoded[f] for f in QUERYABLE_COLUMNS))]
+
+
+class TelemetryStream:
+    """Continuous stream of benign and malicious events for a live scenario.
+
+    Batches are generated from the scenario's attacker objectives and the
+    attacker's current phase, read through ``attacker_state`` on every batch.
+    The stream is async-iterable; a bounded queue between the producer and the
+    consumer caps memory at ``max_pending`` batches and applies backpressure
+    when the consumer falls behind. ``rate`` is in events per second of wall
+    time; ``None`` generates as fast as the consumer accepts batches.
+    """
+
+    def __init__(
+        self,
+        objectives: List[Dict[str, Any]],
+        attacker_state: Callable[[], Optional[AttackerState]],
+        rate: Optional[float] = 1000.0,
+        batch_size: int = 1000,
+        malicious_ratio: float = 0.01,
+        max_pending: int = 8,
+        start_ts: float = 0.0,
+        seed: Optional[str] = None
+    ):
+        self.phases = objective_phases(objectives)
+        self.attacker_state = attacker_state
+        self.rate = rate
+        self.batch_size = batch_size
+        self.malicious_ratio = malicious_ratio
+        self.max_pending = max_pending
+        self.clock = start_ts
+        seed_value = int(hashlib.sha1((seed or "telemetry").encode("utf-8")).hexdigest()[:8], 16)
+        self.rng = np.random.default_rng(seed_value)
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._producer: Optional[asyncio.Task] = None
+        self.generated = 0
+        self.blocked_seconds = 0.0
+
+    def current_phase(self) -> Optional[str]:
+        """Attacker phase to emit malicious events for, or None if the attacker is idle"""
+        state = self.attacker_state()
+        if state is None or not state.is_active:
+            return None
+        phase = state.current_phase.value if hasattr(state.current_phase, "value") else state.current_phase
+        return phase if phase in PHASE_TEMPLATES else None
+
+    def next_batch(self, size: Optional[int] = None, span_seconds: Optional[float] = None) -> EventBatch:
+        """Generate the next batch synchronously, advancing the stream clock"""
+        size = size or self.batch_size
+        if span_seconds is None:
+            span_seconds = size / self.rate if self.rate else 1.0
+        start = self.clock
+        end = start + max(span_seconds, 1e-3)
+        low, high = int(start), max(int(start) + 1, int(end))
+
+        parts = [synthesize_benign(self.rng, size, low, high)]
+        phase = self.current_phase()
+        if phase is not None and self.malicious_ratio > 0:
+            target = int(self.rng.binomial(size, self.malicious_ratio))
+            if target:
+                template_rows = sum(t[-1] for t in PHASE_TEMPLATES[phase])
+                parts.append(synthesize_phase(self.rng, phase, low, high, target / template_rows))
+
+        columns = concat_columns(parts)
+        order = np.argsort(columns["ts"], kind="stable")
+        columns = {c: v[order] for c, v in columns.items()}
+
+        self.clock = end
+        self.generated += len(order)
+        return EventBatch(columns, start, end)
+
+    async def _produce(self):
+        interval = self.batch_size / self.rate if self.rate else 0.0
+        deadline = time.perf_counter()
+        while True:
+            batch = self.next_batch()
+            waited = time.perf_counter()
+            await self._queue.put(batch)
+            self.blocked_seconds += time.perf_counter() - waited
+            if interval:
+                deadline += interval
+                delay = deadline - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                else:
+                    # Fell behind (e.g. consumer backpressure): don't burst to catch up
+                    deadline = time.perf_counter()
+            else:
+                await asyncio.sleep(0)
+
+    def __aiter__(self) -> "TelemetryStream":
+        return self
+
+    async def __anext__(self) -> EventBatch:
+        if self._producer is None:
+            self._queue = asyncio.Queue(maxsize=self.max_pending)
+            self._producer = asyncio.create_task(self._produce())
+        if not self._queue.empty():
+            return self._queue.get_nowait()
+        getter = asyncio.ensure_future(self._queue.get())
+        await asyncio.wait({getter, self._producer}, return_when=asyncio.FIRST_COMPLETED)
+        if getter.done():
+            return getter.result()
+        # The producer stopped before delivering another batch: surface why
+        getter.cancel()
+        if not self._producer.cancelled() and self._producer.exception() is not None:
+            raise self._producer.exception()
+        raise StopAsyncIteration
+
+    async def events(self) -> AsyncIterator[Dict[str, Any]]:
+        """Iterate individual decoded events instead of batches"""
+        async for batch in self:
+            for event in batch.events():
+                yield event
+
+    async def aclose(self):
+        """Stop the producer task"""
+        if self._producer is not None:
+            self._producer.cancel()
+            try:
+                await self._producer
+            except asyncio.CancelledError:
+                pass
+            self._producer = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "generated": self.generated,
+            "clock": round(self.clock, 3),
+            "pending_batches": self._queue.qsize() if self._queue else 0,
+            "blocked_seconds": round(self.blocked_seconds, 3),
+        }
@@ -0,0 +1,289 @@
+from typing import List, Dict, Any, Iterable, Optional
+import base64
+import random
+import numpy as np
+from models import AssetState
+
+# Used by scenarios without a topology of their own; names match the SIEM corpus
+# (log_store vocabularies), where app-07 is the attacker's first foothold.
+DEFAULT_TOPOLOGY: Dict[str, Any] = {
+    "segments": [
+        {"name": "production", "links": ["staging", "admin", "corporate"], "hosts": [
+            {"prefix": "web-", "count": 40, "width": 2},
+            {"prefix": "app-", "count": 40, "width": 2},
+            {"prefix": "db-", "count": 10, "width": 2},
+        ]},
+        {"name": "staging", "links": ["production"], "hosts": [{"prefix": "stg-", "count": 10, "width": 2}]},
+        {"name": "admin", "links": ["production", "corporate"], "hosts": [
+            "bastion-01", {"prefix": "admin-ws-", "count": 5, "width": 2},
+        ]},
+        {"name": "corporate", "links": ["production", "admin"], "hosts": [{"prefix": "wks-", "count": 100, "width": 3}]},
+    ],
+    "accounts": [
+        "admin-backup", "svc-deploy", "svc-ci", "svc-backup", "root",
+        {"prefix": "user", "count": 240, "width": 3},
+    ],
+    "buckets": ["prod-data-backup", "app-logs", "static-assets", "billing-exports", "customer-records"],
+    "initial_compromise": ["app-07"],
+    "spread_per_tick": 1,
+}
+
+# Compromised hosts listed by name in SystemState.compromised_hosts
+COMPROMISED_HOSTS_LISTED = 50
+
+
+class TopologyError(ValueError):
+    """Raised when a topology definition is invalid"""
+
+
+def _expand(entries: Iterable[Any]) -> List[str]:
+    """Names from a list of names and {"prefix", "count", "width"?, "start"?} ranges"""
+    names = []
+    for entry in entries or []:
+        if isinstance(entry, str):
+            names.append(entry)
+        else:
+            start = entry.get("start", 1)
+            width = entry.get("width", len(str(start + entry["count"] - 1)))
+            names.extend(f"{entry['prefix']}{i:0{width}d}" for i in range(start, start + entry["count"]))
+    return names
+
+
+def _intern(kind: str, names: List[str]) -> Dict[str, int]:
+    index = {}
+    for name in names:
+        if name in index:
+            raise TopologyError(f"duplicate {kind} '{name}'")
+        index[name] = len(index)
+    return index
+
+
+def encode_bitmap(mask: int) -> str:
+    """Base64 of the little-endian bytes up to the highest set bit"""
+    return base64.b64encode(mask.to_bytes((mask.bit_length() + 7) // 8, "little")).decode("ascii") if mask else ""
+
+
+def decode_bitmap(value: Optional[str]) -> int:
+    return int.from_bytes(base64.b64decode(value), "little") if value else 0
+
+
+def bit_indices(mask: int) -> np.ndarray:
+    raw = np.frombuffer(mask.to_bytes((mask.bit_length() + 7) // 8, "little"), dtype=np.uint8)
+    return np.flatnonzero(np.unpackbits(raw, bitorder="little"))
+
+
+class Topology:
+    """A scenario's network, interned and compiled to bitmaps.
+
+    Hosts, accounts and buckets are numbered in definition order; a set of
+    them is a Python int with one bit per member, so per-session state is a
+    few ints however large the network. Each segment has a host bitmap and a
+    bitmap of the segments it links to (links are two-way).
+    """
+
+    def __init__(self, spec: Dict[str, Any]):
+        segments = spec.get("segments") or []
+        if not segments:
+            raise TopologyError("topology has no segments")
+        self.segment_names = [segment["name"] for segment in segments]
+        self.segment_index = _intern("segment", self.segment_names)
+
+        self.host_names: List[str] = []
+        self.segment_hosts: List[int] = []
+        for segment in segments:
+            hosts = _expand(segment.get("hosts"))
+            first = len(self.host_names)
+            self.host_names.extend(hosts)
+            self.segment_hosts.append(((1 << len(hosts)) - 1) << first)
+        self.host_index = _intern("host", self.host_names)
+
+        self.segment_links = [0] * len(segments)
+        for s, segment in enumerate(segments):
+            for name in segment.get("links") or []:
+                t = self.segment_index.get(name)
+                if t is None:
+                    raise TopologyError(f"segment '{segment['name']}' links to unknown segment '{name}'")
+                self.segment_links[s] |= 1 << t
+                self.segment_links[t] |= 1 << s
+
+        self.account_names = _expand(spec.get("accounts"))
+        self.account_index = _intern("account", self.account_names)
+        self.bucket_names = _expand(spec.get("buckets"))
+        self.bucket_index = _intern("bucket", self.bucket_names)
+
+        self.initial_compromise = self.host_mask(spec.get("initial_compromise") or [])
+        self.spread_per_tick = spec.get("spread_per_tick", 1)
+
+    def host_mask(self, names: Iterable[str]) -> int:
+        mask = 0
+        for name in names:
+            host = self.host_index.get(name)
+            if host is None:
+                raise TopologyError(f"unknown host '{name}'")
+            mask |= 1 << host
+        return mask
+
+    def segment_mask(self, names: Iterable[str]) -> int:
+        mask = 0
+        for name in names:
+            segment = self.segment_index.get(name)
+            if segment is not None:
+                mask |= 1 << segment
+        return mask
+
+    def host_names_in(self, mask: int, limit: Optional[int] = None) -> List[str]:
+        return [self.host_names[i] for i in bit_indices(mask)[:limit]]
+
+    def exposed(self, compromised: int, isolated: int, isolated_segments: int) -> int:
+        """Hosts one hop from a compromised host that is not isolated.
+
+        That is every host in the segments holding such a host and in the
+        segments linked to them. Isolated segments neither spread nor receive.
+        """
+        active = compromised & ~isolated
+        reached = 0
+        for s, hosts in enumerate(self.segment_hosts):
+            if hosts & active and not isolated_segments >> s & 1:
+                reached |= (1 << s) | self.segment_links[s]
+        reached &= ~isolated_segments
+        hosts = 0
+        while reached:
+            low = reached & -reached
+            hosts |= self.segment_hosts[low.bit_length() - 1]
+            reached ^= low
+        return hosts & ~compromised & ~isolated
+
+
+class HostState:
+    """One session's compromised/isolated hosts, disabled accounts and secured buckets"""
+
+    __slots__ = ("topology", "compromised", "isolated", "accounts_disabled", "buckets_secured")
+
+    def __init__(self, topology: Topology, compromised: int = 0, isolated: int = 0,
+                 accounts_disabled: int = 0, buckets_secured: int = 0):
+        self.topology = topology
+        self.compromised = compromised
+        self.isolated = isolated
+        self.accounts_disabled = accounts_disabled
+        self.buckets_secured = buckets_secured
+
+    @classmethod
+    def initial(cls, topology: Topology) -> "HostState":
+        return cls(topology, compromised=topology.initial_compromise)
+
+    @classmethod
+    def load(cls, topology: Topology, system_state) -> "HostState":
+        assets = system_state.assets
+        if assets is not None:
+            return cls(
+                topology,
+                decode_bitmap(assets.compromised),
+                decode_bitmap(assets.isolated),
+                decode_bitmap(assets.accounts_disabled),
+                decode_bitmap(assets.buckets_secured),
+            )
+        # Sessions from before the topology: fold in the name lists they kept
+        state = cls(topology)
+        for name in system_state.compromised_hosts:
+            state.compromised |= state._bit(topology.host_index, name)
+        for name in system_state.isolated_hosts:
+            state.isolated |= state._bit(topology.host_index, name)
+        for name in system_state.suspicious_accounts_disabled:
+            state.accounts_disabled |= state._bit(topology.account_index, name)
+        for name in system_state.s3_buckets_secured:
+            state.buckets_secured |= state._bit(topology.bucket_index, name)
+        return state
+
+    def store(self, system_state):
+        """Write the bitmaps, counts and listed compromised hosts back to the model"""
+        previous = system_state.assets
+        assets = AssetState(
+            compromised=encode_bitmap(self.compromised),
+            isolated=encode_bitmap(self.isolated),
+            accounts_disabled=encode_bitmap(self.accounts_disabled),
+            buckets_secured=encode_bitmap(self.buckets_secured),
+            hosts_total=len(self.topology.host_names),
+            hosts_compromised=self.compromised.bit_count(),
+            hosts_isolated=self.isolated.bit_count(),
+            hosts_contained=(self.compromised & self.isolated).bit_count(),
+        )
+        # The listed names only change with the compromised bitmap
+        if previous is None or previous.compromised != assets.compromised:
+            system_state.compromised_hosts = self.topology.host_names_in(self.compromised, COMPROMISED_HOSTS_LISTED)
+        system_state.assets = assets
+
+    @staticmethod
+    def _bit(index: Dict[str, int], name: str) -> int:
+        position = index.get(name)
+        return 0 if position is None else 1 << position
+
+    @staticmethod
+    def _set(current: int, bit: int) -> Optional[bool]:
+        """None for names outside the topology, else whether the bit was newly set"""
+        return None if not bit else not current & bit
+
+    def is_compromised(self, host: str) -> Optional[bool]:
+        bit = self._bit(self.topology.host_index, host)
+        return bool(self.compromised & bit) if bit else None
+
+    def isolate_host(self, host: str) -> Optional[bool]:
+        bit = self._bit(self.topology.host_index, host)
+        newly = self._set(self.isolated, bit)
+        self.isolated |= bit
+        return newly
+
+    def isolate_segment(self, segment: str) -> Optional[int]:
+        """Isolate every host in a segment; returns how many compromised hosts that contains"""
+        position = self.topology.segment_index.get(segment)
+        if position is None:
+            return None
+        hosts = self.topology.segment_hosts[position]
+        contained = (hosts & self.compromised & ~self.isolated).bit_count()
+        self.isolated |= hosts
+        return contained
+
+    def disable_account(self, account: str) -> Optional[bool]:
+        bit = self._bit(self.topology.account_index, account)
+        newly = self._set(self.accounts_disabled, bit)
+        self.accounts_disabled |= bit
+        return newly
+
+    def secure_bucket(self, bucket: str) -> Optional[bool]:
+        bit = self._bit(self.topology.bucket_index, bucket)
+        newly = self._set(self.buckets_secured, bit)
+        self.buckets_secured |= bit
+        return newly
+
+    def spread(self, isolated_segments: Iterable[str], count: Optional[int] = None,
+               rng: Optional[random.Random] = None) -> List[str]:
+        """Compromise up to `count` exposed hosts; returns their names"""
+        count = self.topology.spread_per_tick if count is None else count
+        exposed = bit_indices(self.topology.exposed(
+            self.compromised, self.isolated, self.topology.segment_mask(isolated_segments)
+        ))
+        if not count or not len(exposed):
+            return []
+        picked = (rng or random).sample(range(len(exposed)), min(count, len(exposed)))
+        for i in picked:
+            self.compromised |= 1 << int(exposed[i])
+        return [self.topology.host_names[int(exposed[i])] for i in picked]
+
+
+_default_topology: Optional[Topology] = None
+
+
+def default_topology() -> Topology:
+    global _default_topology
+    if _default_topology is None:
+        _default_topology = Topology(DEFAULT_TOPOLOGY)
+    return _default_topology
+
+
+def compile_topology(spec: Optional[Dict[str, Any]]) -> Topology:
+    """Compiled topology for a scenario's definition (the default when absent)"""
+    if not spec:
+        return default_topology()
+    try:
+        return Topology(spec)
+    except (KeyError, TypeError) as e:
+        raise TopologyError(f"malformed topology: {e!r}")
@@ -0,0 +1,171 @@
+from typing import List, Dict, Any, Callable, Awaitable, Optional
+from collections import OrderedDict
+import asyncio
+import logging
+import time
+from models import SimulationSession
+
+logger = logging.getLogger(__name__)
+
+BatchWriter = Callable[[List[SimulationSession]], Awaitable[None]]
+
+
+class CachedSession:
+    """A cached session and when it first became dirty since its last write"""
+
+    __slots__ = ("session", "dirty_since")
+
+    def __init__(self, session: SimulationSession):
+        self.session = session
+        self.dirty_since: Optional[float] = None
+
+
+class WriteBehindCache:
+    """Session cache whose writes are deferred and group-committed.
+
+    Commands mutate the cached session and only mark it dirty. ``run()`` flushes
+    every ``window_seconds``: all dirty sessions are written in batches of at
+    most ``max_batch`` through ``write_batch``, so several commands on one
+    session cost one write and many sessions share one round trip. Anything
+    dirty for less than the window is lost if the process dies.
+    """
+
+    def __init__(
+        self,
+        write_batch: BatchWriter,
+        window_seconds: float = 0.5,
+        max_batch: int = 500,
+        max_sessions: int = 10000
+    ):
+        self.write_batch = write_batch
+        self.window_seconds = window_seconds
+        self.max_batch = max_batch
+        self.max_sessions = max_sessions
+        self.entries: "OrderedDict[str, CachedSession]" = OrderedDict()
+        self._flush_lock = asyncio.Lock()
+
+        # Metrics
+        self.flushes = 0
+        self.batches = 0
+        self.sessions_written = 0
+        self.commands_coalesced = 0
+        self.errors = 0
+        self.last_batch_size = 0
+        self.max_batch_size = 0
+        self.last_flush_ms = 0.0
+        self.last_lag_ms = 0.0
+        self.max_lag_ms = 0.0
+        self._lag_total_ms = 0.0
+
+    def get(self, session_id: str) -> Optional[SimulationSession]:
+        entry = self.entries.get(session_id)
+        if entry is None:
+            return None
+        self.entries.move_to_end(session_id)
+        return entry.session
+
+    def put(self, session: SimulationSession) -> SimulationSession:
+        """Cache a session loaded from storage; an already cached copy wins"""
+        entry = self.entries.get(session.id)
+        if entry is None:
+            entry = self.entries[session.id] = CachedSession(session)
+            self._evict()
+        self.entries.move_to_end(session.id)
+        return entry.session
+
+    def mark_dirty(self, session: SimulationSession):
+        entry = self.entries.get(session.id)
+        if entry is None or entry.session is not session:
+            entry = self.entries[session.id] = CachedSession(session)
+            self._evict()
+        if entry.dirty_since is None:
+            entry.dirty_since = time.monotonic()
+        else:
+            self.commands_coalesced += 1
+
+    def evict(self, session_id: str):
+        """Drop a session, dirty or not, whose stored copy was rewritten elsewhere"""
+        self.entries.pop(session_id, None)
+
+    def _evict(self):
+        """Drop least recently used clean sessions beyond capacity"""
+        excess = len(self.entries) - self.max_sessions
+        if excess <= 0:
+            return
+        for session_id in [sid for sid, e in self.entries.items() if e.dirty_since is None][:excess]:
+            del self.entries[session_id]
+
+    @property
+    def dirty(self) -> int:
+        return sum(1 for e in self.entries.values() if e.dirty_since is not None)
+
+    async def flush(self, session_ids: Optional[List[str]] = None):
+        """Write dirty sessions (all of them, or just `session_ids`) in batches"""
+        async with self._flush_lock:
+            if session_ids is None:
+                pending = [e for e in self.entries.values() if e.dirty_since is not None]
+            else:
+                pending = [self.entries[sid] for sid in session_ids
+                           if sid in self.entries and self.entries[sid].dirty_since is not None]
+            if not pending:
+                return
+            started = time.monotonic()
+            for i in range(0, len(pending), self.max_batch):
+                await self._write(pending[i:i + self.max_batch])
+            self.flushes += 1
+            self.last_flush_ms = (time.monotonic() - started) * 1000
+
+    async def _write(self, batch: List[CachedSession]):
+        dirty_since = [e.dirty_since for e in batch]
+        # Clear first: commands landing during the write mark the session dirty again
+        for e in batch:
+            e.dirty_since = None
+        try:
+            await self.write_batch([e.session for e in batch])
+        except Exception:
+            self.errors += 1
+            for e, since in zip(batch, dirty_since):
+                e.dirty_since = since if e.dirty_since is None else min(since, e.dirty_since)
+            raise
+
+        done = time.monotonic()
+        lag_ms = (done - min(dirty_since)) * 1000
+        self.batches += 1
+        self.sessions_written += len(batch)
+        self.last_batch_size = len(batch)
+        self.max_batch_size = max(self.max_batch_size, len(batch))
+        self.last_lag_ms = lag_ms
+        self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+        self._lag_total_ms += lag_ms
+
+    async def run(self):
+        """Background flusher"""
+        while True:
+            await asyncio.sleep(self.window_seconds)
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Write-behind flush failed; retrying next window")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "window_seconds": self.window_seconds,
+            "cached_sessions": len(self.entries),
+            "dirty_sessions": self.dirty,
+            "flushes": self.flushes,
+            "batches": self.batches,
+            "sessions_written": self.sessions_written,
+            "commands_coalesced": self.commands_coalesced,
+            "errors": self.errors,
+            "batch_size": {
+                "last": self.last_batch_size,
+                "max": self.max_batch_size,
+                "avg": round(self.sessions_written / self.batches, 2) if self.batches else 0,
+            },
+            "flush_lag_ms": {
+                "last": round(self.last_lag_ms, 2),
+                "max": round(self.max_lag_ms, 2),
+                "avg": round(self._lag_total_ms / self.batches, 2) if self.batches else 0,
+            },
+            "last_flush_ms": round(self.last_flush_ms, 2),
+        }
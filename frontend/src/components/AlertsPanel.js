@@ -52,6 +52,12 @@ const AlertsPanel = ({ alerts }) => {
                   <i className="fas fa-clock"></i>
                   <span>{new Date(alert.timestamp).toLocaleTimeString('ar-EG')}</span>
                 </div>
+                {alert.count > 1 && (
+                  <div className="alert-count" data-testid={`alert-count-${idx}`}>
+                    <i className="fas fa-layer-group"></i>
+                    <span>×{alert.count}</span>
+                  </div>
+                )}
               </div>
               
               {alert.indicators && alert.indicators.length > 0 && (
@@ -1,4 +1,4 @@
-import { useState, useEffect, useCallback } from 'react';
+import { useState, useEffect, useCallback, useRef } from 'react';
 import { useParams, useNavigate } from 'react-router-dom';
 import axios from 'axios';
 import './SimulationDashboard.css';
@@ -13,10 +13,19 @@ import TeamMessagesPanel from './TeamMessagesPanel';
 import AchievementsDisplay from './AchievementsDisplay';
 import AIAssistantPanel from './AIAssistantPanel';
 import AttackMapVisualization from './AttackMapVisualization';
+import { applyStatePatch, STATE_FIELDS } from '../lib/statePatch';
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
 
+// Repeated alerts come back with the same id and an updated count
+const mergeAlerts = (alerts, incoming = []) => {
+  const updated = new Map(incoming.map(alert => [alert.id, alert]));
+  const merged = alerts.map(alert => updated.get(alert.id) || alert);
+  const known = new Set(alerts.map(alert => alert.id));
+  return [...merged, ...incoming.filter(alert => !known.has(alert.id))];
+};
+
 const SimulationDashboard = () => {
   const { sessionId } = useParams();
   const navigate = useNavigate();
@@ -35,6 +44,9 @@ const SimulationDashboard = () => {
   const [timelineEvents, setTimelineEvents] = useState([]);
   const [aiAdvice, setAiAdvice] = useState(null);
   
+  // State from the last command response; later responses are patches against it
+  const lastState = useRef(null);
+  
   useEffect(() => {
     fetchSession();
     fetchAvailableCommands();
@@ -73,23 +85,33 @@ const SimulationDashboard = () => {
       const response = await axios.post(`${API}/simulation/execute`, {
         session_id: sessionId,
         command: command,
-        parameters: parameters
+        parameters: parameters,
+        since_revision: lastState.current?.revision
       });
       
+      let data = response.data;
+      if (data.patch) {
+        data = { ...data, ...applyStatePatch(lastState.current.state, data.patch) };
+      }
+      lastState.current = {
+        revision: data.revision,
+        state: Object.fromEntries(STATE_FIELDS.map(field => [field, data[field]]))
+      };
+      
       // Update session with new state
       setSession(prevSession => ({
         ...prevSession,
-        system_state: response.data.system_state,
-        attacker_state: response.data.attacker_state,
-        alerts: [...prevSession.alerts, ...response.data.new_alerts],
-        stress_level: response.data.stress_level,
-        metrics: response.data.metrics,
-        simulation_time: response.data.simulation_time
+        system_state: data.system_state,
+        attacker_state: data.attacker_state,
+        alerts: mergeAlerts(prevSession.alerts, data.new_alerts),
+        stress_level: data.stress_level,
+        metrics: data.metrics,
+        simulation_time: data.simulation_time
       }));
       
       // Handle new alerts
-      if (response.data.new_alerts && response.data.new_alerts.length > 0) {
-        response.data.new_alerts.forEach(alert => {
+      if (data.new_alerts && data.new_alerts.length > 0) {
+        data.new_alerts.forEach(alert => {
           addNotification({
             type: 'alert',
             title: alert.title,
@@ -105,16 +127,16 @@ const SimulationDashboard = () => {
       }
       
       // Handle timeline events
-      if (response.data.timeline_events) {
-        setTimelineEvents(response.data.timeline_events);
+      if (data.timeline_events) {
+        setTimelineEvents(data.timeline_events);
       }
       
       // Handle team messages
-      if (response.data.team_messages && response.data.team_messages.length > 0) {
-        setTeamMessages(prev => [...response.data.team_messages, ...prev]);
+      if (data.team_messages && data.team_messages.length > 0) {
+        setTeamMessages(prev => [...data.team_messages, ...prev]);
         
         // Add notification for urgent messages
-        response.data.team_messages.forEach(msg => {
+        data.team_messages.forEach(msg => {
           if (msg.urgency === 'critical' || msg.urgency === 'high') {
             addNotification({
               type: 'message',
@@ -127,10 +149,10 @@ const SimulationDashboard = () => {
       }
       
       // Handle achievements
-      if (response.data.achievements && response.data.achievements.length > 0) {
-        setAchievements(prev => [...prev, ...response.data.achievements]);
+      if (data.achievements && data.achievements.length > 0) {
+        setAchievements(prev => [...prev, ...data.achievements]);
         
-        response.data.achievements.forEach(achievement => {
+        data.achievements.forEach(achievement => {
           setTotalPoints(prev => prev + achievement.points);
           
           addNotification({
@@ -141,28 +163,28 @@ const SimulationDashboard = () => {
           });
           
           // Play achievement sound
-          playSound(response.data.sound_effect || { type: 'melody', notes: [523, 659, 784] });
+          playSound(data.sound_effect || { type: 'melody', notes: [523, 659, 784] });
         });
       }
       
       // Handle AI advice
-      if (response.data.ai_advice) {
-        setAiAdvice(response.data.ai_advice);
+      if (data.ai_advice) {
+        setAiAdvice(data.ai_advice);
       }
       
       // Handle sound effects
-      if (response.data.sound_effect) {
-        playSound(response.data.sound_effect);
+      if (data.sound_effect) {
+        playSound(data.sound_effect);
       }
       
       // Success notification
       addNotification({
         type: 'success',
         title: 'تم التنفيذ',
-        message: response.data.message
+        message: data.message
       });
       
-      return response.data;
+      return data;
     } catch (error) {
       console.error('Error executing command:', error);
       
@@ -0,0 +1,37 @@
+// Apply the JSON Patch operations returned by /simulation/execute
+// (add / remove / replace) to a copy of the client's last state
+const unescapeToken = token => token.replace(/~1/g, '/').replace(/~0/g, '~');
+
+export const applyStatePatch = (state, ops) => {
+  let doc = JSON.parse(JSON.stringify(state));
+  ops.forEach(({ op, path, value }) => {
+    const tokens = path.split('/').slice(1).map(unescapeToken);
+    if (tokens.length === 0) {
+      doc = value;
+      return;
+    }
+    const last = tokens.pop();
+    const parent = tokens.reduce((node, token) => node[Array.isArray(node) ? Number(token) : token], doc);
+
+    if (Array.isArray(parent)) {
+      if (op === 'remove') {
+        parent.splice(Number(last), 1);
+      } else if (last === '-') {
+        parent.push(value);
+      } else if (op === 'add') {
+        parent.splice(Number(last), 0, value);
+      } else {
+        parent[Number(last)] = value;
+      }
+    } else if (op === 'remove') {
+      delete parent[last];
+    } else {
+      parent[last] = value;
+    }
+  });
+  return doc;
+};
+
+export const STATE_FIELDS = [
+  'system_state', 'attacker_state', 'stress_level', 'metrics', 'simulation_time', 'timeline_events'
+];
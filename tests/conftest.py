@@ -0,0 +1,22 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+# Backend modules import each other by bare name (from models import ...)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+# In-memory storage and a small SIEM corpus, built once per run
+os.environ.setdefault("STORAGE_BACKEND", "memory")
+os.environ.setdefault("LOG_STORE_DIR", tempfile.mkdtemp(prefix="test-log-store-"))
+os.environ.setdefault("LOG_STORE_ROWS", "20000")
+
+
+@pytest.fixture(scope="session")
+def engine():
+    from simulation_engine import SimulationEngine
+    engine = SimulationEngine()
+    engine.scenarios.reload()
+    return engine
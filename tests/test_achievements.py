@@ -0,0 +1,57 @@
+from achievements import METRIC_NAMES, metrics_changed
+
+
+def test_metrics_changed_marks_exactly_the_changed_metrics():
+    before = {name: 50.0 for name in METRIC_NAMES}
+    after = dict(before, responseAccuracy=55.0, forensicPreservation=60.0)
+    changed = metrics_changed(before, after)
+    assert [name for i, name in enumerate(METRIC_NAMES) if changed >> i & 1] == [
+        name for name in METRIC_NAMES if name in ("responseAccuracy", "forensicPreservation")
+    ]
+    assert metrics_changed(before, dict(before)) == 0
+    # Key order does not matter, a missing metric counts as changed
+    assert metrics_changed(before, dict(reversed(list(before.items())))) == 0
+    assert metrics_changed(before, {}) == (1 << len(METRIC_NAMES)) - 1
+
+
+def test_commands_report_the_metrics_they_change(engine):
+    from models import SimulationSession
+
+    session = SimulationSession(**engine.scenarios.templates["aws-cloud-breach"].new_session("u"))
+    before = dict(session.metrics)
+    engine.execute_command(session, "preserve_logs", {})
+    assert metrics_changed(before, session.metrics) == 1 << METRIC_NAMES.index("forensicPreservation")
+
+
+def test_each_achievement_is_emitted_once_per_session(engine):
+    from models import SimulationSession
+
+    session = SimulationSession(**engine.scenarios.templates["aws-cloud-breach"].new_session("u"))
+    emitted = []
+    for _ in range(12):
+        emitted += [award["id"] for award in engine.execute_command(session, "preserve_logs", {}).achievements]
+    assert "evidence_master" in emitted
+    assert len(emitted) == len(set(emitted))
+    assert sorted(emitted) == sorted(session.achievements_unlocked)
+
+
+def test_incremental_unlocks_match_a_full_check():
+    import random
+    from achievements import AchievementEngine
+    from models import Command, SimulationSession
+
+    achievements = AchievementEngine()
+    rng = random.Random(49)
+    for _ in range(200):
+        session = SimulationSession(scenario_id="s")
+        seen = []
+        for _ in range(15):
+            before = dict(session.metrics)
+            name = rng.choice(METRIC_NAMES)
+            session.metrics[name] = min(100.0, session.metrics[name] + rng.choice([0, 5, 10, 25]))
+            session.commands_history.append(Command(command="noop"))
+            seen += [award["id"] for award in achievements.unlock(session, metrics_changed(before, session.metrics))]
+            # Everything that holds now has been emitted, and nothing twice
+            held = {award["id"] for award in achievements.held(session.metrics, len(session.commands_history))}
+            assert held <= set(seen)
+            assert len(seen) == len(set(seen))
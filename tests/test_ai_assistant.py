@@ -0,0 +1,38 @@
+from ai_assistant import AIAssistant
+from models import SimulationSession
+
+
+def test_hints_are_tracked_per_session():
+    assistant = AIAssistant()
+    first, second = SimulationSession(scenario_id="s"), SimulationSession(scenario_id="s")
+
+    hints = [assistant.get_hint(first)["hint"] for _ in range(2)]
+    assert hints[0] != hints[1]
+    # Another session starts from the first hint again
+    assert assistant.get_hint(second)["hint"] == hints[0]
+    assert first.hints_given == ["medium:0", "medium:1"]
+    assert second.hints_given == ["medium:0"]
+
+
+def test_hints_run_out_and_unknown_difficulties_fall_back_to_medium():
+    assistant = AIAssistant()
+    session = SimulationSession(scenario_id="s")
+    given = []
+    while True:
+        hint = assistant.get_hint(session, "impossible")
+        if not hint["available"]:
+            break
+        given.append(hint["hint"])
+    assert given and len(given) == len(set(given))
+    assert all(key.startswith("medium:") for key in session.hints_given)
+
+
+def test_advice_follows_the_session_state():
+    assistant = AIAssistant()
+    session = SimulationSession(scenario_id="s")
+    session.attacker_state.progress = 80
+    session.attacker_state.current_phase = "data_exfiltration"
+    session.simulation_time = 1
+    advice = assistant.analyze_situation(session)
+    assert advice["severity"] == "critical"
+    assert any(action.startswith("enable_dlp") for action in advice["suggested_actions"])
@@ -0,0 +1,32 @@
+from alert_dedup import AlertDeduplicator
+from models import Alert
+
+
+def make_alert(*indicators, title="Failed logins"):
+    return Alert(title=title, description="", severity="high", source="SIEM", indicators=list(indicators))
+
+
+def test_counts_and_volumes_are_normalized():
+    normalize = AlertDeduplicator.normalize_indicator
+    assert normalize("15 failed attempts") == normalize("3 failed attempts")
+    assert normalize("2.4 GB") == normalize("120 GB")
+    assert normalize("Count: 12") == normalize("count:  7")
+
+
+def test_addresses_and_hosts_stay_distinct():
+    fingerprint = AlertDeduplicator.fingerprint
+    assert fingerprint(make_alert("IP: 10.0.0.5")) != fingerprint(make_alert("IP: 192.168.1.9"))
+    assert fingerprint(make_alert("host app-07")) != fingerprint(make_alert("host app-12"))
+    assert fingerprint(make_alert("user: user042")) != fingerprint(make_alert("user: user043"))
+
+
+def test_repeat_within_window_folds_and_distinct_host_does_not():
+    dedup = AlertDeduplicator(window_minutes=15)
+    alerts = []
+    dedup.merge(alerts, [make_alert("host app-07", "15 failed attempts")], 1.0)
+    touched = dedup.merge(alerts, [make_alert("host app-07", "40 failed attempts")], 5.0)
+    assert len(alerts) == 1 and alerts[0].count == 2 and touched == alerts
+    dedup.merge(alerts, [make_alert("host app-12", "40 failed attempts")], 6.0)
+    assert len(alerts) == 2
+    dedup.merge(alerts, [make_alert("host app-07", "1 failed attempts")], 30.0)
+    assert len(alerts) == 3
@@ -0,0 +1,92 @@
+import random
+
+import pytest
+
+from attack_graph import AttackGraph, AttackGraphError, DEFAULT_ATTACK_GRAPH
+from models import AttackerPhase
+
+PHASES = [phase.value for phase in AttackerPhase]
+
+
+def layered_spec(rng, techniques=120, paths=12, fanout=3):
+    layers = [[] for _ in PHASES]
+    nodes = []
+    for n in range(techniques):
+        layer = 0 if n == 0 else 1 + (n - 1) % (len(PHASES) - 1)
+        technique = {"id": f"T{n:03d}", "phase": PHASES[layer]}
+        if layer >= len(PHASES) - 3 and rng.random() < 0.3:
+            technique["objective"] = True
+        nodes.append(technique)
+        layers[layer].append(technique["id"])
+    edges = []
+    for layer, ids in enumerate(layers[:-1]):
+        for technique_id in ids:
+            for target in rng.sample(layers[layer + 1], min(fanout, len(layers[layer + 1]))):
+                edge = {"from": technique_id, "to": target}
+                if rng.random() < 0.8:
+                    edge["path"] = f"path-{rng.randrange(paths)}"
+                edges.append(edge)
+    return {"entry": "T000", "techniques": nodes, "edges": edges}
+
+
+def reachable_by_search(spec, start, blocked_paths):
+    """Objectives reachable from `start`, by a plain search over the spec"""
+    out = {}
+    for edge in spec["edges"]:
+        if edge.get("path") not in blocked_paths:
+            out.setdefault(edge["from"], []).append(edge["to"])
+    seen, stack = {start}, [start]
+    while stack:
+        for target in out.get(stack.pop(), []):
+            if target not in seen:
+                seen.add(target)
+                stack.append(target)
+    return {t["id"] for t in spec["techniques"] if t.get("objective") and t["id"] in seen}
+
+
+def replay(graph, spec, seed, sessions=40, steps=40, paths=12):
+    rng = random.Random(seed)
+    decisions = []
+    for _ in range(sessions):
+        node, blocked_paths, completed, blocked = graph.entry, [], [], 0
+        for _ in range(steps):
+            if rng.random() < 0.4:
+                path = f"path-{rng.randrange(paths)}"
+                if path not in blocked_paths:
+                    blocked = graph.block(node, blocked, path)
+                    blocked_paths.append(path)
+                    assert blocked == graph.blocked_mask(blocked_paths)
+                reachable = graph.reachable_objectives(node, blocked, completed)
+                expected = reachable_by_search(spec, graph.ids[node], blocked_paths) - set(completed)
+                assert set(reachable) == expected
+                decisions.append(tuple(reachable))
+            else:
+                candidates = graph.next_techniques(node, blocked, completed)
+                if candidates:
+                    node = candidates[rng.randrange(len(candidates))]
+                    if graph.is_objective(node):
+                        completed.append(graph.ids[node])
+                decisions.append(node)
+    return decisions
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_memoized_reachability_makes_identical_decisions(seed):
+    spec = layered_spec(random.Random(seed))
+    cold = replay(AttackGraph(spec, cache_size=0), spec, seed)
+    memoized = replay(AttackGraph(spec, cache_size=4096), spec, seed)
+    small = replay(AttackGraph(spec, cache_size=8), spec, seed)
+    assert cold == memoized == small
+
+
+def test_default_graph_keeps_the_phase_order():
+    graph = AttackGraph(DEFAULT_ATTACK_GRAPH)
+    assert graph.phases[graph.entry] == AttackerPhase.RECONNAISSANCE
+    # Sessions saved before the graph resume at the first technique of their phase
+    node = graph.node_for(None, AttackerPhase.LATERAL_MOVEMENT.value)
+    assert graph.phases[node] == AttackerPhase.LATERAL_MOVEMENT
+
+
+def test_unknown_techniques_are_rejected():
+    with pytest.raises(AttackGraphError):
+        AttackGraph({"techniques": [{"id": "a", "phase": "reconnaissance"}], "edges": [{"from": "a", "to": "b"}]})
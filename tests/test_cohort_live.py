@@ -0,0 +1,21 @@
+from cohort_live import CohortAggregator, SNAPSHOT_FIELDS
+
+
+def snapshot(session_id, commands):
+    snap = {field: 0 for field in SNAPSHOT_FIELDS}
+    snap.update(user_id=session_id, phase="initial_access", status="active", commands=commands, last_activity=0.0)
+    return snap
+
+
+def test_seeding_adds_stored_sessions_to_a_view_created_by_live_events():
+    cohorts = CohortAggregator()
+    cohorts.on_engine_event({"type": "command", "session_id": "live", "cohort_id": "c1", **snapshot("live", 5)})
+    assert cohorts.view("c1") is not None and "c1" not in cohorts.seeded
+
+    stored = [{"id": "live", "commands": 1}, {"id": "stored", "commands": 2}]
+    view = cohorts.seed("c1", stored, lambda doc: snapshot(doc["id"], doc["commands"]))
+
+    assert set(view.sessions) == {"live", "stored"}
+    # The live snapshot is newer than the stored document and wins
+    assert view.sessions["live"]["commands"] == 5
+    assert "c1" in cohorts.seeded
@@ -0,0 +1,23 @@
+import shutil
+from pathlib import Path
+
+import pytest
+
+from detection_rules import DetectionEngine, RuleError
+
+RULES_DIR = Path(__file__).resolve().parent.parent / "backend" / "rules"
+
+
+@pytest.mark.parametrize("name, text", [
+    ("broken.json", '{"id": "broken",'),
+    ("broken.yaml", "id: [unclosed"),
+])
+def test_malformed_rule_file_fails_reload_and_keeps_rules(tmp_path, name, text):
+    shutil.copy(RULES_DIR / "failed-login-surge.json", tmp_path)
+    engine = DetectionEngine(tmp_path)
+    assert len(engine.rules) == 1
+
+    (tmp_path / name).write_text(text)
+    with pytest.raises(RuleError, match=name):
+        engine.load()
+    assert len(engine.rules) == 1
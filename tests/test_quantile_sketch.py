@@ -0,0 +1,21 @@
+import pytest
+
+from quantile_sketch import TDigest
+
+
+def test_cdf_counts_ties_half_at_the_extremes():
+    digest = TDigest()
+    for value in range(100):
+        digest.add(float(value))
+    assert digest.cdf(-1.0) == 0.0
+    assert digest.cdf(0.0) == pytest.approx(0.005)
+    assert digest.cdf(49.5) == pytest.approx(0.5, abs=0.01)
+    assert digest.cdf(99.0) == pytest.approx(0.995)
+    assert digest.cdf(100.0) == 1.0
+
+
+def test_cdf_of_a_single_repeated_value_is_one_half():
+    digest = TDigest()
+    for _ in range(10):
+        digest.add(70.0)
+    assert digest.cdf(70.0) == pytest.approx(0.5)
@@ -0,0 +1,33 @@
+import shutil
+from pathlib import Path
+
+from scenario_packs import ScenarioRegistry
+
+PACKS_DIR = Path(__file__).resolve().parent.parent / "backend" / "scenarios"
+
+
+def test_malformed_yaml_keeps_last_good_pack(tmp_path):
+    pack = tmp_path / "breach"
+    shutil.copytree(PACKS_DIR / "aws_cloud_breach", pack)
+    registry = ScenarioRegistry(tmp_path)
+    (scenario_id,) = registry.reload()["added"]
+    template = registry.get(scenario_id)
+
+    (pack / "objectives.json").unlink()
+    (pack / "objectives.yaml").write_text("- [unclosed")
+    assert registry.reload()["failed"] == ["breach"]
+    assert registry.get(scenario_id) is template
+
+
+def test_stored_scenarios_recompile_when_edited(tmp_path):
+    registry = ScenarioRegistry(tmp_path)
+    stored = ScenarioRegistry(PACKS_DIR)
+    stored.reload()
+    doc = stored.packs()[0].model_dump()
+    doc["id"] = "stored-scenario"
+
+    template = registry.compile_scenario(doc)
+    assert registry.compile_scenario(dict(doc)) is template
+    edited = registry.compile_scenario({**doc, "name": "Edited"})
+    assert edited is not template and edited.scenario.name == "Edited"
+    assert registry.get("stored-scenario") is edited
@@ -0,0 +1,85 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+SCENARIO = "aws-cloud-breach"
+
+
+@pytest.fixture(scope="module")
+def client():
+    from fastapi.testclient import TestClient
+    import server
+    with TestClient(server.app) as client:
+        client.server = server
+        yield client
+
+
+def start(client, **fields):
+    response = client.post("/api/simulation/start", json={"scenario_id": SCENARIO, **fields})
+    assert response.status_code == 200
+    return response.json()["id"]
+
+
+def execute(client, session_id, command, **parameters):
+    return client.post("/api/simulation/execute", json={
+        "session_id": session_id, "command": command, "parameters": parameters
+    })
+
+
+def expire_idle_sessions(client):
+    later = datetime.now(timezone.utc) + timedelta(days=1)
+    return client.portal.call(client.server.session_reaper.reap, later)
+
+
+def test_expired_sessions_cannot_be_completed(client):
+    session_id = start(client, user_id="expiring", cohort_id="expiry-1")
+    execute(client, session_id, "block_ip", ip="10.0.0.1")
+    assert session_id in expire_idle_sessions(client)
+
+    assert client.post(f"/api/simulation/{session_id}/complete").status_code == 410
+    assert client.get(f"/api/simulation/{session_id}").json()["ending_type"] == "expired"
+    assert client.get(f"/api/analytics/scenarios/{SCENARIO}", params={"cohort_id": "expiry-1"}).status_code == 404
+
+
+def test_completion_loses_to_a_concurrent_expiry(client, monkeypatch):
+    session_id = start(client, user_id="racing", cohort_id="expiry-2")
+    server = client.server
+    # A copy loaded before the reaper expired the stored session
+    stale = client.portal.call(server._load_session, session_id)
+    assert session_id in expire_idle_sessions(client)
+
+    async def load_stale(_):
+        return stale
+
+    monkeypatch.setattr(server, "_load_session", load_stale)
+    assert client.post(f"/api/simulation/{session_id}/complete").status_code == 410
+    monkeypatch.undo()
+
+    stored = client.get(f"/api/simulation/{session_id}").json()
+    assert stored["status"] == "failed" and stored["ending_type"] == "expired"
+    assert client.get(f"/api/analytics/scenarios/{SCENARIO}", params={"cohort_id": "expiry-2"}).status_code == 404
+
+
+def test_execute_loses_to_a_concurrent_expiry(client, monkeypatch):
+    session_id = start(client, user_id="racing", cohort_id="expiry-4")
+    server = client.server
+    stale = client.portal.call(server._load_session, session_id)
+    assert session_id in expire_idle_sessions(client)
+
+    async def load_stale(_):
+        return stale
+
+    monkeypatch.setattr(server, "_load_session", load_stale)
+    assert execute(client, session_id, "block_ip", ip="10.0.0.1").status_code == 410
+    monkeypatch.undo()
+
+    stored = client.get(f"/api/simulation/{session_id}").json()
+    assert stored["status"] == "failed" and stored["ending_type"] == "expired"
+
+
+def test_open_sessions_complete_once(client):
+    session_id = start(client, user_id="finisher", cohort_id="expiry-3")
+    assert client.post(f"/api/simulation/{session_id}/complete").status_code == 200
+    assert client.post(f"/api/simulation/{session_id}/complete").status_code == 200
+    stats = client.get(f"/api/analytics/scenarios/{SCENARIO}", params={"cohort_id": "expiry-3"}).json()
+    assert stats["sessions"] == 1
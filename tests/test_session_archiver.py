@@ -0,0 +1,50 @@
+import asyncio
+from datetime import datetime, timezone
+
+import pyarrow.dataset as ds
+import pytest
+
+from models import SimulationSession
+from session_archiver import SessionArchiver
+from storage import MemoryBackend, SQLiteBackend, Storage
+
+END_TIME = datetime(2026, 3, 1, 12, 0, tzinfo=timezone.utc).isoformat()
+
+
+def completed(end_time=END_TIME, **fields):
+    doc = SimulationSession(scenario_id="aws-cloud-breach", status="completed", **fields).model_dump(mode="json")
+    doc["end_time"] = end_time
+    return doc
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def storage(request, tmp_path):
+    backend = MemoryBackend() if request.param == "memory" else SQLiteBackend(tmp_path / "sessions.sqlite3")
+    storage = Storage(backend)
+    asyncio.run(storage.setup())
+    yield storage
+    asyncio.run(storage.close())
+
+
+def archived_ids(root):
+    return sorted(ds.dataset(root / "sessions", partitioning="hive").to_table().column("session_id").to_pylist())
+
+
+def test_every_completed_session_is_archived_exactly_once(storage, tmp_path):
+    root = tmp_path / "archive"
+    archiver = SessionArchiver(storage, root, batch_sessions=2)
+    # Ties on end_time across a batch boundary
+    first = [completed() for _ in range(3)]
+    asyncio.run(storage.sessions.insert_many(first))
+    assert asyncio.run(archiver.run())["sessions"] == 3
+
+    # Another session ending at the same instant, and a late commit with an earlier end_time
+    late = [completed(), completed(end_time="2026-02-01T00:00:00+00:00")]
+    asyncio.run(storage.sessions.insert_many(late))
+    assert asyncio.run(archiver.run())["sessions"] == 2
+
+    # Re-completing an archived session does not archive it again
+    asyncio.run(storage.sessions.update(first[0]["id"], {"end_time": "2026-04-01T00:00:00+00:00", "final_score": 90.0}))
+    assert asyncio.run(archiver.run())["sessions"] == 0
+
+    assert archived_ids(root) == sorted(doc["id"] for doc in first + late)
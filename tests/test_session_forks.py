@@ -0,0 +1,48 @@
+import random
+
+from models import SimulationSession
+from session_forks import SessionForks, diverged_at
+
+COMMANDS = [
+    ("query_logs", {"query": "outcome=failure | count by user"}),
+    ("block_ip", {"ip": "185.220.101.4"}),
+    ("isolate_host", {"hostname": "app-07"}),
+    ("preserve_logs", {}),
+    ("scan_for_malware", {"target": "app-07"}),
+    ("disable_account", {"username": "admin-backup"}),
+]
+
+
+def new_session(engine):
+    return SimulationSession(**engine.scenarios.templates["aws-cloud-breach"].new_session("u"))
+
+
+def test_commands_on_a_fork_leave_the_original_untouched(engine):
+    random.seed(48)
+    session = new_session(engine)
+    for command, parameters in COMMANDS[:4]:
+        engine.execute_command(session, command, parameters)
+    before = session.model_dump()
+
+    fork = engine.fork_session(session)
+    assert fork.forked_from == session.id and fork.forked_at == 4
+    for command, parameters in COMMANDS[2:] * 3:
+        engine.execute_command(fork, command, parameters)
+
+    assert session.model_dump() == before
+    assert diverged_at(session, fork) == 4
+    # Nested forks still point at the stored session
+    assert engine.fork_session(fork).forked_from == session.id
+
+
+def test_forks_are_dropped_least_recently_used_first():
+    dropped = []
+    forks = SessionForks(max_forks=2, on_dropped=dropped.append)
+    sessions = [SimulationSession(scenario_id="s", forked_from="base") for _ in range(3)]
+    forks.add(sessions[0])
+    forks.add(sessions[1])
+    forks.get(sessions[0].id)
+    forks.add(sessions[2])
+    assert dropped == [sessions[1].id]
+    forks.forget("base")
+    assert forks.stats()["forks"] == 0
@@ -0,0 +1,82 @@
+import asyncio
+import random
+
+import numpy as np
+import pytest
+
+from models import AttackerPhase, SimulationSession
+from session_rescoring import ScoreColumns, SessionRescorer, score_columns
+from storage import MemoryBackend, Storage
+
+SCENARIO = "aws-cloud-breach"
+
+
+def random_doc(template, rng, n, metric_value=None):
+    base = template.new_session(f"u{n}")
+    actions = [{"action": "probe"}] * rng.randint(0, 6)
+    metrics = {name: rng.uniform(0, 100) if metric_value is None else metric_value for name in base["metrics"]}
+    if rng.random() < 0.2:
+        keys = list(metrics)
+        rng.shuffle(keys)
+        metrics = {key: metrics[key] for key in keys}
+    return {
+        **base,
+        "status": "completed",
+        "metrics": metrics,
+        "stress_level": rng.uniform(0, 110),
+        "system_state": {**base["system_state"], "business_continuity_score": rng.uniform(30, 100)},
+        "attacker_state": {
+            **base["attacker_state"],
+            "current_phase": rng.choice([phase.value for phase in AttackerPhase]),
+            "blocked_paths": [f"path-{i}" for i in range(rng.randint(0, 5))],
+        },
+        "attacker_actions": actions,
+        "attacker_action_count": len(actions),
+    }
+
+
+def evaluated(engine, docs):
+    results = [engine.evaluate_session(SimulationSession(**doc)) for doc in docs]
+    return [result["final_score"] for result in results], [result["ending_type"] for result in results]
+
+
+@pytest.fixture(scope="module")
+def template(engine):
+    return engine.scenarios.templates[SCENARIO]
+
+
+def test_columns_match_evaluate_session_on_random_sessions(engine, template):
+    rng = random.Random(44)
+    docs = [random_doc(template, rng, n) for n in range(2000)]
+    assert score_columns(ScoreColumns(docs)) == evaluated(engine, docs)
+
+
+def test_columns_match_evaluate_session_on_rounding_ties(engine, template):
+    rng = random.Random(45)
+    ties = []
+    for n in range(20000):
+        # Metrics on a 1/8 grid make exact decimal ties at the third place common
+        doc = random_doc(template, rng, n, metric_value=rng.randrange(800) / 8)
+        doc["stress_level"] = rng.randrange(880) / 8
+        doc["system_state"]["business_continuity_score"] = rng.randrange(240, 800) / 8
+        raw = engine.project_score(SimulationSession(**doc))
+        if round(raw, 2) != float(np.round(raw, 2)):
+            ties.append(doc)
+        if len(ties) == 50:
+            break
+    assert ties, "no scores on a round() tie were generated"
+    assert score_columns(ScoreColumns(ties)) == evaluated(engine, ties)
+
+
+def test_sessions_stored_without_an_action_count_are_counted(engine, template):
+    rng = random.Random(46)
+    docs = [random_doc(template, rng, n) for n in range(20)]
+    for doc in docs[::2]:
+        del doc["attacker_action_count"]
+    expected = dict(zip((doc["id"] for doc in docs), zip(*evaluated(engine, docs))))
+
+    storage = Storage(MemoryBackend())
+    asyncio.run(storage.sessions.insert_many(docs))
+    asyncio.run(SessionRescorer(storage, chunk_size=7).run(apply=True))
+    stored = asyncio.run(storage.sessions.find_all({}, {"id": 1, "final_score": 1, "ending_type": 1}))
+    assert {doc["id"]: (doc["final_score"], doc["ending_type"]) for doc in stored} == expected
@@ -0,0 +1,44 @@
+import asyncio
+
+import pytest
+
+from log_store import LogStore
+from models import AttackerState
+from telemetry import TelemetryStream
+
+OBJECTIVES = [{"phase": "initial_access"}, {"phase": "lateral_movement"}]
+
+
+def test_producer_errors_reach_the_consumer():
+    stream = TelemetryStream(OBJECTIVES, lambda: None, rate=None, batch_size=10)
+
+    def broken(*args, **kwargs):
+        raise RuntimeError("telemetry source failed")
+
+    stream.next_batch = broken
+
+    async def consume():
+        async for _ in stream:
+            pass
+
+    with pytest.raises(RuntimeError, match="telemetry source failed"):
+        asyncio.run(asyncio.wait_for(consume(), timeout=5))
+
+
+def test_ingested_telemetry_is_queryable_per_stream(tmp_path):
+    store = LogStore(root=tmp_path, rows=2000)
+    store.register_scenario("s", OBJECTIVES)
+    before = store.query("s", "* | count", stream_id="session").payload["count"]
+
+    stream = TelemetryStream(OBJECTIVES, lambda: AttackerState(), rate=None, seed="session:0")
+    batch = stream.next_batch(size=300, span_seconds=60)
+    store.ingest("session", batch.columns)
+
+    assert store.query("s", "* | count", stream_id="session").payload["count"] == before + 300
+    assert store.query("s", "* | count").payload["count"] == before
+    assert store.query("s", "* | count", stream_id="other").payload["count"] == before
+
+    store.fork("session", "fork")
+    store.forget("session")
+    assert store.query("s", "* | count", stream_id="fork").payload["count"] == before + 300
+    assert store.query("s", "* | count", stream_id="session").payload["count"] == before